@@ -0,0 +1,27 @@
+from typing import Dict
+
+from autogen_core import CancellationToken
+
+
+class SessionCancellation:
+    """One CancellationToken per session, shared by the agents of that session.
+
+    Cancelling a session aborts the model calls in flight and makes its agents
+    ignore any later message.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, CancellationToken] = {}
+
+    def token(self, session_id: str) -> CancellationToken:
+        return self._tokens.setdefault(session_id, CancellationToken())
+
+    def cancel(self, session_id: str) -> None:
+        self.token(session_id).cancel()
+
+    def is_cancelled(self, session_id: str) -> bool:
+        return session_id in self._tokens and self._tokens[session_id].is_cancelled()
+
+    def forget(self, session_id: str) -> None:
+        """Drop the token of a finished session"""
+        self._tokens.pop(session_id, None)
@@ -1,5 +1,28 @@
-from typing import List
-from models.interfaces import ApplicationDescription, InitialDescription, NegotiationOffer
+from functools import partial
+from typing import Any, List, Mapping, Optional, Tuple
+from agents.cancellation import SessionCancellation
+from agents.deadlock import DeadlockPredictor
+from agents.prompts import ClientPromptBuilder, Prompt
+from agents.rules import Decision, client_decision, near_client_limits
+from agents.speculation import Speculator, close_to
+from agents.structured_output import StructuredResponder
+from clients.cascade import LARGE, SMALL
+from clients.factory import get_idle_slots
+from event_stream import EventStream
+from metrics import DISABLED_METRICS, NegotiationMetrics
+from models.events import (
+    AgreementEvent,
+    CounterOfferEvent,
+    DeadlockPredictedEvent,
+    HandlerErrorEvent,
+    InvalidResponseEvent,
+    IterationLimitEvent,
+    NegotiationEvent,
+    OfferEvent,
+)
+from models.descriptions import DescriptionStore
+from models.interfaces import ApplicationDescription, FinalAgreement, InitialDescription, NegotiationOffer, Terms
+from models.topics import TopicRouter
 from pydantic import BaseModel
 from autogen_core import (
     RoutedAgent,
@@ -7,15 +30,11 @@ from autogen_core import (
     type_subscription,
     MessageContext
 )
-from autogen_core.models import (
-    AssistantMessage,
-    ChatCompletionClient,
-    LLMMessage,
-)
-from autogen_core import TopicId
+from autogen_core.models import AssistantMessage, ChatCompletionClient, UserMessage
+from autogen_core import CancellationToken, TopicId
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_core.model_context import BufferedChatCompletionContext
+from autogen_core.model_context import UnboundedChatCompletionContext
 
     
 class ClientResponse(BaseModel):
@@ -29,14 +48,43 @@ class ClientResponse(BaseModel):
 @type_subscription(topic_type="client_topic")
 class ClientAgent(RoutedAgent):
     def __init__(self, model_client: ChatCompletionClient, max_round: int, 
-                 max_budget: str, max_time: str):
+                 max_budget: str, max_time: str, decision_rules: bool = True, max_reasks: int = 2,
+                 developer_min_budget: Optional[str] = None, developer_min_time: Optional[str] = None,
+                 compact_prompts: bool = True, prompt_token_budget: int = 200,
+                 predict_deadlock: bool = True, deadlock_confidence: float = 0.9, escalate_margin: float = 0.1,
+                 speculate: bool = False, speculation_candidates: int = 2, speculation_tolerance: float = 0.05,
+                 metrics: Optional[NegotiationMetrics] = None, events: Optional[EventStream] = None,
+                 router: Optional[TopicRouter] = None, cancellation: Optional[SessionCancellation] = None,
+                 descriptions: Optional[DescriptionStore] = None):
         super().__init__("Client")
         self._model_client = model_client
-        self._history: List[LLMMessage] = []
         self._max_round = max_round
         self._max_budget = max_budget
         self._max_time = max_time
+        self._decision_rules = decision_rules
+        self._escalate_margin = escalate_margin
+        self._metrics = metrics or DISABLED_METRICS
+        self._events = events
+        self._router = router or TopicRouter()
+        self._descriptions = descriptions or DescriptionStore()
+        # Shared with the other agent of the session so that both can be stopped at once
+        self._cancellation_token = (
+            cancellation.token(self.id.key) if cancellation is not None else CancellationToken()
+        )
         self._round = 0
+        # Los mínimos del desarrollador solo los usa la predicción de bloqueo, nunca el modelo
+        self._deadlock = (
+            DeadlockPredictor(max_budget, max_time, developer_min_budget, developer_min_time, deadlock_confidence)
+            if predict_deadlock and developer_min_budget is not None and developer_min_time is not None else None
+        )
+        self._prompts = ClientPromptBuilder(max_budget, max_time, prompt_token_budget, compact_prompts)
+        self._max_reasks = max_reasks
+        # Peticiones del desarrollador leídas hasta ahora, para prever la siguiente
+        self._developer_requests: List[Terms] = []
+        self._speculator: Optional[Speculator[ClientResponse]] = (
+            Speculator(speculation_candidates, speculation_tolerance, self._metrics, "client")
+            if speculate else None
+        )
         
         self._system_message = (
             "You are a CLIENT who wants to hire a developer to build a software application. "
@@ -49,124 +97,340 @@ class ClientAgent(RoutedAgent):
             "If the developer's counter-offer is within your limits, you can accept it."
         )
 
+        # One assistant per session: its model context accumulates the real exchange
+        # (our prompts and our own answers), so every round extends a stable prefix
+        self._model_context = UnboundedChatCompletionContext()
+        self._assistant = AssistantAgent(
+            "assistant",
+            model_client=self._model_client,
+            system_message=self._system_message,
+            output_content_type=ClientResponse,
+            model_context=self._model_context,
+        )
+        self._responder = StructuredResponder(
+            self._assistant, self._model_context, ClientResponse, "client", self._metrics, max_reasks
+        )
+
     @message_handler
     async def handle_application_description(self, message: InitialDescription, ctx: MessageContext) -> None:
         """Handles initial application description"""
-        await self._process_negotiation(
-            app_description=message.description,
-            is_initial=True
-        )
+        with self._metrics.measure_handler("client", self.id.key, message):
+            if self._cancellation_token.is_cancelled():
+                return
+            try:
+                self._descriptions.register(self.id.key, message.description)
+                await self._process_negotiation(
+                    app_description=message.description,
+                    is_initial=True
+                )
+            except Exception as error:
+                await self._end_on_error(message.description, 0, error)
+                raise
 
     @message_handler
     async def handle_negotiation_offer(self, message: NegotiationOffer, ctx: MessageContext) -> None:
         """Handles negotiation offers from developer"""
-        
-        if message.iteration_number > self._max_round:
-            print(f"{'='*80}")
-            print(f"MÁXIMO DE ITERACIONES ALCANZADO ({self._max_round})")
-            print(f"ESTADO ACTUAL DE LA NEGOCIACIÓN - ITERACIÓN {message.iteration_number}")
-            print(f"{'='*80}")
-            print(f"Aplicación: {message.application_description}")
-            print(f"Cliente - Tiempo: {message.client_estimated_time}, Presupuesto: {message.client_budget_offer}")
-            print(f"Desarrollador - Tiempo: {message.developer_estimated_time}, Presupuesto: {message.developer_budget_request}")
-            print(f"Condiciones aceptadas: {message.conditions_accepted}")
-            print(f"Último remitente: {message.sender}")
-            print(f"Razonamiento: {message.reasoning}")
-            print(f"{'='*80}")
-            print("NEGOCIACIÓN TERMINADA POR LÍMITE DE ITERACIONES")
-            print(f"{'='*80}")
-            return
-    
-        await self._process_negotiation(
-            app_description=message.application_description,
-            is_initial=False,
-            negotiation_message=message
-        )
+        with self._metrics.measure_handler("client", self.id.key, message):
+            if self._cancellation_token.is_cancelled():
+                return
+            try:
+                app_description = self._descriptions.resolve(message.description_ref)
+                self._developer_requests.append(message.developer)
+                if message.iteration_number > self._max_round:
+                    self._emit(IterationLimitEvent(
+                        session_id=self.id.key,
+                        role="client",
+                        iteration=message.iteration_number,
+                        client_budget=message.client_budget_offer,
+                        client_time=message.client_estimated_time,
+                        developer_budget=message.developer_budget_request,
+                        developer_time=message.developer_estimated_time
+                    ))
+                    await self._publish_result(
+                        FinalAgreement(
+                            application_description=app_description,
+                            agreed_time="",
+                            agreed_budget="",
+                            total_iterations=message.iteration_number,
+                            agreement_reached=False,
+                            reason="max_rounds"
+                        )
+                    )
+                    return
+
+                await self._process_negotiation(
+                    app_description=app_description,
+                    is_initial=False,
+                    negotiation_message=message
+                )
+            except Exception as error:
+                await self._end_on_error(
+                    self._descriptions.get(message.description_ref), message.iteration_number + 1, error
+                )
+                raise
+
+    @message_handler
+    async def handle_final_agreement(self, message: FinalAgreement, ctx: MessageContext) -> None:
+        """The developer ended the negotiation: stop preparing answers to its next request"""
+        self._discard_speculations()
 
     async def _process_negotiation(self, app_description: str, is_initial: bool, 
                                  negotiation_message: NegotiationOffer = None) -> None:
         """Unified method to process both initial and negotiation messages"""
+        iteration = 0 if is_initial else negotiation_message.iteration_number + 1
 
-        print(f"{'='*60}")
-        if is_initial:
-            print(f"Client: Starting negotiation for: {app_description}")
-        else:
-            print(f"Client: Received developer offer")
-            print(f"Developer's time: {negotiation_message.developer_estimated_time}, budget: {negotiation_message.developer_budget_request}")
-        print(f"Client limits - Max time: {self._max_time}, Max budget: {self._max_budget}")
-        print(f"{'='*60}")
-        
-        prompt = self._generate_prompt(app_description, is_initial, negotiation_message)
-        
-        result = await self._get_ai_response(prompt)
+        result = None if is_initial else self._decide_by_rules(negotiation_message)
+        decided_by = "model" if result is None else "rules"
+        if result is None and not is_initial and await self._end_on_predicted_deadlock(negotiation_message):
+            return
+        if result is not None:
+            self._discard_speculations()
+        model_tier = ""
+        if result is None:
+            prompt = self._build_prompt(app_description, is_initial, negotiation_message)
+            result, model_tier = await self._ask_model(prompt, is_initial, negotiation_message)
+            if self._cancellation_token.is_cancelled():
+                return
+            if result is None:
+                await self._end_on_invalid_response(app_description, iteration)
+                return
         
-        self._update_history(result, is_initial)
+        self._update_history(result, is_initial, iteration, decided_by, model_tier)
         
         if not is_initial and result.conditions_accepted:
-            print(f"{'!'*200}")
-            print("¡ACUERDO ALCANZADO!")
-            print(f"{'='*80}")
-            print(f"Aplicación: {app_description}")
-            print(f"Tiempo acordado: {result.time}")
-            print(f"Presupuesto acordado: {result.budget}")
-            print(f"Razonamiento del cliente: {result.reasoning}")
-            print(f"Iteración final: {negotiation_message.iteration_number + 1}")
-            print(f"{'!'*200}")
-            print("NEGOCIACIÓN TERMINADA - CONDICIONES ACEPTADAS")
-            print(f"{'!'*200}")
+            self._emit(AgreementEvent(
+                session_id=self.id.key,
+                role="client",
+                iteration=iteration,
+                budget=result.budget,
+                time=result.time,
+                reasoning=result.reasoning,
+                decided_by=decided_by,
+                model_tier=model_tier
+            ))
+            await self._publish_result(
+                FinalAgreement(
+                    application_description=app_description,
+                    agreed_time=result.time,
+                    agreed_budget=result.budget,
+                    total_iterations=negotiation_message.iteration_number + 1,
+                    agreement_reached=True,
+                    reason="client_accepted"
+                )
+            )
             return  
         
         await self._send_message(app_description, result, is_initial, negotiation_message)
 
-    def _generate_prompt(self, app_description: str, is_initial: bool, 
-                        negotiation_message: NegotiationOffer = None) -> str:
+    def _build_prompt(self, app_description: str, is_initial: bool,
+                      negotiation_message: NegotiationOffer = None) -> Prompt:
         """Generate appropriate prompt based on context"""
-        
         if is_initial:
-            return (
-                f"You want to hire a developer to build this application: {app_description}\n"
-                f"Your maximum budget is {self._max_budget} and maximum timeline is {self._max_time}, "
-                f"but you should start with a lower offer to negotiate a better deal. "
-                f"Make an initial offer of around 50-60% of your maximum budget and a shorter timeline. "
-                f"Explain what you want built and present your initial offer professionally. "
-                f"Do NOT reveal your maximum limits - keep them as your negotiation ceiling."
-            )
+            prompt = self._prompts.initial(app_description)
         else:
-            return (
-                f"You are negotiating for this application: {app_description}\n"
-                f"Your previous offer was: {negotiation_message.client_estimated_time} timeline and {negotiation_message.client_budget_offer} budget.\n"
-                f"The developer has counter-offered: {negotiation_message.developer_estimated_time} timeline and {negotiation_message.developer_budget_request} budget.\n"
-                f"Developer's reasoning: {negotiation_message.reasoning}\n"
-                f"Your maximum budget is {self._max_budget} and maximum timeline is {self._max_time}. "
-                f"Analyze the developer's offer and decide if you should accept it, make a counter-offer, or reject it. "
-                f"You can increase your offer from your previous one, but don't reveal your maximum limits."
+            prompt = self._prompts.counter_offer(app_description, negotiation_message)
+        self._metrics.observe_prompt("client", prompt.tokens, prompt.saved_tokens)
+        return prompt
+
+    async def _ask_model(self, prompt: Prompt, is_initial: bool, negotiation_message: Optional[NegotiationOffer]
+                         ) -> Tuple[Optional[ClientResponse], str]:
+        """The model answer to this turn and the cascade tier that gave it, speculative if one was close enough"""
+        if self._speculator is not None and not is_initial:
+            speculated = await self._speculator.use(
+                self._speculator.detach(), negotiation_message.developer, self._reusable
             )
+            if speculated is not None:
+                # El contexto guarda la oferta real con la respuesta preparada, como si se hubiera pedido ahora
+                result, tier = speculated
+                await self._model_context.add_message(UserMessage(content=prompt.text, source="user"))
+                await self._model_context.add_message(
+                    AssistantMessage(content=result.model_dump_json(), source="assistant")
+                )
+                return result, tier or ""
+        result = await self._responder.ask(
+            prompt.text, self._cancellation_token, self._model_tier(is_initial, negotiation_message)
+        )
+        return result, self._responder.answered_tier or ""
+
+    @staticmethod
+    def _reusable(answer: ClientResponse, request: Terms, predicted: Terms) -> bool:
+        """A prepared answer holds for a close request unless it accepts other terms or offers more than asked"""
+        if answer.conditions_accepted:
+            return close_to(request, predicted, 0.0)
+        offer = Terms.parse(answer.budget, answer.time)
+        return not (offer.currency == request.currency and offer.amount >= request.amount)
 
-    async def _get_ai_response(self, prompt: str) -> ClientResponse:
-        """Get AI response using the unified model"""
-        agent = AssistantAgent(
+    async def _speculative_answer(self, app_description: str, sent: NegotiationOffer, reasoning: str,
+                                  request: Terms, token: CancellationToken
+                                  ) -> Tuple[Optional[ClientResponse], Optional[str]]:
+        """Answer a supposed developer request on a copy of the model context"""
+        supposed = self._supposed_offer(sent, request, reasoning)
+        model_context = UnboundedChatCompletionContext(initial_messages=list(await self._model_context.get_messages()))
+        assistant = AssistantAgent(
             "assistant",
             model_client=self._model_client,
             system_message=self._system_message,
             output_content_type=ClientResponse,
-            model_context=BufferedChatCompletionContext(buffer_size=5),
+            model_context=model_context,
         )
-        
-        result = await agent.run(task=prompt)
-        return get_last_client_response(result.messages)
+        responder = StructuredResponder(
+            assistant, model_context, ClientResponse, "client", self._metrics, self._max_reasks
+        )
+        prompt = self._prompts.counter_offer(app_description, supposed)
+        result = await responder.ask(prompt.text, token, self._model_tier(False, supposed))
+        return result, responder.answered_tier
 
-    def _update_history(self, result: ClientResponse, is_initial: bool) -> None:
-        """Update client history"""
-        action = "initial proposal" if is_initial else "counter-offer"
-        history_message = (
-            f"My {action}: time {result.time}, budget {result.budget}. "
-            f"Conditions accepted: {result.conditions_accepted}. "
-            f"Reasoning: {result.reasoning}"
+    def _model_tier(self, is_initial: bool, negotiation_message: NegotiationOffer = None) -> str:
+        """Cascade tier of a turn: the large model when the request nears our limits or on our last turn"""
+        if is_initial:
+            return SMALL
+        last_turn = negotiation_message.iteration_number + 2 > self._max_round
+        near_limits = near_client_limits(
+            negotiation_message.developer_budget_request,
+            negotiation_message.developer_estimated_time,
+            self._max_budget,
+            self._max_time,
+            self._escalate_margin
         )
-        
-        self._history.append(AssistantMessage(content=history_message, source="client"))
-        print(f"Client presents {action}:\n{history_message}")
+        return LARGE if last_turn or near_limits else SMALL
+
+    def _decide_by_rules(self, negotiation_message: NegotiationOffer) -> Optional[ClientResponse]:
+        """Answer obvious offers without calling the model"""
+        decision = self._rule_decision(negotiation_message)
+        if decision != Decision.ACCEPT:
+            return None
+        self._metrics.observe_rule_decision("client", decision.value)
+
+        return ClientResponse(
+            time=negotiation_message.developer_estimated_time,
+            budget=negotiation_message.developer_budget_request,
+            conditions_accepted=True,
+            reasoning="The developer's request is within my limits, accepted without further negotiation."
+        )
+
+    def _rule_decision(self, negotiation_message: NegotiationOffer) -> Optional[Decision]:
+        if not self._decision_rules:
+            return None
+        # The developer's next offer would arrive after the iteration limit
+        last_turn = negotiation_message.iteration_number + 2 > self._max_round
+        return client_decision(
+            developer_budget=negotiation_message.developer_budget_request,
+            developer_time=negotiation_message.developer_estimated_time,
+            previous_budget=negotiation_message.client_budget_offer,
+            previous_time=negotiation_message.client_estimated_time,
+            max_budget=self._max_budget,
+            max_time=self._max_time,
+            last_turn=last_turn
+        )
+
+    async def _end_on_predicted_deadlock(self, negotiation_message: NegotiationOffer) -> bool:
+        """Stop before calling the model when the gap cannot close in the remaining rounds"""
+        if self._deadlock is None:
+            return False
+        self._deadlock.observe(negotiation_message)
+
+        # This turn and every later one before the iteration limit give each side one more offer
+        remaining_turns = (self._max_round - negotiation_message.iteration_number) // 2 + 1
+        prediction = self._deadlock.predict(remaining_turns)
+        if not self._deadlock.no_deal(prediction):
+            return False
+
+        self._emit(DeadlockPredictedEvent(
+            session_id=self.id.key,
+            role="client",
+            iteration=negotiation_message.iteration_number,
+            client_budget=negotiation_message.client_budget_offer,
+            client_time=negotiation_message.client_estimated_time,
+            developer_budget=negotiation_message.developer_budget_request,
+            developer_time=negotiation_message.developer_estimated_time,
+            deal_probability=prediction.deal_probability
+        ))
+        await self._publish_result(
+            FinalAgreement(
+                application_description=self._descriptions.resolve(negotiation_message.description_ref),
+                agreed_time="",
+                agreed_budget="",
+                total_iterations=negotiation_message.iteration_number,
+                agreement_reached=False,
+                reason="no_deal_predicted"
+            )
+        )
+        return True
+
+    async def _end_on_invalid_response(self, app_description: str, iteration: int) -> None:
+        """Close the session when the model answer could not be recovered"""
+        self._emit(InvalidResponseEvent(
+            session_id=self.id.key,
+            role="client",
+            iteration=iteration,
+            error="the model answer could not be parsed as ClientResponse"
+        ))
+        await self._publish_result(
+            FinalAgreement(
+                application_description=app_description,
+                agreed_time="",
+                agreed_budget="",
+                total_iterations=iteration,
+                agreement_reached=False,
+                reason="invalid_response"
+            )
+        )
+
+    async def _end_on_error(self, app_description: str, iteration: int, error: Exception) -> None:
+        """Close the session when a handler raised, instead of leaving it open until its timeout"""
+        self._emit(HandlerErrorEvent(
+            session_id=self.id.key,
+            role="client",
+            iteration=iteration,
+            error=f"{type(error).__name__}: {error}"
+        ))
+        await self._publish_result(
+            FinalAgreement(
+                application_description=app_description,
+                agreed_time="",
+                agreed_budget="",
+                total_iterations=iteration,
+                agreement_reached=False,
+                reason="error"
+            )
+        )
+
+    def _update_history(self, result: ClientResponse, is_initial: bool, iteration: int, decided_by: str,
+                        model_tier: str = "") -> None:
+        """Report the client turn; the exchange itself lives in the assistant model context"""
         self._round += 1
+        if result.conditions_accepted and not is_initial:
+            return  # reported as an agreement
+
+        event_type = OfferEvent if is_initial else CounterOfferEvent
+        self._emit(event_type(
+            session_id=self.id.key,
+            role="client",
+            iteration=iteration,
+            budget=result.budget,
+            time=result.time,
+            reasoning=result.reasoning,
+            decided_by=decided_by,
+            model_tier=model_tier
+        ))
+
+    async def save_state(self) -> Mapping[str, Any]:
+        """Round counter, the assistant model context and the observed gaps, enough to continue the session"""
+        return {
+            "round": self._round,
+            "model_context": await self._model_context.save_state(),
+            "deadlock": self._deadlock.save_state() if self._deadlock is not None else None,
+        }
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        self._round = state["round"]
+        await self._model_context.load_state(state["model_context"])
+        if self._deadlock is not None and state.get("deadlock") is not None:
+            self._deadlock.load_state(state["deadlock"])
+
+    def _emit(self, event: NegotiationEvent) -> None:
+        if self._events is not None:
+            self._events.emit(event)
 
     async def _send_message(self, app_description: str, result: ClientResponse, 
                           is_initial: bool, negotiation_message: NegotiationOffer = None) -> None:
@@ -174,33 +438,65 @@ class ClientAgent(RoutedAgent):
         
         if is_initial:
             await self.publish_message(
-                ApplicationDescription(
-                    content=app_description,
-                    client_estimated_time=result.time,
-                    client_budget_offer=result.budget
+                ApplicationDescription.from_terms(
+                    description_ref=self._descriptions.register(self.id.key, app_description),
+                    client=Terms.parse(result.budget, result.time)
                 ),
-                topic_id=TopicId(type="developer_topic", source=self.id.key)
+                topic_id=TopicId(type=self._router.topic_for("developer", self.id.key), source=self.id.key)
             )
         else:
+            offer = NegotiationOffer.from_terms(
+                description_ref=negotiation_message.description_ref,
+                client=Terms.parse(result.budget, result.time),
+                developer=negotiation_message.developer,
+                iteration_number=negotiation_message.iteration_number + 1,
+                conditions_accepted=result.conditions_accepted,
+                sender="client",
+                reasoning=result.reasoning
+            )
             await self.publish_message(
-                NegotiationOffer(
-                    application_description=app_description,
-                    client_estimated_time=result.time,
-                    developer_estimated_time=negotiation_message.developer_estimated_time,
-                    client_budget_offer=str(result.budget),
-                    developer_budget_request=negotiation_message.developer_budget_request,
-                    iteration_number=negotiation_message.iteration_number + 1,
-                    conditions_accepted=result.conditions_accepted,
-                    sender="client",
-                    reasoning=result.reasoning
-                ),
-                topic_id=TopicId(type="developer_topic", source=self.id.key)
+                offer,
+                topic_id=TopicId(type=self._router.topic_for("developer", self.id.key), source=self.id.key)
             )
+            self._speculate(app_description, offer, negotiation_message.reasoning)
+
+    def _discard_speculations(self) -> None:
+        """The turn was decided without the model or the session ended: the answers prepared are not needed"""
+        if self._speculator is not None:
+            self._speculator.discard(self._speculator.detach())
+
+    def _speculate(self, app_description: str, sent: NegotiationOffer, reasoning: str) -> None:
+        """While the developer answers `sent`, prepare our answers to its most probable requests"""
+        # Su respuesta llegaría pasado el límite de iteraciones y no se le contestaría
+        if self._speculator is None or sent.iteration_number + 1 > self._max_round:
+            return
 
+        self._speculator.start(
+            partial(self._speculative_answer, app_description, sent, reasoning),
+            self._developer_requests,
+            self._cancellation_token,
+            get_idle_slots(self._model_client),
+            # Las reglas ya contestan sin el modelo a esas peticiones
+            skip=lambda request: self._rule_decision(self._supposed_offer(sent, request, reasoning)) == Decision.ACCEPT
+        )
+
+    @staticmethod
+    def _supposed_offer(sent: NegotiationOffer, request: Terms, reasoning: str) -> NegotiationOffer:
+        """The developer's answer to `sent` if it asked for `request`, with its last reasoning"""
+        return NegotiationOffer.from_terms(
+            description_ref=sent.description_ref,
+            client=sent.client,
+            developer=request,
+            iteration_number=sent.iteration_number + 1,
+            conditions_accepted=False,
+            sender="developer",
+            reasoning=reasoning
+        )
 
-def get_last_client_response(messages: List) -> ClientResponse:
-    """Extract the last ClientResponse from the messages"""
-    for msg in reversed(messages):
-        if hasattr(msg, 'content') and isinstance(msg.content, ClientResponse):
-            return msg.content
-    return None
+    async def _publish_result(self, agreement: FinalAgreement) -> None:
+        """Publish the outcome of the negotiation for result collectors"""
+        self._discard_speculations()
+        await self.publish_message(
+            agreement,
+            topic_id=TopicId(type="result_topic", source=self.id.key)
+        )
@@ -0,0 +1,127 @@
+import math
+import statistics
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from models.interfaces import NegotiationOffer, Terms
+from models.units import Money, comparable, parse_duration_days, parse_money
+
+# Predicción de bloqueo: en su último turno el cliente acepta cualquier petición
+# dentro de sus límites y el desarrollador cualquier oferta que alcance sus mínimos,
+# así que la distancia entre las ofertas se cierra cuando la petición del
+# desarrollador baja hasta los límites del cliente o cuando la oferta del cliente
+# sube hasta los mínimos del desarrollador. Se proyecta cada camino con el ritmo de
+# concesiones de esa parte; si los límites del cliente no alcanzan los mínimos del
+# desarrollador no hay acuerdo posible. Como las reglas, si algún valor no se puede
+# interpretar no predice nada.
+
+# Ninguna concesión por turno se da por conocida con más precisión que esta fracción
+# de la distancia que queda: sin ella, una parte que mantiene su oferta en los
+# turnos observados daría probabilidad 0 fuese cual fuese deadlock_confidence
+_MIN_DEVIATION = 0.05
+
+
+@dataclass
+class DeadlockPrediction:
+    deal_probability: float
+    budget_gap: float  # lo que pide el desarrollador por encima de lo que ofrece el cliente
+    time_gap: float  # días que pide el desarrollador por encima de los que ofrece el cliente
+    remaining_turns: int
+
+
+class DeadlockPredictor:
+    """Project whether the client's offer and the developer's request can meet in time.
+
+    Every offer the client reads records both sides' budget and time. A deal
+    needs the developer's request to come down to the client's maximums or the
+    client's offer to come up to the developer's minimums, and neither can happen
+    unless the maximums reach the minimums. The concession per turn of each side is
+    modelled as a normal variable estimated from the observed turns; the deal
+    probability is the chance that either side closes its distance in the
+    remaining turns. Nothing is predicted before `min_rounds` concessions have
+    been observed.
+    """
+
+    def __init__(self, max_budget: str, max_time: str, min_budget: str, min_time: str,
+                 confidence: float = 0.9, min_rounds: int = 2):
+        self._max_budget, self._max_days = parse_money(max_budget), parse_duration_days(max_time)
+        self._min_budget, self._min_days = parse_money(min_budget), parse_duration_days(min_time)
+        self._confidence = confidence
+        self._min_rounds = min_rounds
+        self._client: List[List[float]] = []  # [presupuesto, días] ofrecidos por el cliente
+        self._developer: List[List[float]] = []  # [presupuesto, días] pedidos por el desarrollador
+        self._unparsable = (
+            not comparable(self._max_budget, self._min_budget) or self._max_days is None or self._min_days is None
+        )
+
+    def observe(self, message: NegotiationOffer) -> None:
+        client, developer = self._read(message.client), self._read(message.developer)
+        if self._unparsable or client is None or developer is None:
+            self._unparsable = True
+            return
+        self._client.append(client)
+        self._developer.append(developer)
+
+    def _read(self, terms: Terms) -> Optional[List[float]]:
+        budget = Money(terms.amount, terms.currency or None) if not math.isnan(terms.amount) else None
+        if not comparable(budget, self._max_budget) or not comparable(budget, self._min_budget) \
+                or math.isnan(terms.days):
+            return None
+        return [budget.amount, terms.days]
+
+    def predict(self, remaining_turns: int) -> Optional[DeadlockPrediction]:
+        """Deal probability within the `remaining_turns` of each side, None if unknown"""
+        if self._unparsable or len(self._developer) < self._min_rounds + 1:
+            return None
+        if self._max_budget.amount < self._min_budget.amount or self._max_days < self._min_days:
+            deal_probability = 0.0
+        else:
+            # Distancias que le quedan a cada parte hasta los límites de la otra
+            developer_probability = (
+                _closure_probability([budget - self._max_budget.amount for budget, _ in self._developer],
+                                     remaining_turns)
+                * _closure_probability([days - self._max_days for _, days in self._developer], remaining_turns)
+            )
+            client_probability = (
+                _closure_probability([self._min_budget.amount - budget for budget, _ in self._client],
+                                     remaining_turns)
+                * _closure_probability([self._min_days - days for _, days in self._client], remaining_turns)
+            )
+            deal_probability = 1 - (1 - developer_probability) * (1 - client_probability)
+        return DeadlockPrediction(
+            deal_probability=deal_probability,
+            budget_gap=self._developer[-1][0] - self._client[-1][0],
+            time_gap=self._developer[-1][1] - self._client[-1][1],
+            remaining_turns=remaining_turns
+        )
+
+    def no_deal(self, prediction: Optional[DeadlockPrediction]) -> bool:
+        return prediction is not None and prediction.deal_probability < 1 - self._confidence
+
+    def save_state(self) -> Dict[str, Any]:
+        return {"client": self._client, "developer": self._developer, "unparsable": self._unparsable}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._client = [list(terms) for terms in state["client"]]
+        self._developer = [list(terms) for terms in state["developer"]]
+        self._unparsable = state["unparsable"]
+
+
+def _closure_probability(gaps: List[float], remaining_turns: int) -> float:
+    gap = gaps[-1]
+    if gap <= 0:
+        return 1.0
+    if remaining_turns <= 0:
+        return 0.0
+    concessions = [earlier - later for earlier, later in zip(gaps, gaps[1:])]
+    mean = statistics.fmean(concessions)
+    deviation = statistics.stdev(concessions) if len(concessions) > 1 else 0.0
+    deviation = max(deviation, _MIN_DEVIATION * gap)
+
+    # Una parte que acelera sus concesiones (las deja para el final) cerraría más de lo
+    # que dice la media: se toma la mayor de las dos proyecciones
+    growth = concessions[-1] / concessions[-2] if len(concessions) > 1 and min(concessions[-2:]) > 0 else 0.0
+    accelerating = sum(concessions[-1] * growth ** turn for turn in range(1, remaining_turns + 1))
+    expected = max(mean * remaining_turns, accelerating)
+    spread = deviation * math.sqrt(remaining_turns)
+    return 1 - statistics.NormalDist(expected, spread).cdf(gap)
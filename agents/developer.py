@@ -1,5 +1,23 @@
-from typing import List
-from models.interfaces import ApplicationDescription, NegotiationOffer
+from typing import Any, Mapping, Optional
+from agents.cancellation import SessionCancellation
+from agents.prompts import DeveloperPromptBuilder, Prompt
+from agents.rules import Decision, developer_decision, near_developer_limits
+from agents.structured_output import StructuredResponder
+from clients.cascade import LARGE, SMALL
+from event_stream import EventStream
+from metrics import DISABLED_METRICS, NegotiationMetrics
+from models.events import (
+    AgreementEvent,
+    CounterOfferEvent,
+    HandlerErrorEvent,
+    InvalidResponseEvent,
+    NegotiationEvent,
+    OfferEvent,
+    RejectionEvent,
+)
+from models.descriptions import DescriptionStore
+from models.interfaces import ApplicationDescription, FinalAgreement, NegotiationOffer, Terms
+from models.topics import TopicRouter
 from pydantic import BaseModel
 from autogen_core import (
     MessageContext,
@@ -7,14 +25,10 @@ from autogen_core import (
     message_handler,
     type_subscription
 )
-from autogen_core.models import (
-    AssistantMessage,
-    ChatCompletionClient,
-    LLMMessage,
-)
-from autogen_core import TopicId
+from autogen_core.models import ChatCompletionClient
+from autogen_core import CancellationToken, TopicId
 from autogen_agentchat.agents import AssistantAgent
-from autogen_core.model_context import BufferedChatCompletionContext
+from autogen_core.model_context import UnboundedChatCompletionContext
 
 # Modelo unificado - eliminamos DeveloperNegotiationResponse
 class DeveloperResponse(BaseModel):
@@ -25,13 +39,29 @@ class DeveloperResponse(BaseModel):
 
 @type_subscription(topic_type="developer_topic")
 class DeveloperAgent(RoutedAgent):
-    def __init__(self, model_client: ChatCompletionClient, min_budget: str, min_time: str):
+    def __init__(self, model_client: ChatCompletionClient, min_budget: str, min_time: str,
+                 max_round: Optional[int] = None, decision_rules: bool = True, max_reasks: int = 2,
+                 compact_prompts: bool = True, prompt_token_budget: int = 200, escalate_margin: float = 0.1,
+                 metrics: Optional[NegotiationMetrics] = None, events: Optional[EventStream] = None,
+                 router: Optional[TopicRouter] = None, cancellation: Optional[SessionCancellation] = None,
+                 descriptions: Optional[DescriptionStore] = None):
         super().__init__("Developer")
         self._model_client = model_client
-        self._history: List[LLMMessage] = []
         self._min_budget = min_budget
         self._min_time = min_time
+        self._max_round = max_round
+        self._escalate_margin = escalate_margin
+        self._decision_rules = decision_rules
+        self._metrics = metrics or DISABLED_METRICS
+        self._events = events
+        self._router = router or TopicRouter()
+        self._descriptions = descriptions or DescriptionStore()
+        # Shared with the other agent of the session so that both can be stopped at once
+        self._cancellation_token = (
+            cancellation.token(self.id.key) if cancellation is not None else CancellationToken()
+        )
         self._round = 0
+        self._prompts = DeveloperPromptBuilder(min_budget, min_time, prompt_token_budget, compact_prompts)
         
         self._system_message = (
             "You are a DEVELOPER who wants to maximize your profit and time for a software project. "
@@ -45,160 +75,275 @@ class DeveloperAgent(RoutedAgent):
             "You can gradually reduce your requests if the client pushes back, but never go below your minimums."
         )
 
+        # Same assistant for the whole session, see ClientAgent
+        self._model_context = UnboundedChatCompletionContext()
+        self._assistant = AssistantAgent(
+            "assistant",
+            model_client=self._model_client,
+            system_message=self._system_message,
+            output_content_type=DeveloperResponse,
+            model_context=self._model_context,
+        )
+        self._responder = StructuredResponder(
+            self._assistant, self._model_context, DeveloperResponse, "developer", self._metrics, max_reasks
+        )
+
     @message_handler
     async def handle_application_description(self, message: ApplicationDescription, ctx: MessageContext) -> None:
         """Handles the initial application description"""
-        await self._process_negotiation(
-            app_description=message.content,
-            client_time=message.client_estimated_time,
-            client_budget=message.client_budget_offer,
-            iteration_number=1,
-            is_initial=True,
-            previous_dev_time=None,
-            previous_dev_budget=None,
-            client_reasoning=None
-        )
+        with self._metrics.measure_handler("developer", self.id.key, message):
+            if self._cancellation_token.is_cancelled():
+                return
+            try:
+                await self._process_negotiation(
+                    app_description=self._descriptions.resolve(message.description_ref),
+                    client_time=message.client_estimated_time,
+                    client_budget=message.client_budget_offer,
+                    iteration_number=1,
+                    is_initial=True,
+                    previous_dev_time=None,
+                    previous_dev_budget=None,
+                    client_reasoning=None
+                )
+            except Exception as error:
+                await self._end_on_error(self._descriptions.get(message.description_ref), 1, error)
+                raise
 
     @message_handler
     async def handle_negotiation_offer(self, message: NegotiationOffer, ctx: MessageContext) -> None:
         """Handles negotiation offers from client"""
-        await self._process_negotiation(
-            app_description=message.application_description,
-            client_time=message.client_estimated_time,
-            client_budget=message.client_budget_offer,
-            iteration_number=message.iteration_number + 1,
-            is_initial=False,
-            previous_dev_time=message.developer_estimated_time,
-            previous_dev_budget=message.developer_budget_request,
-            client_reasoning=message.reasoning
-        )
+        with self._metrics.measure_handler("developer", self.id.key, message):
+            if self._cancellation_token.is_cancelled():
+                return
+            try:
+                await self._process_negotiation(
+                    app_description=self._descriptions.resolve(message.description_ref),
+                    client_time=message.client_estimated_time,
+                    client_budget=message.client_budget_offer,
+                    iteration_number=message.iteration_number + 1,
+                    is_initial=False,
+                    previous_dev_time=message.developer_estimated_time,
+                    previous_dev_budget=message.developer_budget_request,
+                    client_reasoning=message.reasoning
+                )
+            except Exception as error:
+                await self._end_on_error(
+                    self._descriptions.get(message.description_ref), message.iteration_number + 1, error
+                )
+                raise
 
     async def _process_negotiation(self, app_description: str, client_time: str, client_budget: str, 
                                  iteration_number: int, is_initial: bool, previous_dev_time: str = None, 
                                  previous_dev_budget: str = None, client_reasoning: str = None) -> None:
         """Unified method to process both initial and negotiation messages"""
-        
-        # Print status        print(f"{'='*60}")
-        print(f"Developer: {'Received initial application' if is_initial else 'Received negotiation offer'}")
-        print(f"Application: {app_description}")
-        print(f"Client's time: {client_time}, budget: {client_budget}")
-        if not is_initial:
-            print(f"Previous dev offer - Time: {previous_dev_time}, Budget: {previous_dev_budget}")
-        print(f"Developer limits - Min time: {self._min_time}, Min budget: {self._min_budget}")
-        print(f"{'='*60}")
-        
-
-        prompt = self._generate_prompt(
-            app_description, client_time, client_budget, is_initial, 
-            previous_dev_time, previous_dev_budget, client_reasoning
+        decision = self._decide_by_rules(
+            client_time, client_budget, iteration_number, previous_dev_time, previous_dev_budget
         )
-        
+        decided_by = "model" if decision is None else "rules"
+        if decision == Decision.REJECT:
+            self._emit(RejectionEvent(
+                session_id=self.id.key,
+                role="developer",
+                iteration=iteration_number,
+                budget=client_budget,
+                time=client_time
+            ))
+            await self._publish_result(
+                FinalAgreement(
+                    application_description=app_description,
+                    agreed_time="",
+                    agreed_budget="",
+                    total_iterations=iteration_number,
+                    agreement_reached=False,
+                    reason="developer_rejected"
+                )
+            )
+            return
 
-        result = await self._get_ai_response(prompt)
+        if decision == Decision.ACCEPT:
+            result = DeveloperResponse(
+                developer_estimated_time=client_time,
+                developer_budget_request=client_budget,
+                conditions_accepted=True,
+                reasoning="The client's offer meets my requirements, accepted without further negotiation."
+            )
+        else:
+            prompt = self._build_prompt(
+                app_description, client_time, client_budget, is_initial, 
+                previous_dev_time, previous_dev_budget, client_reasoning
+            )
+            result = await self._responder.ask(
+                prompt.text, self._cancellation_token, self._model_tier(client_time, client_budget, iteration_number)
+            )
+            if self._cancellation_token.is_cancelled():
+                return
+            if result is None:
+                self._emit(InvalidResponseEvent(
+                    session_id=self.id.key,
+                    role="developer",
+                    iteration=iteration_number,
+                    error="the model answer could not be parsed as DeveloperResponse"
+                ))
+                await self._publish_result(
+                    FinalAgreement(
+                        application_description=app_description,
+                        agreed_time="",
+                        agreed_budget="",
+                        total_iterations=iteration_number,
+                        agreement_reached=False,
+                        reason="invalid_response"
+                    )
+                )
+                return
         
 
+        model_tier = (self._responder.answered_tier or "") if decided_by == "model" else ""
         negotiation_offer = self._create_negotiation_offer(
             app_description, client_time, client_budget, result, iteration_number
         )
         
         if not is_initial and result.conditions_accepted:
-            print(f"{'!'*200}")
-            print("¡ACUERDO ALCANZADO!")
-            print(f"{'!'*200}")
-            print(f"Aplicación: {app_description}")
-            print(f"Tiempo acordado: {result.developer_estimated_time}")
-            print(f"Presupuesto acordado: {result.developer_budget_request}")
-            print(f"Razonamiento del desarrollador: {result.reasoning}")
-            print(f"Oferta final del cliente - Tiempo: {client_time}, Presupuesto: {client_budget}")
-            print(f"Iteración final: {iteration_number}")
-            print(f"{'!'*200}")
-            print("NEGOCIACIÓN TERMINADA - DESARROLLADOR ACEPTA CONDICIONES DEL CLIENTE")
-            print(f"{'!'*200}")
+            self._emit(AgreementEvent(
+                session_id=self.id.key,
+                role="developer",
+                iteration=iteration_number,
+                budget=result.developer_budget_request,
+                time=result.developer_estimated_time,
+                reasoning=result.reasoning,
+                decided_by=decided_by,
+                model_tier=model_tier
+            ))
+            await self._publish_result(
+                FinalAgreement(
+                    application_description=app_description,
+                    agreed_time=result.developer_estimated_time,
+                    agreed_budget=result.developer_budget_request,
+                    total_iterations=iteration_number,
+                    agreement_reached=True,
+                    reason="developer_accepted"
+                )
+            )
             return  
 
-        await self._finalize_response(result, negotiation_offer, is_initial)
+        await self._finalize_response(result, negotiation_offer, is_initial, decided_by, model_tier)
+
+    async def _end_on_error(self, app_description: str, iteration: int, error: Exception) -> None:
+        """Close the session when a handler raised, instead of leaving it open until its timeout"""
+        self._emit(HandlerErrorEvent(
+            session_id=self.id.key,
+            role="developer",
+            iteration=iteration,
+            error=f"{type(error).__name__}: {error}"
+        ))
+        await self._publish_result(
+            FinalAgreement(
+                application_description=app_description,
+                agreed_time="",
+                agreed_budget="",
+                total_iterations=iteration,
+                agreement_reached=False,
+                reason="error"
+            )
+        )
+
+    async def _publish_result(self, agreement: FinalAgreement) -> None:
+        """Publish the outcome for result collectors and tell the client, which may be speculating"""
+        await self.publish_message(
+            agreement,
+            topic_id=TopicId(type=self._router.topic_for("client", self.id.key), source=self.id.key)
+        )
+        await self.publish_message(
+            agreement,
+            topic_id=TopicId(type="result_topic", source=self.id.key)
+        )
 
-    def _generate_prompt(self, app_description: str, client_time: str, client_budget: str, 
-                        is_initial: bool, previous_dev_time: str = None, 
-                        previous_dev_budget: str = None, client_reasoning: str = None) -> str:
+    def _build_prompt(self, app_description: str, client_time: str, client_budget: str, 
+                      is_initial: bool, previous_dev_time: str = None, 
+                      previous_dev_budget: str = None, client_reasoning: str = None) -> Prompt:
         """Generate appropriate prompt based on context"""
-        
         if is_initial:
-            return (
-                f"You have received a client request to develop the following application: {app_description}\n"
-                f"The client estimates a timeline of {client_time} and offers a budget of {client_budget}.\n"
-                f"Your minimum acceptable budget is {self._min_budget} and minimum acceptable time is {self._min_time}. "
-                f"However, you want to maximize your profit and time, so propose significantly higher amounts. "
-                f"Request around 150-200% of your minimum budget and a longer timeline than your minimum. "
-                f"Provide professional technical reasoning for why you need more time and budget. "
-                f"Do NOT reveal your minimum limits - keep them as your negotiation floor. "
-                f"If the client's offer meets or exceeds your targets, you can accept it."
-            )
+            prompt = self._prompts.initial(app_description, client_time, client_budget)
         else:
-            return (
-                f"You are negotiating for this application: {app_description}\n"
-                f"Your previous offer was: {previous_dev_time} timeline and {previous_dev_budget} budget.\n"
-                f"The client has counter-offered: {client_time} timeline and {client_budget} budget.\n"
-                f"Client's reasoning: {client_reasoning}\n"
-                f"Your minimum acceptable budget is {self._min_budget} and minimum acceptable time is {self._min_time}. "
-                f"Analyze the client's offer and decide if you should:\n"
-                f"1. Accept it (if it meets or exceeds your minimums)\n"
-                f"2. Make a counter-offer (reduce your previous offer but stay above minimums)\n"
-                f"3. Reject it (if it's below your minimums)\n"
-                f"Be strategic - you can reduce your offer from your previous one, but never go below your minimum limits."
+            prompt = self._prompts.counter_offer(
+                app_description, client_time, client_budget,
+                previous_dev_time, previous_dev_budget, client_reasoning
             )
+        self._metrics.observe_prompt("developer", prompt.tokens, prompt.saved_tokens)
+        return prompt
 
-    async def _get_ai_response(self, prompt: str) -> DeveloperResponse:
-        """Get AI response using the unified model"""
-        agent = AssistantAgent(
-            "assistant",
-            model_client=self._model_client,
-            system_message=self._system_message,
-            output_content_type=DeveloperResponse,
-            model_context=BufferedChatCompletionContext(buffer_size=5),
+    def _model_tier(self, client_time: str, client_budget: str, iteration_number: int) -> str:
+        """Cascade tier of a turn: the large model when the offer nears our minimums or on our last turn"""
+        last_turn = self._max_round is not None and iteration_number > self._max_round
+        near_limits = near_developer_limits(
+            client_budget, client_time, self._min_budget, self._min_time, self._escalate_margin
         )
-        
-        result = await agent.run(task=prompt)
-        return get_last_developer_response(result.messages)
+        return LARGE if last_turn or near_limits else SMALL
+
+    def _decide_by_rules(self, client_time: str, client_budget: str, iteration_number: int,
+                         previous_dev_time: Optional[str], previous_dev_budget: Optional[str]) -> Optional[Decision]:
+        """Decide obvious offers without calling the model"""
+        if not self._decision_rules:
+            return None
+
+        # The client stops reading offers past the iteration limit
+        last_turn = self._max_round is not None and iteration_number > self._max_round
+        decision = developer_decision(
+            client_budget=client_budget,
+            client_time=client_time,
+            previous_budget=previous_dev_budget,
+            previous_time=previous_dev_time,
+            min_budget=self._min_budget,
+            min_time=self._min_time,
+            last_turn=last_turn
+        )
+        if decision is not None:
+            self._metrics.observe_rule_decision("developer", decision.value)
+        return decision
+
+    async def save_state(self) -> Mapping[str, Any]:
+        """Round counter and the assistant model context, enough to continue the session"""
+        return {"round": self._round, "model_context": await self._model_context.save_state()}
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        self._round = state["round"]
+        await self._model_context.load_state(state["model_context"])
+
+    def _emit(self, event: NegotiationEvent) -> None:
+        if self._events is not None:
+            self._events.emit(event)
 
     def _create_negotiation_offer(self, app_description: str, client_time: str, 
                                 client_budget: str, result: DeveloperResponse, 
                                 iteration_number: int) -> NegotiationOffer:
         """Create NegotiationOffer object"""
-        return NegotiationOffer(
-            application_description=app_description,
-            client_estimated_time=client_time,
-            developer_estimated_time=result.developer_estimated_time,
-            client_budget_offer=client_budget,
-            developer_budget_request=result.developer_budget_request,
+        return NegotiationOffer.from_terms(
+            description_ref=self._descriptions.register(self.id.key, app_description),
+            client=Terms.parse(client_budget, client_time),
+            developer=Terms.parse(result.developer_budget_request, result.developer_estimated_time),
             iteration_number=iteration_number,
             conditions_accepted=result.conditions_accepted,
             sender="developer",
             reasoning=result.reasoning
         )
 
-    async def _finalize_response(self, result: DeveloperResponse, 
-                               negotiation_offer: NegotiationOffer, is_initial: bool) -> None:
-        """Update history and send message"""
-        history_message = (
-            f"Developer's {'initial' if is_initial else 'counter-'}offer: "
-            f"time {result.developer_estimated_time}, budget {result.developer_budget_request}. "
-            f"Conditions accepted: {result.conditions_accepted}. Reasoning: {result.reasoning}"
-        )
-        
-        self._history.append(AssistantMessage(content=history_message, source="developer"))
-        print(f"Developer presents {'initial' if is_initial else 'counter-'}offer:\n{history_message}")
+    async def _finalize_response(self, result: DeveloperResponse, negotiation_offer: NegotiationOffer,
+                               is_initial: bool, decided_by: str, model_tier: str = "") -> None:
+        """Report the developer turn and send message"""
+        event_type = OfferEvent if is_initial else CounterOfferEvent
+        self._emit(event_type(
+            session_id=self.id.key,
+            role="developer",
+            iteration=negotiation_offer.iteration_number,
+            budget=result.developer_budget_request,
+            time=result.developer_estimated_time,
+            reasoning=result.reasoning,
+            decided_by=decided_by,
+            model_tier=model_tier
+        ))
         
         self._round += 1
         
         await self.publish_message(
             negotiation_offer,
-            topic_id=TopicId(type="client_topic", source=self.id.key)
+            topic_id=TopicId(type=self._router.topic_for("client", self.id.key), source=self.id.key)
         )
-
-def get_last_developer_response(messages: List) -> DeveloperResponse:
-    """Extract the last DeveloperResponse from the messages"""
-    for msg in reversed(messages):
-        if hasattr(msg, 'content') and isinstance(msg.content, DeveloperResponse):
-            return msg.content
-    return None
@@ -0,0 +1,156 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from models.interfaces import NegotiationOffer
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class Prompt:
+    text: str
+    tokens: int
+    saved_tokens: int = 0  # frente al prompt completo que se enviaba antes en cada ronda
+
+
+def estimate_tokens(text: str) -> int:
+    # Aproximación habitual de cuatro caracteres por token, como ScriptedChatCompletionClient
+    return (len(text) + 3) // 4
+
+
+def truncate_reasoning(text: Optional[str], max_tokens: int) -> str:
+    """Keep the leading sentences of `text` that fit in `max_tokens`"""
+    text = _WHITESPACE.sub(" ", text or "").strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    max_chars = max(0, max_tokens * 4 - 4)
+    kept = ""
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f"{kept} {sentence}".strip()
+        if len(candidate) > max_chars:
+            break
+        kept = candidate
+    if not kept:
+        kept = text[:max_chars].rsplit(" ", 1)[0]
+    return f"{kept} ..." if kept else ""
+
+
+class ClientPromptBuilder:
+    """Client prompts: full context on the first turn, compact deltas afterwards.
+
+    The assistant keeps the whole exchange in its model context and the limits
+    are in the system message, so later rounds only carry the developer's new
+    offer and a reasoning trimmed to fit `token_budget`.
+    """
+
+    def __init__(self, max_budget: str, max_time: str, token_budget: int = 200, compact: bool = True):
+        self._max_budget = max_budget
+        self._max_time = max_time
+        self._token_budget = token_budget
+        self._compact = compact
+
+    def initial(self, app_description: str) -> Prompt:
+        text = (
+            f"You want to hire a developer to build this application: {app_description}\n"
+            f"Your maximum budget is {self._max_budget} and maximum timeline is {self._max_time}, "
+            f"but you should start with a lower offer to negotiate a better deal. "
+            f"Make an initial offer of around 50-60% of your maximum budget and a shorter timeline. "
+            f"Explain what you want built and present your initial offer professionally. "
+            f"Do NOT reveal your maximum limits - keep them as your negotiation ceiling."
+        )
+        return Prompt(text, estimate_tokens(text))
+
+    def counter_offer(self, app_description: str, message: NegotiationOffer) -> Prompt:
+        full = self._full_counter_offer(app_description, message)
+        if not self._compact:
+            return Prompt(full, estimate_tokens(full))
+
+        offer = (
+            f"The developer has counter-offered: {message.developer_estimated_time} timeline "
+            f"and {message.developer_budget_request} budget.\n"
+        )
+        instructions = (
+            "Accept it if it is within your limits; otherwise make a counter-offer, "
+            "raising your previous one if needed, without revealing your limits."
+        )
+        text = _with_reasoning(offer, "Developer's reasoning", message.reasoning, instructions, self._token_budget)
+        tokens = estimate_tokens(text)
+        return Prompt(text, tokens, max(0, estimate_tokens(full) - tokens))
+
+    def _full_counter_offer(self, app_description: str, message: NegotiationOffer) -> str:
+        return (
+            f"You are negotiating for this application: {app_description}\n"
+            f"Your previous offer was: {message.client_estimated_time} timeline and {message.client_budget_offer} budget.\n"
+            f"The developer has counter-offered: {message.developer_estimated_time} timeline and {message.developer_budget_request} budget.\n"
+            f"Developer's reasoning: {message.reasoning}\n"
+            f"Your maximum budget is {self._max_budget} and maximum timeline is {self._max_time}. "
+            f"Analyze the developer's offer and decide if you should accept it, make a counter-offer, or reject it. "
+            f"You can increase your offer from your previous one, but don't reveal your maximum limits."
+        )
+
+
+class DeveloperPromptBuilder:
+    """Developer prompts, see ClientPromptBuilder"""
+
+    def __init__(self, min_budget: str, min_time: str, token_budget: int = 200, compact: bool = True):
+        self._min_budget = min_budget
+        self._min_time = min_time
+        self._token_budget = token_budget
+        self._compact = compact
+
+    def initial(self, app_description: str, client_time: str, client_budget: str) -> Prompt:
+        text = (
+            f"You have received a client request to develop the following application: {app_description}\n"
+            f"The client estimates a timeline of {client_time} and offers a budget of {client_budget}.\n"
+            f"Your minimum acceptable budget is {self._min_budget} and minimum acceptable time is {self._min_time}. "
+            f"However, you want to maximize your profit and time, so propose significantly higher amounts. "
+            f"Request around 150-200% of your minimum budget and a longer timeline than your minimum. "
+            f"Provide professional technical reasoning for why you need more time and budget. "
+            f"Do NOT reveal your minimum limits - keep them as your negotiation floor. "
+            f"If the client's offer meets or exceeds your targets, you can accept it."
+        )
+        return Prompt(text, estimate_tokens(text))
+
+    def counter_offer(self, app_description: str, client_time: str, client_budget: str,
+                      previous_dev_time: str, previous_dev_budget: str, client_reasoning: str) -> Prompt:
+        full = self._full_counter_offer(
+            app_description, client_time, client_budget, previous_dev_time, previous_dev_budget, client_reasoning
+        )
+        if not self._compact:
+            return Prompt(full, estimate_tokens(full))
+
+        offer = f"The client has counter-offered: {client_time} timeline and {client_budget} budget.\n"
+        instructions = (
+            "Accept it if it meets your minimums; otherwise make a counter-offer, "
+            "reducing your previous request but never below your minimums."
+        )
+        text = _with_reasoning(offer, "Client's reasoning", client_reasoning, instructions, self._token_budget)
+        tokens = estimate_tokens(text)
+        return Prompt(text, tokens, max(0, estimate_tokens(full) - tokens))
+
+    def _full_counter_offer(self, app_description: str, client_time: str, client_budget: str,
+                            previous_dev_time: str, previous_dev_budget: str, client_reasoning: str) -> str:
+        return (
+            f"You are negotiating for this application: {app_description}\n"
+            f"Your previous offer was: {previous_dev_time} timeline and {previous_dev_budget} budget.\n"
+            f"The client has counter-offered: {client_time} timeline and {client_budget} budget.\n"
+            f"Client's reasoning: {client_reasoning}\n"
+            f"Your minimum acceptable budget is {self._min_budget} and minimum acceptable time is {self._min_time}. "
+            f"Analyze the client's offer and decide if you should:\n"
+            f"1. Accept it (if it meets or exceeds your minimums)\n"
+            f"2. Make a counter-offer (reduce your previous offer but stay above minimums)\n"
+            f"3. Reject it (if it's below your minimums)\n"
+            f"Be strategic - you can reduce your offer from your previous one, but never go below your minimum limits."
+        )
+
+
+def _with_reasoning(offer: str, label: str, reasoning: Optional[str], instructions: str, token_budget: int) -> str:
+    """Fill what is left of the token budget with the counterpart's reasoning"""
+    remaining = token_budget - estimate_tokens(offer + instructions) - estimate_tokens(f"{label}: \n")
+    reasoning = truncate_reasoning(reasoning, remaining) if remaining > 0 else ""
+    if not reasoning:
+        return offer + instructions
+    return f"{offer}{label}: {reasoning}\n{instructions}"
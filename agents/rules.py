@@ -0,0 +1,87 @@
+from enum import Enum
+from typing import Optional
+
+from models.units import comparable, parse_duration_days, parse_money
+
+# Capa de reglas deterministas: decide sin llamar al modelo las ofertas cuyo
+# resultado es evidente. Si algún valor no se puede interpretar devuelve None
+# y la decisión queda en manos del LLM.
+
+
+class Decision(Enum):
+    ACCEPT = "accept"
+    REJECT = "reject"
+
+
+def _at_most(budget: str, time: str, budget_limit: str, time_limit: str) -> Optional[bool]:
+    """True if budget and time are both within the limits, None if undecidable"""
+    offer, limit = parse_money(budget), parse_money(budget_limit)
+    days, limit_days = parse_duration_days(time), parse_duration_days(time_limit)
+    if not comparable(offer, limit) or days is None or limit_days is None:
+        return None
+    return offer.amount <= limit.amount and days <= limit_days
+
+
+def _at_least(budget: str, time: str, budget_limit: str, time_limit: str) -> Optional[bool]:
+    """True if budget and time both reach the limits, None if undecidable"""
+    offer, limit = parse_money(budget), parse_money(budget_limit)
+    days, limit_days = parse_duration_days(time), parse_duration_days(time_limit)
+    if not comparable(offer, limit) or days is None or limit_days is None:
+        return None
+    return offer.amount >= limit.amount and days >= limit_days
+
+
+def client_decision(developer_budget: str, developer_time: str,
+                    previous_budget: str, previous_time: str,
+                    max_budget: str, max_time: str, last_turn: bool) -> Optional[Decision]:
+    """Decide a developer offer without the model when the answer is obvious.
+
+    The client accepts a request that matches or improves its own previous offer,
+    and on its last turn any request within its limits rather than risk no deal.
+    """
+    within_limits = _at_most(developer_budget, developer_time, max_budget, max_time)
+    if not within_limits:
+        return None
+    if last_turn or _at_most(developer_budget, developer_time, previous_budget, previous_time):
+        return Decision.ACCEPT
+    return None
+
+
+def developer_decision(client_budget: str, client_time: str,
+                       previous_budget: Optional[str], previous_time: Optional[str],
+                       min_budget: str, min_time: str, last_turn: bool) -> Optional[Decision]:
+    """Decide a client offer without the model when the answer is obvious.
+
+    The developer accepts an offer that meets its own previous request. On its last
+    turn a counter-offer would never be answered, so the offer is accepted if it
+    reaches the minimums and rejected otherwise.
+    """
+    meets_minimums = _at_least(client_budget, client_time, min_budget, min_time)
+    if meets_minimums is None:
+        return None
+    if last_turn:
+        return Decision.ACCEPT if meets_minimums else Decision.REJECT
+    if meets_minimums and previous_budget is not None and previous_time is not None \
+            and _at_least(client_budget, client_time, previous_budget, previous_time):
+        return Decision.ACCEPT
+    return None
+
+
+def near_client_limits(developer_budget: str, developer_time: str, max_budget: str, max_time: str,
+                       margin: float) -> bool:
+    """True if a developer request is within `margin` (relative) of the client's limits, or unreadable"""
+    offer, limit = parse_money(developer_budget), parse_money(max_budget)
+    days, limit_days = parse_duration_days(developer_time), parse_duration_days(max_time)
+    if not comparable(offer, limit) or days is None or limit_days is None:
+        return True
+    return offer.amount <= limit.amount * (1 + margin) and days <= limit_days * (1 + margin)
+
+
+def near_developer_limits(client_budget: str, client_time: str, min_budget: str, min_time: str,
+                          margin: float) -> bool:
+    """True if a client offer is within `margin` (relative) of the developer's minimums, or unreadable"""
+    offer, limit = parse_money(client_budget), parse_money(min_budget)
+    days, limit_days = parse_duration_days(client_time), parse_duration_days(min_time)
+    if not comparable(offer, limit) or days is None or limit_days is None:
+        return True
+    return offer.amount >= limit.amount * (1 - margin) and days >= limit_days * (1 - margin)
@@ -0,0 +1,155 @@
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from autogen_core import CancellationToken
+
+from metrics import NegotiationMetrics
+from models.interfaces import Terms
+
+# Especulación: mientras la otra parte prepara su turno, se calcula de antemano la
+# respuesta a sus peticiones más probables. Se predicen con el ritmo de concesiones
+# observado: primero que vuelva a ceder lo mismo que en su último turno, después que
+# mantenga la petición. Como las reglas, si algún valor no se puede interpretar no
+# se predice nada.
+
+T = TypeVar("T")
+
+# Respuesta del modelo a una petición supuesta y nivel de la cascada que la dio
+Answer = Tuple[Optional[T], Optional[str]]
+
+
+def predict_requests(history: Sequence[Terms], count: int) -> List[Terms]:
+    """The `count` most probable next requests of the counterpart, from its previous ones"""
+    if not history or count <= 0 or not _numeric(history[-1]):
+        return []
+    last = history[-1]
+    candidates = []
+    previous = history[-2] if len(history) > 1 else None
+    if previous is not None and _numeric(previous) and previous.currency == last.currency:
+        trend = Terms(amount=max(0.0, 2 * last.amount - previous.amount), currency=last.currency,
+                      days=max(0.0, 2 * last.days - previous.days))
+        if not close_to(trend, last, 0.0):
+            candidates.append(trend)
+    candidates.append(Terms(amount=last.amount, currency=last.currency, days=last.days))
+    return candidates[:count]
+
+
+def close_to(request: Terms, predicted: Terms, tolerance: float) -> bool:
+    """Whether budget and timeline of `request` are within `tolerance` (relative) of the prediction"""
+    if not _numeric(request) or not _numeric(predicted) or request.currency != predicted.currency:
+        return False
+    return (_relative(request.amount, predicted.amount) <= tolerance
+            and _relative(request.days, predicted.days) <= tolerance)
+
+
+@dataclass
+class Speculation(Generic[T]):
+    request: Terms
+    token: CancellationToken
+    started: float
+    task: Optional["asyncio.Task[Answer[T]]"] = None
+    finished: Optional[float] = None
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+
+class Speculator(Generic[T]):
+    """Answers prepared in the background for the counterpart's most probable next requests.
+
+    `answer(request, token)`, given to `start`, makes the model call for one
+    supposed request; it must not touch the agent's model context. When the real
+    request arrives, the
+    answer prepared for a close enough prediction is used instead of a new call
+    and the rest are cancelled. Hits, misses and the model time saved go to
+    `metrics`.
+    """
+
+    def __init__(self, candidates: int, tolerance: float, metrics: NegotiationMetrics, role: str):
+        self._candidates = candidates
+        self._tolerance = tolerance
+        self._metrics = metrics
+        self._role = role
+        self._pending: List[Speculation[T]] = []
+
+    def start(self, answer: Callable[[Terms, CancellationToken], Awaitable[Answer[T]]],
+              history: Sequence[Terms], session_token: CancellationToken,
+              idle_slots: Optional[int] = None, skip: Callable[[Terms], bool] = lambda request: False) -> None:
+        """Speculate on the next request after `history`, leaving one idle slot for the counterpart"""
+        count = self._candidates if idle_slots is None else min(self._candidates, idle_slots - 1)
+        if session_token.is_cancelled():
+            return
+        for request in predict_requests(history, count):
+            if skip(request):
+                continue
+            token = CancellationToken()
+            session_token.add_callback(token.cancel)
+            speculation = Speculation(request, token, time.perf_counter())
+            speculation.task = asyncio.create_task(self._run(answer, speculation))
+            self._pending.append(speculation)
+            self._metrics.observe_speculation(self._role, "started")
+
+    def detach(self) -> List[Speculation[T]]:
+        """Take the speculations for the request that has just arrived"""
+        pending, self._pending = self._pending, []
+        return pending
+
+    async def use(self, speculations: List[Speculation[T]], request: Terms,
+                  reusable: Callable[[T, Terms, Terms], bool] = lambda answer, request, predicted: True
+                  ) -> Optional[Answer[T]]:
+        """The prepared answer to `request`, or None if no prediction was close enough.
+
+        `reusable(answer, request, predicted)` tells whether an answer prepared
+        for the predicted request still holds for the real one.
+        """
+        pending = list(speculations)
+        speculations.clear()
+        hit = next((speculation for speculation in pending
+                    if close_to(request, speculation.request, self._tolerance)), None)
+        for speculation in pending:
+            if speculation is not hit:
+                speculation.cancel()
+        if hit is None:
+            if pending:
+                self._metrics.observe_speculation(self._role, "miss")
+            return None
+
+        arrived = time.perf_counter()
+        answer, tier = await hit.task
+        if answer is None or not reusable(answer, request, hit.request):
+            self._metrics.observe_speculation(self._role, "miss")
+            return None
+        # Lo que la llamada ya había avanzado cuando llegó la petición real
+        self._metrics.observe_speculation(self._role, "hit", min(arrived, hit.finished) - hit.started)
+        return answer, tier
+
+    def discard(self, speculations: List[Speculation[T]]) -> None:
+        """Cancel speculations that are no longer needed (the turn was decided without the model)"""
+        if speculations:
+            self._metrics.observe_speculation(self._role, "unused")
+        for speculation in speculations:
+            speculation.cancel()
+        speculations.clear()
+
+    @staticmethod
+    async def _run(answer: Callable[[Terms, CancellationToken], Awaitable[Answer[T]]],
+                   speculation: Speculation[T]) -> Answer[T]:
+        try:
+            return await answer(speculation.request, speculation.token)
+        except Exception:
+            # Una especulación fallida es un fallo más: el turno real llama al modelo y ve el error
+            return None, None
+        finally:
+            speculation.finished = time.perf_counter()
+
+
+def _numeric(terms: Terms) -> bool:
+    return not math.isnan(terms.amount) and not math.isnan(terms.days)
+
+
+def _relative(value: float, reference: float) -> float:
+    scale = max(abs(value), abs(reference))
+    return abs(value - reference) / scale if scale else 0.0
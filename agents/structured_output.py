@@ -0,0 +1,172 @@
+import ast
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, Generic, Optional, Tuple, Type, TypeVar
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_core import CancellationToken
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import AssistantMessage
+from pydantic import BaseModel, ValidationError
+
+from clients.cascade import LARGE, SMALL, TierCall, model_tier
+from metrics import NegotiationMetrics, total_usage
+
+T = TypeVar("T", bound=BaseModel)
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_TRUE_WORDS = {"true", "yes", "y", "si", "sí", "1", "accept", "accepted"}
+_FALSE_WORDS = {"false", "no", "n", "0", "reject", "rejected"}
+# Campos que los modelos pequeños omiten a menudo y que no merecen una nueva llamada
+_OPTIONAL_FIELDS = {"reasoning": ""}
+
+
+class StructuredResponder(Generic[T]):
+    """Ask the assistant for a structured answer and recover from malformed output.
+
+    A reply that does not validate is first repaired locally (JSON extraction and
+    field coercion). Only if that fails the model is asked again, at most
+    `max_reasks` times, with just the validation error, always on the large tier
+    of the model cascade. Returns None when the answer could not be recovered or
+    `cancellation_token` was cancelled.
+    """
+
+    def __init__(self, assistant: AssistantAgent, model_context: ChatCompletionContext,
+                 output_type: Type[T], role: str, metrics: NegotiationMetrics, max_reasks: int = 2):
+        self._assistant = assistant
+        self._model_context = model_context
+        self._output_type = output_type
+        self._role = role
+        self._metrics = metrics
+        self._max_reasks = max_reasks
+        self.answered_tier: Optional[str] = None  # nivel de la cascada que dio la última respuesta
+
+    async def ask(self, prompt: str, cancellation_token: Optional[CancellationToken] = None,
+                  tier: str = SMALL) -> Optional[T]:
+        start = len(await self._model_context.get_messages())
+        task = prompt
+        self.answered_tier = None
+        for attempt in range(self._max_reasks + 1):
+            try:
+                with model_tier(tier if attempt == 0 else LARGE) as call:
+                    response, raw, error = await self._run(task, cancellation_token, call)
+                self.answered_tier = call.answered
+            except asyncio.CancelledError:
+                if cancellation_token is None or not cancellation_token.is_cancelled():
+                    raise
+                return None
+            if response is not None and attempt == 0:
+                return response
+
+            if response is None and raw is not None:
+                response, error = repair_response(raw, self._output_type)
+                if response is not None:
+                    self._metrics.observe_parse_failure(self._role, "repaired")
+            elif response is not None:
+                self._metrics.observe_parse_failure(self._role, "reasked")
+
+            if response is not None:
+                await self._keep_only_answer(start, response)
+                return response
+            task = (
+                f"Your last answer is not valid: {error}\n"
+                f"Reply again with only a JSON object with the fields "
+                f"{', '.join(self._output_type.model_fields)}."
+            )
+
+        self._metrics.observe_parse_failure(self._role, "unrecovered")
+        return None
+
+    async def _run(self, task: str, cancellation_token: Optional[CancellationToken], call: TierCall
+                   ) -> Tuple[Optional[T], Optional[str], Optional[str]]:
+        """One model call; returns the parsed answer or the raw text and its error"""
+        started = time.perf_counter()
+        try:
+            result = await self._assistant.run(task=task, cancellation_token=cancellation_token)
+        except ValidationError as error:
+            # The assistant stores its reply in the model context before validating it
+            self._metrics.observe_llm_call(self._role, time.perf_counter() - started, None, call.answered)
+            return None, await self._last_reply(), describe_validation_error(error)
+
+        self._metrics.observe_llm_call(self._role, time.perf_counter() - started, total_usage(result.messages),
+                                       call.answered)
+        for message in reversed(result.messages):
+            if isinstance(getattr(message, "content", None), self._output_type):
+                return message.content, None, None
+        return None, await self._last_reply(), "the answer is not a JSON object"
+
+    async def _last_reply(self) -> Optional[str]:
+        for message in reversed(await self._model_context.get_messages()):
+            if isinstance(message, AssistantMessage):
+                return message.content if isinstance(message.content, str) else None
+        return None
+
+    async def _keep_only_answer(self, start: int, response: T) -> None:
+        """Replace the failed attempts with the clean answer so later rounds see a valid exchange"""
+        messages = await self._model_context.get_messages()
+        kept = messages[:start + 1] + [AssistantMessage(content=response.model_dump_json(), source="assistant")]
+        await self._model_context.clear()
+        for message in kept:
+            await self._model_context.add_message(message)
+
+
+def repair_response(raw: str, output_type: Type[T]) -> Tuple[Optional[T], Optional[str]]:
+    """Cheap local repair of a model answer: extract the JSON object and coerce its fields"""
+    data = _extract_object(raw)
+    if data is None:
+        return None, "the answer does not contain a JSON object"
+    try:
+        return output_type.model_validate(_coerce_fields(data, output_type)), None
+    except ValidationError as error:
+        return None, describe_validation_error(error)
+
+
+def describe_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'answer'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _extract_object(raw: str) -> Optional[Dict[str, Any]]:
+    # Tolera texto o bloques ``` alrededor del objeto y comas finales
+    start, end = raw.find("{"), raw.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    text = _TRAILING_COMMA.sub(r"\1", raw[start:end + 1])
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            data = ast.literal_eval(text)  # comillas simples, True/False de Python
+        except (ValueError, SyntaxError):
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def _coerce_fields(data: Dict[str, Any], output_type: Type[BaseModel]) -> Dict[str, Any]:
+    fields = output_type.model_fields
+    names = {name.lower(): name for name in fields}
+    coerced = {name: default for name, default in _OPTIONAL_FIELDS.items() if name in fields}
+    for key, value in data.items():
+        name = names.get(str(key).strip().lower().replace(" ", "_").replace("-", "_"))
+        if name is not None:
+            coerced[name] = _coerce(value, fields[name].annotation)
+    return coerced
+
+
+def _coerce(value: Any, annotation: Any) -> Any:
+    if annotation is bool:
+        if isinstance(value, str) and value.strip().lower() in _TRUE_WORDS | _FALSE_WORDS:
+            return value.strip().lower() in _TRUE_WORDS
+        if isinstance(value, (int, float)) and value in (0, 1):
+            return bool(value)
+    elif annotation is str:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(int(value)) if float(value).is_integer() else str(value)
+        if isinstance(value, dict):
+            # {"amount": 1500, "currency": "EUR"} -> "1500 EUR"
+            return " ".join(str(_coerce(part, str)) for part in value.values() if not isinstance(part, (dict, list)))
+    return value
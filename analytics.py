@@ -0,0 +1,368 @@
+import glob
+import json
+import math
+import os
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from extras import require_numpy
+from models.units import amount_or_nan, comparable, days_or_nan, parse_money
+
+# Análisis de las transcripciones de una ejecución (events.transcripts_dir). Las
+# sesiones se leen por bloques y cada bloque se convierte en columnas NumPy que
+# actualizan los acumuladores, así que el tamaño del corpus no está limitado por
+# la memoria.
+
+ROLES = ("client", "developer")
+OFFER_KINDS = ("offer", "counter_offer")
+# Motivo de las sesiones sin OutcomeEvent (transcripciones de una sola negociación),
+# deducido del evento terminal
+_TERMINAL_REASONS = {
+    "rejection": "developer_rejected",
+    "iteration_limit": "max_rounds",
+    "deadlock_predicted": "no_deal_predicted",
+    "invalid_response": "invalid_response",
+    "error": "error",
+}
+# Distancia de presupuesto: (mínimo del desarrollador - máximo del cliente) / máximo del cliente
+GAP_EDGES = (-0.5, -0.4, -0.3, -0.2, -0.1, 0.0, 0.1, 0.2, 0.3, 0.4, 0.5)
+MAX_TURNS = 32
+
+
+@dataclass
+class TranscriptChunk:
+    """A block of sessions as NumPy columns.
+
+    Session columns have one row per session. Offer columns have one row per
+    offer or counter-offer, and `offer_session` is the row of its session.
+    """
+    session_id: Any
+    reason: Any
+    agreement_reached: Any
+    rounds: Any
+    budget_gap_ratio: Any  # NaN si la transcripción no tiene los límites
+    agreed_price: Any
+    agreed_days: Any
+    offer_session: Any
+    offer_role: Any  # posición en ROLES
+    offer_turn: Any  # 0 = primera oferta de esa parte en la sesión
+    offer_amount: Any
+    offer_days: Any
+
+    def __len__(self) -> int:
+        return len(self.session_id)
+
+
+def transcript_files(directory: str) -> List[str]:
+    """Transcripts under `directory`, compressed or not"""
+    patterns = ("*.jsonl", "*.jsonl.gz")
+    return sorted(path for pattern in patterns
+                  for path in glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+
+
+def iter_sessions(paths: Iterable[str]) -> Iterator[List[dict]]:
+    """Events of each session, one file at a time; lines that are not events are skipped.
+
+    A session resumed from a checkpoint appends the turns it replays to its
+    transcript, so each (iteration, role, kind) is taken once, from its last line.
+    """
+    for path in paths:
+        with open(path, "rb") as file:
+            data = file.read()
+        if path.endswith(".gz"):
+            data = _gunzip(data)
+        sessions: Dict[str, Dict[Tuple, dict]] = {}
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if isinstance(event, dict) and "kind" in event and "session_id" in event:
+                events = sessions.setdefault(event["session_id"], {})
+                key = _event_key(event)
+                # La repetición reemplaza a la original y pasa al final, en el orden en que se repitió
+                events.pop(key, None)
+                events[key] = event
+        yield from (list(events.values()) for events in sessions.values())
+
+
+def load_transcripts(directory: str, chunk_size: int = 4096) -> Iterator[TranscriptChunk]:
+    """Stream the sessions of a transcripts directory in chunks of `chunk_size`"""
+    np = require_numpy("Transcript analytics")
+    builder = _ChunkBuilder()
+    for events in iter_sessions(transcript_files(directory)):
+        builder.add(events)
+        if len(builder.session_id) >= chunk_size:
+            yield builder.build(np)
+            builder = _ChunkBuilder()
+    if builder.session_id:
+        yield builder.build(np)
+
+
+class TranscriptStats:
+    """Running statistics over transcript chunks.
+
+    - Concession curves: mean budget and timeline of each party's n-th offer,
+      relative to its first offer in the session. Acceptances are not offers:
+      they repeat the counterpart's terms.
+    - Deal rate by budget gap ratio, in the bins of `gap_edges`.
+    - Distribution of the rounds needed to reach an agreement.
+    """
+
+    def __init__(self, gap_edges: Sequence[float] = GAP_EDGES, max_turns: int = MAX_TURNS):
+        np = require_numpy("Transcript analytics")
+        self._gap_edges = np.asarray(gap_edges, dtype=float)
+        self._max_turns = max_turns
+        self.sessions = 0
+        self.outcomes: Counter = Counter()
+        # [parte, turno, (presupuesto, plazo)]
+        self.concession_sum = np.zeros((len(ROLES), max_turns, 2))
+        self.concession_count = np.zeros((len(ROLES), max_turns, 2), dtype=np.int64)
+        self.gap_sessions = np.zeros(len(gap_edges) + 1, dtype=np.int64)
+        self.gap_deals = np.zeros(len(gap_edges) + 1, dtype=np.int64)
+        self.rounds_to_deal = np.zeros(0, dtype=np.int64)
+
+    def update(self, chunk: TranscriptChunk) -> None:
+        np = require_numpy("Transcript analytics")
+        self.sessions += len(chunk)
+        reasons, counts = np.unique(chunk.reason, return_counts=True)
+        self.outcomes.update(dict(zip(reasons.tolist(), counts.tolist())))
+        self._update_concessions(np, chunk)
+
+        known = ~np.isnan(chunk.budget_gap_ratio)
+        bins = np.digitize(chunk.budget_gap_ratio[known], self._gap_edges)
+        self.gap_sessions += np.bincount(bins, minlength=len(self.gap_sessions))
+        self.gap_deals += np.bincount(
+            bins, weights=chunk.agreement_reached[known], minlength=len(self.gap_deals)
+        ).astype(np.int64)
+
+        rounds = np.bincount(chunk.rounds[chunk.agreement_reached])
+        if len(rounds) > len(self.rounds_to_deal):
+            self.rounds_to_deal = np.pad(self.rounds_to_deal, (0, len(rounds) - len(self.rounds_to_deal)))
+        self.rounds_to_deal[:len(rounds)] += rounds
+
+    def _update_concessions(self, np, chunk: TranscriptChunk) -> None:
+        # Primera oferta de cada (sesión, parte), para expresar las demás en proporción a ella
+        key = chunk.offer_session * len(ROLES) + chunk.offer_role
+        first = chunk.offer_turn == 0
+        first_amount = np.full(len(chunk) * len(ROLES), np.nan)
+        first_days = np.full(len(chunk) * len(ROLES), np.nan)
+        first_amount[key[first]] = chunk.offer_amount[first]
+        first_days[key[first]] = chunk.offer_days[first]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = np.stack([chunk.offer_amount / first_amount[key], chunk.offer_days / first_days[key]], axis=1)
+        valid = np.isfinite(relative) & (chunk.offer_turn < self._max_turns)[:, None]
+        rows = np.minimum(chunk.offer_turn, self._max_turns - 1)
+        np.add.at(self.concession_sum, (chunk.offer_role, rows), np.where(valid, relative, 0.0))
+        np.add.at(self.concession_count, (chunk.offer_role, rows), valid)
+
+    def summary(self) -> Dict[str, Any]:
+        np = require_numpy("Transcript analytics")
+        agreements = int(self.rounds_to_deal.sum())
+        return {
+            "sessions": self.sessions,
+            "agreements": agreements,
+            "deal_rate": agreements / self.sessions if self.sessions else 0.0,
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "rounds_to_deal": _distribution(np, self.rounds_to_deal),
+            "deal_rate_by_budget_gap": self._gap_summary(),
+            "concession_curves": self._curves(np),
+        }
+
+    def _gap_summary(self) -> List[Dict[str, Any]]:
+        bounds = [None] + self._gap_edges.tolist() + [None]
+        return [
+            {
+                "gap_from": bounds[index],
+                "gap_to": bounds[index + 1],
+                "sessions": int(sessions),
+                "deal_rate": float(deals / sessions),
+            }
+            for index, (sessions, deals) in enumerate(zip(self.gap_sessions, self.gap_deals))
+            if sessions
+        ]
+
+    def _curves(self, np) -> Dict[str, Dict[str, List[float]]]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = self.concession_sum / self.concession_count
+        curves = {}
+        for index, role in enumerate(ROLES):
+            turns = int(np.max(np.nonzero(self.concession_count[index].any(axis=1))[0], initial=-1)) + 1
+            curves[role] = {
+                "budget": [_rounded(value) for value in means[index, :turns, 0]],
+                "time": [_rounded(value) for value in means[index, :turns, 1]],
+            }
+        return curves
+
+
+def summarize_run(directory: str, chunk_size: int = 4096) -> Dict[str, Any]:
+    """Statistics of every transcript under `directory`"""
+    stats = TranscriptStats()
+    for chunk in load_transcripts(directory, chunk_size):
+        stats.update(chunk)
+    return stats.summary()
+
+
+def run_analysis(directory: str, chunk_size: int = 4096, output_file: Optional[str] = None) -> Dict[str, Any]:
+    summary = summarize_run(directory, chunk_size)
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
+    sessions = summary["sessions"]
+    print(f"{sessions} sesiones, {summary['agreements']} acuerdos ({summary['deal_rate']:.0%})")
+    if not sessions:
+        return summary
+    print("Resultados: " + ", ".join(f"{reason}={count}" for reason, count in sorted(summary["outcomes"].items())))
+
+    rounds = summary["rounds_to_deal"]
+    if rounds["count"]:
+        print(f"Rondas hasta el acuerdo: media={rounds['mean']:.2f} mediana={rounds['median']} p90={rounds['p90']} "
+              f"({', '.join(f'{value}: {count}' for value, count in rounds['histogram'].items())})")
+
+    if summary["deal_rate_by_budget_gap"]:
+        print("Tasa de acuerdo según la distancia de presupuesto (mínimo del desarrollador frente al máximo del cliente):")
+        for row in summary["deal_rate_by_budget_gap"]:
+            print(f"  {_gap_label(row['gap_from'], row['gap_to']):>15}: {row['deal_rate']:>5.0%} de {row['sessions']}")
+
+    print("Concesiones (media de cada oferta frente a la primera de la misma parte):")
+    for role, label in zip(ROLES, ("cliente", "desarrollador")):
+        curve = summary["concession_curves"][role]
+        print(f"  {label:<13} presupuesto: {_curve_text(curve['budget'])}")
+        print(f"  {'':<13} plazo:       {_curve_text(curve['time'])}")
+    return summary
+
+
+class _ChunkBuilder:
+    """Rows of the sessions read so far, turned into NumPy columns by `build`"""
+
+    def __init__(self):
+        self.session_id: List[str] = []
+        self.reason: List[str] = []
+        self.agreement_reached: List[bool] = []
+        self.rounds: List[int] = []
+        self.budget_gap_ratio: List[float] = []
+        self.agreed_price: List[float] = []
+        self.agreed_days: List[float] = []
+        self.offer_session: List[int] = []
+        self.offer_role: List[int] = []
+        self.offer_turn: List[int] = []
+        self.offer_amount: List[float] = []
+        self.offer_days: List[float] = []
+
+    def add(self, events: List[dict]) -> None:
+        row = len(self.session_id)
+        turns = [0] * len(ROLES)
+        outcome = None
+        terminal = None
+        for event in events:
+            kind = event["kind"]
+            if kind == "outcome":
+                outcome = event
+                continue
+            if kind in OFFER_KINDS and event.get("role") in ROLES:
+                role = ROLES.index(event["role"])
+                self.offer_session.append(row)
+                self.offer_role.append(role)
+                self.offer_turn.append(turns[role])
+                self.offer_amount.append(amount_or_nan(event.get("budget", "")))
+                self.offer_days.append(days_or_nan(event.get("time", "")))
+                turns[role] += 1
+            if kind == "agreement" or kind in _TERMINAL_REASONS:
+                terminal = event
+
+        self.session_id.append(events[0]["session_id"])
+        if outcome is not None:
+            self.reason.append(outcome["reason"] or "unknown")
+            self.agreement_reached.append(bool(outcome["agreement_reached"]))
+            self.rounds.append(int(outcome["iteration"]))
+            self.budget_gap_ratio.append(_gap_ratio(outcome.get("min_budget", ""), outcome.get("max_budget", "")))
+            self.agreed_price.append(amount_or_nan(outcome.get("agreed_budget", "")))
+            self.agreed_days.append(days_or_nan(outcome.get("agreed_time", "")))
+            return
+
+        reached = terminal is not None and terminal["kind"] == "agreement"
+        if terminal is None:
+            reason = "unfinished"
+        elif reached:
+            reason = f"{terminal['role']}_accepted"
+        else:
+            reason = _TERMINAL_REASONS[terminal["kind"]]
+        self.reason.append(reason)
+        self.agreement_reached.append(reached)
+        self.rounds.append(int(terminal["iteration"]) if terminal is not None else 0)
+        self.budget_gap_ratio.append(math.nan)
+        self.agreed_price.append(amount_or_nan(terminal.get("budget", "")) if reached else math.nan)
+        self.agreed_days.append(days_or_nan(terminal.get("time", "")) if reached else math.nan)
+
+    def build(self, np) -> TranscriptChunk:
+        return TranscriptChunk(
+            session_id=np.array(self.session_id, dtype=str),
+            reason=np.array(self.reason, dtype=str),
+            agreement_reached=np.array(self.agreement_reached, dtype=bool),
+            rounds=np.array(self.rounds, dtype=np.int64),
+            budget_gap_ratio=np.array(self.budget_gap_ratio, dtype=float),
+            agreed_price=np.array(self.agreed_price, dtype=float),
+            agreed_days=np.array(self.agreed_days, dtype=float),
+            offer_session=np.array(self.offer_session, dtype=np.int64),
+            offer_role=np.array(self.offer_role, dtype=np.int64),
+            offer_turn=np.array(self.offer_turn, dtype=np.int64),
+            offer_amount=np.array(self.offer_amount, dtype=float),
+            offer_days=np.array(self.offer_days, dtype=float),
+        )
+
+
+def _event_key(event: dict) -> Tuple:
+    if event["kind"] == "outcome":
+        return ("outcome",)
+    return event.get("iteration"), event.get("role"), event["kind"]
+
+
+def _gunzip(data: bytes) -> bytes:
+    # Cada volcado de TranscriptSink es un miembro gzip; zlib los descomprime mucho más
+    # rápido que el lector de gzip, que los recorre en Python
+    parts = []
+    while data:
+        decompressor = zlib.decompressobj(wbits=31)
+        parts.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+    return b"".join(parts)
+
+
+def _distribution(np, histogram) -> Dict[str, Any]:
+    count = int(histogram.sum())
+    if not count:
+        return {"count": 0, "mean": 0.0, "median": 0, "p90": 0, "histogram": {}}
+    values = np.arange(len(histogram))
+    cumulative = np.cumsum(histogram)
+    return {
+        "count": count,
+        "mean": float((values * histogram).sum() / count),
+        "median": int(np.searchsorted(cumulative, 0.5 * count)),
+        "p90": int(np.searchsorted(cumulative, 0.9 * count)),
+        "histogram": {int(value): int(histogram[value]) for value in np.nonzero(histogram)[0]},
+    }
+
+
+def _gap_ratio(min_budget: str, max_budget: str) -> float:
+    low, high = parse_money(min_budget), parse_money(max_budget)
+    if not comparable(low, high) or not high.amount:
+        return math.nan
+    return (low.amount - high.amount) / high.amount
+
+
+def _rounded(value: float) -> Optional[float]:
+    return round(float(value), 4) if math.isfinite(value) else None
+
+
+def _gap_label(low: Optional[float], high: Optional[float]) -> str:
+    if low is None:
+        return f"< {high:+.0%}"
+    if high is None:
+        return f">= {low:+.0%}"
+    return f"{low:+.0%} a {high:+.0%}"
+
+
+def _curve_text(values: List[Optional[float]]) -> str:
+    return " ".join(f"{value:.2f}" if value is not None else "-" for value in values) or "-"
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, List, Optional
+
+from autogen_core import (
+    ClosureAgent,
+    ClosureContext,
+    MessageContext,
+    SingleThreadedAgentRuntime,
+    TopicId,
+    TypeSubscription,
+)
+from autogen_core.models import ChatCompletionClient
+
+from agents.cancellation import SessionCancellation
+from batch import Scenario, register_agents, report_run
+from clients.factory import build_model_client
+from config import BidderConfig, Config
+from event_stream import create_event_stream
+from metrics import MetricsInterventionHandler, create_metrics
+from models.interfaces import FinalAgreement, InitialDescription
+from models.topics import RESULT_TOPIC
+
+
+@dataclass
+class AuctionResult:
+    winner: Optional[str]
+    agreement: Optional[dict]
+    wall_seconds: float
+    # Motivo de cierre de cada desarrollador ("cancelled" si se canceló al haber ganador)
+    outcomes: Dict[str, str] = field(default_factory=dict)
+
+
+async def run_auction(config: Config, bidders: List[BidderConfig], timeout: Optional[float] = 600.0,
+                      model_client: Optional[ChatCompletionClient] = None, quiet: bool = False) -> AuctionResult:
+    """Negotiate the project with every developer profile at once.
+
+    Each developer gets its own session with a client holding the same limits,
+    all in one runtime so their model calls overlap. The first agreement wins and
+    cancels the model calls still in flight in the other sessions.
+    """
+    names = [bidder.name for bidder in bidders]
+    if not names:
+        raise ValueError("The auction needs at least one developer in auction.developers")
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicated developer name in auction.developers")
+
+    base = Scenario.from_config(config)
+    lanes: Dict[str, Scenario] = {
+        bidder.name: replace(base, session_id=bidder.name, min_budget=bidder.min_budget, min_time=bidder.min_time)
+        for bidder in bidders
+    }
+
+    model_client = model_client or build_model_client(config)
+    metrics = create_metrics(config.metrics)
+    runtime = SingleThreadedAgentRuntime(
+        intervention_handlers=[MetricsInterventionHandler(metrics)] if metrics is not None else None
+    )
+    cancellation = SessionCancellation()
+    events, transcripts = create_event_stream(config.events, quiet)
+    await register_agents(runtime, model_client, lanes.__getitem__, metrics, events, cancellation=cancellation)
+
+    results: Dict[str, FinalAgreement] = {}
+    finished = asyncio.Event()
+
+    def cancel_open_lanes() -> None:
+        for session_id in lanes:
+            if session_id not in results:
+                cancellation.cancel(session_id)
+
+    async def collect_result(_agent: ClosureContext, message: FinalAgreement, ctx: MessageContext) -> None:
+        session_id = ctx.topic_id.source
+        if session_id in results or cancellation.is_cancelled(session_id):
+            return
+        results[session_id] = message
+        if message.agreement_reached:
+            cancel_open_lanes()
+            finished.set()
+        elif len(results) == len(lanes):
+            finished.set()
+
+    await ClosureAgent.register_closure(
+        runtime,
+        "collector",
+        collect_result,
+        subscriptions=lambda: [TypeSubscription(topic_type=RESULT_TOPIC, agent_type="collector")]
+    )
+
+    runtime.start()
+    started = time.perf_counter()
+    for session_id, lane in lanes.items():
+        await runtime.publish_message(
+            InitialDescription(description=lane.description),
+            topic_id=TopicId(type="client_topic", source=session_id)
+        )
+
+    try:
+        await asyncio.wait_for(finished.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        cancel_open_lanes()
+    wall_seconds = time.perf_counter() - started
+    await runtime.stop_when_idle()
+
+    winner = next((session_id for session_id, result in results.items() if result.agreement_reached), None)
+    outcomes = {}
+    for session_id in lanes:
+        if session_id in results:
+            outcomes[session_id] = results[session_id].reason
+        else:
+            outcomes[session_id] = "cancelled" if winner is not None else "timeout"
+            if metrics is not None:
+                metrics.record_outcome(outcomes[session_id], False, 0)
+
+    report_run(model_client, metrics, config.metrics.json_path, config.metrics.prometheus_path)
+    events.close()
+    if transcripts is not None:
+        transcripts.close()
+    await model_client.close()
+
+    return AuctionResult(
+        winner=winner,
+        agreement=asdict(results[winner]) if winner is not None else None,
+        wall_seconds=round(wall_seconds, 3),
+        outcomes=outcomes
+    )
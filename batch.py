@@ -0,0 +1,432 @@
+import asyncio
+import json
+import time
+import warnings
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import yaml
+from autogen_core import (
+    AgentId,
+    AgentInstantiationContext,
+    AgentRuntime,
+    ClosureAgent,
+    ClosureContext,
+    InterventionHandler,
+    MessageContext,
+    SingleThreadedAgentRuntime,
+    TopicId,
+    TypeSubscription,
+)
+from autogen_core.models import ChatCompletionClient
+
+from agents.cancellation import SessionCancellation
+from agents.client import ClientAgent
+from agents.developer import DeveloperAgent
+from checkpoints import CheckpointInterventionHandler, CheckpointStore, SessionCheckpoint
+from clients.factory import ClientStats, build_model_client, get_client_stats
+from config import Config
+from event_stream import EventStream, create_event_stream
+from metrics import MetricsInterventionHandler, NegotiationMetrics, create_metrics, tracer
+from models.descriptions import DescriptionStore
+from models.events import OutcomeEvent
+from models.interfaces import FinalAgreement, InitialDescription
+from models.topics import RESULT_TOPIC, TopicRouter
+
+
+@dataclass
+class Scenario:
+    """One negotiation of a batch, identified by its topic source"""
+    session_id: str
+    description: str
+    max_budget: str
+    max_time: str
+    min_budget: str
+    min_time: str
+    max_round: int = 5
+    decision_rules: bool = True
+    max_reasks: int = 2
+    compact_prompts: bool = True
+    prompt_token_budget: int = 200
+    predict_deadlock: bool = True
+    deadlock_confidence: float = 0.9
+    escalate_margin: float = 0.1  # cascada de modelos: margen que convierte una ronda en decisiva
+    speculate: bool = False
+    speculation_candidates: int = 2
+    speculation_tolerance: float = 0.05
+
+    @classmethod
+    def from_config(cls, config: Config, session_id: str = "default") -> "Scenario":
+        return cls(
+            session_id=session_id,
+            description=config.description,
+            max_budget=config.max_budget,
+            max_time=config.max_time,
+            min_budget=config.min_budget,
+            min_time=config.min_time,
+            max_round=config.max_round,
+            decision_rules=config.decision_rules,
+            max_reasks=config.max_reasks,
+            compact_prompts=config.compact_prompts,
+            prompt_token_budget=config.prompt_token_budget,
+            predict_deadlock=config.predict_deadlock,
+            deadlock_confidence=config.deadlock_confidence,
+            escalate_margin=config.cascade.escalate_margin,
+            speculate=config.speculation.enabled,
+            speculation_candidates=config.speculation.candidates,
+            speculation_tolerance=config.speculation.tolerance
+        )
+
+
+def load_scenarios(scenario_file: str, defaults: Config) -> List[Scenario]:
+    """Carga los escenarios de un fichero JSONL o YAML (lista o clave `scenarios`).
+
+    Los campos que falten en un escenario se toman de la configuración por defecto.
+    """
+    with open(scenario_file, 'r', encoding='utf-8') as file:
+        if scenario_file.endswith(".jsonl"):
+            entries = [json.loads(line) for line in file if line.strip()]
+        else:
+            entries = yaml.safe_load(file) or []
+            if isinstance(entries, dict):
+                entries = entries.get("scenarios", [])
+
+    scenarios = []
+    for index, entry in enumerate(entries):
+        base = asdict(Scenario.from_config(defaults, session_id=f"session-{index}"))
+        base.update(entry)
+        base["session_id"] = str(base["session_id"])
+        scenarios.append(Scenario(**base))
+
+    session_ids = [scenario.session_id for scenario in scenarios]
+    if len(set(session_ids)) != len(session_ids):
+        raise ValueError(f"Duplicated session_id in {scenario_file}")
+    return scenarios
+
+
+async def register_agents(runtime: AgentRuntime, model_client: ChatCompletionClient,
+                          scenario_for: Callable[[str], Scenario],
+                          metrics: Optional[NegotiationMetrics] = None,
+                          events: Optional[EventStream] = None,
+                          router: Optional[TopicRouter] = None,
+                          shards: Optional[Dict[str, int]] = None,
+                          cancellation: Optional[SessionCancellation] = None,
+                          descriptions: Optional[DescriptionStore] = None) -> None:
+    """Register client and developer factories keyed by session (the topic source).
+
+    Without `shards` both roles are registered with their class subscriptions.
+    With `shards` ({role: shard}) only those roles are registered, as agent type
+    `<role>-<shard>` subscribed to the shard topic of `router`.
+    """
+
+    descriptions = descriptions if descriptions is not None else DescriptionStore()
+
+    def current_scenario() -> Scenario:
+        session_id = AgentInstantiationContext.current_agent_id().key
+        scenario = scenario_for(session_id)
+        # Los mensajes solo llevan la referencia de la descripción; cada proceso la resuelve con sus escenarios
+        descriptions.register(session_id, scenario.description)
+        return scenario
+
+    def client_factory() -> ClientAgent:
+        scenario = current_scenario()
+        return ClientAgent(
+            model_client,
+            max_round=scenario.max_round,
+            max_budget=scenario.max_budget,
+            max_time=scenario.max_time,
+            developer_min_budget=scenario.min_budget,
+            developer_min_time=scenario.min_time,
+            decision_rules=scenario.decision_rules,
+            max_reasks=scenario.max_reasks,
+            compact_prompts=scenario.compact_prompts,
+            prompt_token_budget=scenario.prompt_token_budget,
+            predict_deadlock=scenario.predict_deadlock,
+            deadlock_confidence=scenario.deadlock_confidence,
+            escalate_margin=scenario.escalate_margin,
+            speculate=scenario.speculate,
+            speculation_candidates=scenario.speculation_candidates,
+            speculation_tolerance=scenario.speculation_tolerance,
+            metrics=metrics,
+            events=events,
+            router=router,
+            cancellation=cancellation,
+            descriptions=descriptions
+        )
+
+    def developer_factory() -> DeveloperAgent:
+        scenario = current_scenario()
+        return DeveloperAgent(
+            model_client,
+            min_budget=scenario.min_budget,
+            min_time=scenario.min_time,
+            max_round=scenario.max_round,
+            decision_rules=scenario.decision_rules,
+            max_reasks=scenario.max_reasks,
+            compact_prompts=scenario.compact_prompts,
+            prompt_token_budget=scenario.prompt_token_budget,
+            escalate_margin=scenario.escalate_margin,
+            metrics=metrics,
+            events=events,
+            router=router,
+            cancellation=cancellation,
+            descriptions=descriptions
+        )
+
+    if shards is None:
+        await ClientAgent.register(runtime, "client", client_factory)
+        await DeveloperAgent.register(runtime, "developer", developer_factory)
+        return
+
+    router = router or TopicRouter()
+    agents = {"client": (ClientAgent, client_factory), "developer": (DeveloperAgent, developer_factory)}
+    for role, shard in shards.items():
+        agent_class, factory = agents[role]
+        agent_type = f"{role}-{shard}"
+        await agent_class.register(runtime, agent_type, factory, skip_class_subscriptions=True)
+        await runtime.add_subscription(
+            TypeSubscription(topic_type=router.shard_topic(role, shard), agent_type=agent_type)
+        )
+
+
+def release_session(runtime: AgentRuntime, session_id: str, descriptions: DescriptionStore,
+                    cancellation: SessionCancellation, finished: bool,
+                    agent_types: Iterable[str] = ("client", "developer")) -> None:
+    """Drop the agents and the description of a session that has ended.
+
+    A session that did not finish keeps its cancelled token, so that the messages
+    still in flight do not reopen it.
+    """
+    # El runtime no ofrece una API para descargar agentes: sin esto cada sesión quedaría en memoria
+    instantiated = getattr(runtime, "_instantiated_agents", None)
+    if isinstance(instantiated, dict):
+        for agent_type in agent_types:
+            instantiated.pop(AgentId(agent_type, session_id), None)
+    else:
+        warnings.warn(f"{type(runtime).__name__} has no _instantiated_agents: "
+                      "the agents of finished sessions stay in memory", RuntimeWarning)
+    descriptions.release(session_id)
+    if finished:
+        cancellation.forget(session_id)
+    else:
+        cancellation.cancel(session_id)
+
+
+def report_client_stats(stats: ClientStats, label: str = "") -> None:
+    """Print the cache, pool and cascade stats in use, one line each"""
+    suffix = f" ({label})" if label else ""
+    for name, layer in (("Caché LLM", stats.cache), ("Pool LLM", stats.pool), ("Cascada LLM", stats.cascade)):
+        if layer is not None:
+            print(f"{name}{suffix}: {layer}")
+
+
+def report_run(model_client: ChatCompletionClient, metrics: Optional[NegotiationMetrics],
+               json_path: Optional[str] = None, prometheus_path: Optional[str] = None, label: str = "") -> None:
+    """Print the cache, pool, cascade and speculation stats of a run and export its metrics.
+
+    `label` tells apart the reports of several processes, e.g. "worker 0".
+    """
+    report_client_stats(get_client_stats(model_client), label)
+    suffix = f" ({label})" if label else ""
+    if metrics is not None and metrics.speculations:
+        print(f"Especulación{suffix}: {metrics.speculation_report()}")
+    if metrics is not None:
+        metrics.export(json_path, prometheus_path)
+
+
+async def run_batch(scenarios: List[Scenario], config: Config, concurrency: int = 4,
+                    output_file: str = "results.jsonl",
+                    session_timeout: Optional[float] = 600.0,
+                    model_client: Optional[ChatCompletionClient] = None,
+                    intervention_handlers: Optional[List[InterventionHandler]] = None,
+                    quiet: bool = False,
+                    restore: Optional[List[SessionCheckpoint]] = None,
+                    report: bool = True) -> List[dict]:
+    """Run every scenario in one runtime, at most `concurrency` sessions at a time.
+
+    Sessions in `restore` continue from their checkpoint instead of starting over.
+    Without `report` the stats of the run are neither printed nor exported, for
+    callers that aggregate several runs.
+    """
+    model_client = model_client or build_model_client(config)
+    metrics = create_metrics(config.metrics)
+    handlers = list(intervention_handlers or [])
+    if metrics is not None:
+        handlers.append(MetricsInterventionHandler(metrics))
+    checkpoints = CheckpointStore(config.checkpoints.path) if config.checkpoints.enabled else None
+    if checkpoints is not None:
+        checkpoint_handler = CheckpointInterventionHandler(checkpoints)
+        handlers.append(checkpoint_handler)
+    runtime = SingleThreadedAgentRuntime(intervention_handlers=handlers)
+    if checkpoints is not None:
+        checkpoint_handler.attach(runtime)
+
+    scenarios_by_session: Dict[str, Scenario] = {scenario.session_id: scenario for scenario in scenarios}
+    events, transcripts = create_event_stream(config.events, quiet)
+    cancellation = SessionCancellation()
+    descriptions = DescriptionStore()
+    await register_agents(runtime, model_client, scenarios_by_session.__getitem__, metrics, events,
+                          cancellation=cancellation, descriptions=descriptions)
+
+    restored = {checkpoint.session_id: checkpoint for checkpoint in restore or []}
+
+    async def open_session(scenario: Scenario) -> None:
+        checkpoint = restored.get(scenario.session_id)
+        if checkpoint is not None and checkpoint.pending_message is not None:
+            for agent_type, state in checkpoint.agent_states.items():
+                await runtime.agent_load_state(AgentId(agent_type, scenario.session_id), state)
+            await runtime.publish_message(
+                checkpoint.pending_message,
+                topic_id=TopicId(type=checkpoint.pending_topic, source=scenario.session_id)
+            )
+            return
+
+        if checkpoints is not None:
+            checkpoints.start_session(scenario.session_id, asdict(scenario))
+        await runtime.publish_message(
+            InitialDescription(description=scenario.description),
+            topic_id=TopicId(type="client_topic", source=scenario.session_id)
+        )
+
+    def close_session(scenario: Scenario, finished: bool) -> None:
+        release_session(runtime, scenario.session_id, descriptions, cancellation, finished,
+                        agent_types=("client", "developer", "collector"))
+
+    runtime.start()
+    results = await drive_sessions(
+        runtime, scenarios, concurrency, output_file, session_timeout, metrics, open_session=open_session,
+        events=events, close_session=close_session
+    )
+    await runtime.stop_when_idle()
+
+    if report:
+        report_run(model_client, metrics, config.metrics.json_path, config.metrics.prometheus_path)
+    events.close()
+    if transcripts is not None:
+        transcripts.close()
+    if checkpoints is not None:
+        checkpoints.close()
+
+    await model_client.close()
+    return results
+
+
+async def resume_batch(config: Config, concurrency: int = 4, output_file: str = "results.jsonl",
+                       session_timeout: Optional[float] = 600.0, quiet: bool = False) -> List[dict]:
+    """Continue the unfinished sessions of the checkpoint store from their last round"""
+    store = CheckpointStore(config.checkpoints.path)
+    try:
+        unfinished = store.unfinished()
+    finally:
+        store.close()
+    scenarios = [Scenario(**checkpoint.scenario) for checkpoint in unfinished]
+    return await run_batch(
+        scenarios, config, concurrency, output_file, session_timeout, quiet=quiet, restore=unfinished
+    )
+
+
+async def drive_sessions(runtime: AgentRuntime, scenarios: List[Scenario], concurrency: int,
+                         output_file: str, session_timeout: Optional[float],
+                         metrics: Optional[NegotiationMetrics] = None,
+                         router: Optional[TopicRouter] = None,
+                         record_outcomes: bool = False,
+                         open_session: Optional[Callable[[Scenario], Awaitable[None]]] = None,
+                         add_serializers: Optional[Callable[[AgentRuntime], None]] = None,
+                         events: Optional[EventStream] = None,
+                         close_session: Optional[Callable[[Scenario, bool], None]] = None) -> List[dict]:
+    """Open every session on a started runtime and write each FinalAgreement as it arrives.
+
+    `record_outcomes` counts the agreements here, for runtimes without the metrics
+    intervention handler. `open_session` replaces the InitialDescription that
+    starts each session. `add_serializers` runs after registering the result
+    collector, which resets the serializers of the types it handles. Each outcome
+    is also emitted to `events` as an OutcomeEvent, for the transcripts.
+    `close_session(scenario, finished)` runs once the outcome is written, with
+    `finished` False if the session timed out.
+    """
+    router = router or TopicRouter()
+
+    async def publish_description(scenario: Scenario) -> None:
+        await runtime.publish_message(
+            InitialDescription(description=scenario.description),
+            topic_id=TopicId(type=router.topic_for("client", scenario.session_id), source=scenario.session_id)
+        )
+
+    open_session = open_session or publish_description
+    pending: Dict[str, asyncio.Future] = {}
+
+    async def collect_result(_agent: ClosureContext, message: FinalAgreement, ctx: MessageContext) -> None:
+        future = pending.get(ctx.topic_id.source)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    await ClosureAgent.register_closure(
+        runtime,
+        "collector",
+        collect_result,
+        subscriptions=lambda: [TypeSubscription(topic_type=RESULT_TOPIC, agent_type="collector")]
+    )
+    if add_serializers is not None:
+        add_serializers(runtime)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[dict] = []
+
+    with open(output_file, 'w', encoding='utf-8') as output:
+
+        async def run_session(scenario: Scenario) -> None:
+            async with semaphore:
+                future = asyncio.get_running_loop().create_future()
+                pending[scenario.session_id] = future
+                started = time.perf_counter()
+
+                with tracer.start_as_current_span("negotiation.session",
+                                                  attributes={"negotiation.session": scenario.session_id}):
+                    await open_session(scenario)
+
+                    agreement = None
+                    try:
+                        agreement = await asyncio.wait_for(future, timeout=session_timeout)
+                        outcome = asdict(agreement)
+                        if metrics is not None and record_outcomes:
+                            metrics.observe_published(agreement)
+                    except asyncio.TimeoutError:
+                        outcome = {
+                            "application_description": scenario.description,
+                            "agreed_time": "",
+                            "agreed_budget": "",
+                            "total_iterations": 0,
+                            "agreement_reached": False,
+                            "reason": "timeout",
+                        }
+                        if metrics is not None:
+                            metrics.record_outcome("timeout", False, 0)
+                    finally:
+                        pending.pop(scenario.session_id, None)
+
+                outcome["session_id"] = scenario.session_id
+                outcome["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+                results.append(outcome)
+                output.write(json.dumps(outcome, ensure_ascii=False) + "\n")
+                output.flush()
+                if events is not None:
+                    events.emit(OutcomeEvent(
+                        session_id=scenario.session_id,
+                        role="",
+                        iteration=outcome["total_iterations"],
+                        agreement_reached=outcome["agreement_reached"],
+                        reason=outcome["reason"],
+                        agreed_budget=outcome["agreed_budget"],
+                        agreed_time=outcome["agreed_time"],
+                        max_budget=scenario.max_budget,
+                        max_time=scenario.max_time,
+                        min_budget=scenario.min_budget,
+                        min_time=scenario.min_time,
+                        elapsed_seconds=outcome["elapsed_seconds"]
+                    ))
+                if close_session is not None:
+                    close_session(scenario, agreement is not None)
+
+        await asyncio.gather(*(run_session(scenario) for scenario in scenarios))
+
+    return results
@@ -0,0 +1,234 @@
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from autogen_core import DefaultInterventionHandler, MessageContext, MessageSerializer, try_get_known_serializers_for_type
+
+from batch import Scenario, run_batch
+from clients.scripted import ScriptedChatCompletionClient
+from config import CheckpointConfig, Config, EventsConfig, MetricsConfig
+from models.codec import CompactMessageSerializer
+from models.descriptions import description_ref
+from models.interfaces import ApplicationDescription, NegotiationOffer, Terms
+
+
+@dataclass
+class BenchmarkResult:
+    sessions: int
+    wall_seconds: float
+    agreements: int
+    rounds: int
+    rounds_per_second: float
+    round_latency_p50_ms: float
+    round_latency_p95_ms: float
+    messages_per_negotiation: float
+    memory_per_session_kb: float
+
+
+@dataclass
+class PayloadResult:
+    message: str
+    description_bytes: int
+    format: str
+    bytes: int
+    serialize_us: float
+    deserialize_us: float
+
+
+@dataclass
+class _LegacyApplicationDescription:
+    # Mensajes anteriores a DescriptionStore: descripción completa y términos como texto
+    content: str
+    client_estimated_time: str
+    client_budget_offer: str
+
+
+@dataclass
+class _LegacyNegotiationOffer:
+    application_description: str
+    client_estimated_time: str
+    developer_estimated_time: str
+    client_budget_offer: str
+    developer_budget_request: str
+    iteration_number: int
+    conditions_accepted: bool
+    sender: str
+    reasoning: str
+
+
+class RoundTimer(DefaultInterventionHandler):
+    """Timestamps every message published in each session (topic source)"""
+
+    def __init__(self):
+        self.timestamps: Dict[str, List[float]] = defaultdict(list)
+
+    async def on_publish(self, message: Any, *, message_context: MessageContext) -> Any:
+        self.timestamps[message_context.topic_id.source].append(time.perf_counter())
+        return message
+
+
+async def _run_sessions(config: Config, sessions: int, latency: float, strategy: str,
+                        timer: Optional[RoundTimer] = None) -> List[dict]:
+    # El benchmark mide su propia latencia; ni métricas, ni transcripciones, ni checkpoints
+    config = replace(config, metrics=MetricsConfig(enabled=False), events=EventsConfig(console=False),
+                     checkpoints=CheckpointConfig(enabled=False))
+    scenarios = [Scenario.from_config(config, session_id=f"bench-{index}") for index in range(sessions)]
+    model_client = ScriptedChatCompletionClient(latency=latency, strategy=strategy)
+
+    with tempfile.TemporaryDirectory() as directory:
+        return await run_batch(
+            scenarios,
+            config,
+            concurrency=sessions,
+            output_file=os.path.join(directory, "results.jsonl"),
+            model_client=model_client,
+            intervention_handlers=[timer] if timer is not None else None,
+            quiet=True
+        )
+
+
+async def benchmark_level(config: Config, sessions: int, latency: float = 0.0,
+                          strategy: str = "linear", measure_memory: bool = True) -> BenchmarkResult:
+    """Run `sessions` concurrent negotiations against the scripted model"""
+    timer = RoundTimer()
+    started = time.perf_counter()
+    results = await _run_sessions(config, sessions, latency, strategy, timer)
+    wall_seconds = time.perf_counter() - started
+
+    # Cada turno es el intervalo entre dos mensajes consecutivos de la misma sesión
+    round_latencies = [
+        later - earlier
+        for stamps in timer.timestamps.values()
+        for earlier, later in zip(stamps, stamps[1:])
+    ]
+    messages = [len(stamps) for stamps in timer.timestamps.values()]
+
+    memory_per_session_kb = 0.0
+    if measure_memory:
+        # Pasada aparte: tracemalloc ralentiza las asignaciones y falsearía los tiempos
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        await _run_sessions(config, sessions, latency, strategy)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory_per_session_kb = (peak - baseline) / sessions / 1024
+
+    return BenchmarkResult(
+        sessions=sessions,
+        wall_seconds=round(wall_seconds, 3),
+        agreements=sum(1 for result in results if result["agreement_reached"]),
+        rounds=len(round_latencies),
+        rounds_per_second=round(len(round_latencies) / wall_seconds, 1),
+        round_latency_p50_ms=round(_percentile(round_latencies, 50) * 1000, 2),
+        round_latency_p95_ms=round(_percentile(round_latencies, 95) * 1000, 2),
+        messages_per_negotiation=round(statistics.mean(messages), 2) if messages else 0.0,
+        memory_per_session_kb=round(memory_per_session_kb, 1)
+    )
+
+
+async def run_benchmark(config: Config, levels: List[int], latency: float = 0.0,
+                        strategy: str = "linear", measure_memory: bool = True,
+                        output_file: Optional[str] = None) -> List[BenchmarkResult]:
+    results = []
+    print(f"{'sesiones':>9} {'tiempo s':>9} {'acuerdos':>9} {'turnos/s':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'msgs/neg':>9} {'KB/sesión':>10}")
+    for sessions in levels:
+        result = await benchmark_level(config, sessions, latency, strategy, measure_memory)
+        results.append(result)
+        print(f"{result.sessions:>9} {result.wall_seconds:>9} {result.agreements:>9} "
+              f"{result.rounds_per_second:>9} {result.round_latency_p50_ms:>8} "
+              f"{result.round_latency_p95_ms:>8} {result.messages_per_negotiation:>9} "
+              f"{result.memory_per_session_kb:>10}")
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as file:
+            json.dump([asdict(result) for result in results], file, indent=2)
+    return results
+
+
+def _payload_messages(description: str) -> Dict[str, Dict[str, Any]]:
+    """A typical message of each kind in the legacy layout and in the current one"""
+    client, developer = Terms.parse("1350 eur", "1 mes"), Terms.parse("1650 eur", "3 weeks")
+    reasoning = "The request is above my budget, but I can extend the timeline if the price comes down."
+    ref = description_ref(description)
+    return {
+        "ApplicationDescription": {
+            "antes": _LegacyApplicationDescription(description, "1 mes", "1350 eur"),
+            "ahora": ApplicationDescription.from_terms(ref, client),
+        },
+        "NegotiationOffer": {
+            "antes": _LegacyNegotiationOffer(description, "1 mes", "3 weeks", "1350 eur", "1650 eur", 3, False,
+                                             "developer", reasoning),
+            "ahora": NegotiationOffer.from_terms(ref, client, developer, 3, False, "developer", reasoning),
+        },
+    }
+
+
+def _measure_payload(serializer: MessageSerializer, message: Any, iterations: int) -> Tuple[int, float, float]:
+    payload = serializer.serialize(message)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        serializer.serialize(message)
+    serialize_us = (time.perf_counter() - started) / iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(iterations):
+        serializer.deserialize(payload)
+    deserialize_us = (time.perf_counter() - started) / iterations * 1e6
+    return len(payload), serialize_us, deserialize_us
+
+
+def benchmark_payloads(config: Config, iterations: int = 20000, spec_bytes: int = 4096) -> List[PayloadResult]:
+    """Bytes and serialization time per message: legacy JSON, current JSON and compact binary.
+
+    Measured with the configured description and with a specification of about
+    `spec_bytes`, which the legacy messages repeated in every offer.
+    """
+    spec = (config.description + "\n") * max(1, spec_bytes // (len(config.description.encode("utf-8")) + 1))
+    results = []
+    for description in (config.description, spec):
+        for name, messages in _payload_messages(description).items():
+            legacy, current = messages["antes"], messages["ahora"]
+            formats = {
+                "json (antes)": (try_get_known_serializers_for_type(type(legacy))[0], legacy),
+                "json": (try_get_known_serializers_for_type(type(current))[0], current),
+                "compacto": (CompactMessageSerializer(type(current)), current),
+            }
+            for format_name, (serializer, message) in formats.items():
+                size, serialize_us, deserialize_us = _measure_payload(serializer, message, iterations)
+                results.append(PayloadResult(
+                    message=name,
+                    description_bytes=len(description.encode("utf-8")),
+                    format=format_name,
+                    bytes=size,
+                    serialize_us=round(serialize_us, 2),
+                    deserialize_us=round(deserialize_us, 2)
+                ))
+    return results
+
+
+def run_payload_benchmark(config: Config, iterations: int = 20000,
+                          output_file: Optional[str] = None) -> List[PayloadResult]:
+    results = benchmark_payloads(config, iterations)
+    print(f"{'mensaje':<23} {'descr. B':>9} {'formato':<13} {'bytes':>7} {'serializar µs':>14} {'deserializar µs':>16}")
+    for result in results:
+        print(f"{result.message:<23} {result.description_bytes:>9} {result.format:<13} {result.bytes:>7} "
+              f"{result.serialize_us:>14} {result.deserialize_us:>16}")
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as file:
+            json.dump([asdict(result) for result in results], file, indent=2)
+    return results
+
+
+def _percentile(values: List[float], percentile: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from autogen_core import AgentRuntime, DefaultInterventionHandler, MessageContext
+
+from models.interfaces import ApplicationDescription, FinalAgreement, NegotiationOffer
+
+# Mensajes entre agentes que se guardan como pendientes al cerrar cada ronda
+_MESSAGE_TYPES = {message_type.__name__: message_type for message_type in (ApplicationDescription, NegotiationOffer)}
+
+
+@dataclass
+class SessionCheckpoint:
+    """Last saved round of an unfinished session"""
+    session_id: str
+    scenario: Dict[str, Any]
+    rounds: int = 0
+    pending_topic: Optional[str] = None
+    pending_message: Optional[Any] = None
+    agent_states: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class CheckpointStore:
+    """SQLite store of per-session agent states and the message in flight.
+
+    Every round replaces the sender's state and the pending message in one
+    transaction, so a session can be resumed from its last completed round.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                scenario TEXT NOT NULL,
+                rounds INTEGER NOT NULL DEFAULT 0,
+                pending_type TEXT,
+                pending_topic TEXT,
+                pending_message TEXT,
+                result TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS agent_states (
+                session_id TEXT NOT NULL,
+                agent_type TEXT NOT NULL,
+                state TEXT NOT NULL,
+                PRIMARY KEY (session_id, agent_type)
+            );
+            """
+        )
+
+    def start_session(self, session_id: str, scenario: Dict[str, Any]) -> None:
+        """Register a new session, discarding any earlier run with the same id"""
+        with self._connection:
+            self._connection.execute("DELETE FROM agent_states WHERE session_id = ?", (session_id,))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, scenario, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(scenario, ensure_ascii=False), time.time())
+            )
+
+    def save_round(self, session_id: str, agent_type: str, state: Dict[str, Any],
+                   message: Any, topic_type: str) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO agent_states (session_id, agent_type, state) VALUES (?, ?, ?)",
+                (session_id, agent_type, json.dumps(state, ensure_ascii=False))
+            )
+            self._connection.execute(
+                "UPDATE sessions SET rounds = rounds + 1, pending_type = ?, pending_topic = ?, "
+                "pending_message = ?, updated_at = ? WHERE session_id = ?",
+                (type(message).__name__, topic_type, json.dumps(asdict(message), ensure_ascii=False),
+                 time.time(), session_id)
+            )
+
+    def finish(self, session_id: str, agreement: FinalAgreement) -> None:
+        with self._connection:
+            self._connection.execute(
+                "UPDATE sessions SET result = ?, pending_type = NULL, pending_topic = NULL, "
+                "pending_message = NULL, updated_at = ? WHERE session_id = ?",
+                (json.dumps(asdict(agreement), ensure_ascii=False), time.time(), session_id)
+            )
+            self._connection.execute("DELETE FROM agent_states WHERE session_id = ?", (session_id,))
+
+    def unfinished(self) -> List[SessionCheckpoint]:
+        """Sessions without a result, in the order they were started"""
+        rows = self._connection.execute(
+            "SELECT session_id, scenario, rounds, pending_type, pending_topic, pending_message "
+            "FROM sessions WHERE result IS NULL ORDER BY rowid"
+        ).fetchall()
+        checkpoints = []
+        for session_id, scenario, rounds, pending_type, pending_topic, pending_message in rows:
+            states = self._connection.execute(
+                "SELECT agent_type, state FROM agent_states WHERE session_id = ?", (session_id,)
+            ).fetchall()
+            checkpoints.append(SessionCheckpoint(
+                session_id=session_id,
+                scenario=json.loads(scenario),
+                rounds=rounds,
+                pending_topic=pending_topic,
+                pending_message=_MESSAGE_TYPES[pending_type](**json.loads(pending_message)) if pending_type else None,
+                agent_states={agent_type: json.loads(state) for agent_type, state in states}
+            ))
+        return checkpoints
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class CheckpointInterventionHandler(DefaultInterventionHandler):
+    """Checkpoint the sending agent and its message after every negotiation round"""
+
+    def __init__(self, store: CheckpointStore):
+        self._store = store
+        self._runtime: Optional[AgentRuntime] = None
+
+    def attach(self, runtime: AgentRuntime) -> None:
+        self._runtime = runtime
+
+    async def on_publish(self, message: Any, *, message_context: MessageContext) -> Any:
+        session_id = message_context.topic_id.source
+        if isinstance(message, FinalAgreement):
+            self._store.finish(session_id, message)
+        elif isinstance(message, (ApplicationDescription, NegotiationOffer)) and message_context.sender is not None:
+            # El emisor ya ha terminado su ronda: su estado incluye la respuesta que acaba de enviar
+            state = await self._runtime.agent_save_state(message_context.sender)
+            self._store.save_round(session_id, message_context.sender.type, dict(state),
+                                   message, message_context.topic_id.type)
+        return message
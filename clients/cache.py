@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from autogen_core import CacheStore
+from autogen_core.models import CreateResult
+from autogen_ext.models.cache import CHAT_CACHE_VALUE_TYPE
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __add__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(
+            hits=self.hits + other.hits,
+            misses=self.misses + other.misses,
+            writes=self.writes + other.writes,
+            evictions=self.evictions + other.evictions
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"hits={self.hits} misses={self.misses} hit_rate={self.hit_rate:.1%} "
+            f"writes={self.writes} evictions={self.evictions}"
+        )
+
+
+class SqliteCacheStore(CacheStore[CHAT_CACHE_VALUE_TYPE]):
+    """Disk-backed store for `ChatCompletionCache` with LRU eviction by size and age.
+
+    `ChatCompletionCache` hashes the messages (system message and prompt), tools,
+    output schema and extra create args; entries are additionally namespaced by
+    model name so that switching models never returns another model's answer.
+    Only complete `CreateResult` values are persisted, streamed chunks are skipped.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 10000,
+                 max_age_seconds: Optional[float] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS completions_namespace_accessed_at ON completions (namespace, accessed_at)"
+        )
+        self._connection.commit()
+        self._namespace = namespace
+        self._max_entries = max_entries
+        self._max_age_seconds = max_age_seconds
+        self.stats = CacheStats()
+        self._evict()
+
+    def get(self, key: str, default: Optional[CHAT_CACHE_VALUE_TYPE] = None) -> Optional[CHAT_CACHE_VALUE_TYPE]:
+        row = self._connection.execute(
+            "SELECT value, created_at FROM completions WHERE namespace = ? AND key = ?",
+            (self._namespace, key)
+        ).fetchone()
+        now = time.time()
+        if row is None or self._is_expired(row[1], now):
+            self.stats.misses += 1
+            return default
+
+        self._connection.execute(
+            "UPDATE completions SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, self._namespace, key)
+        )
+        self._connection.commit()
+        self.stats.hits += 1
+        return CreateResult.model_validate_json(row[0])
+
+    def set(self, key: str, value: CHAT_CACHE_VALUE_TYPE) -> None:
+        if not isinstance(value, CreateResult):
+            return
+        now = time.time()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO completions (namespace, key, value, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (self._namespace, key, value.model_dump_json(), now, now)
+        )
+        self.stats.writes += 1
+        self._evict()
+
+    def clear(self) -> None:
+        self._connection.execute("DELETE FROM completions WHERE namespace = ?", (self._namespace,))
+        self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self._max_age_seconds is not None and now - created_at > self._max_age_seconds
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the least recently used ones above `max_entries`.
+
+        Both limits apply to this store's namespace only: the tiers of the model
+        cascade share one file and must not evict each other's entries.
+        """
+        evicted = 0
+        if self._max_age_seconds is not None:
+            evicted += self._connection.execute(
+                "DELETE FROM completions WHERE namespace = ? AND created_at < ?",
+                (self._namespace, time.time() - self._max_age_seconds)
+            ).rowcount
+
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM completions WHERE namespace = ?", (self._namespace,)
+        ).fetchone()
+        if count > self._max_entries:
+            evicted += self._connection.execute(
+                "DELETE FROM completions WHERE rowid IN ("
+                " SELECT rowid FROM completions WHERE namespace = ? ORDER BY accessed_at ASC LIMIT ?)",
+                (self._namespace, count - self._max_entries)
+            ).rowcount
+
+        self.stats.evictions += evicted
+        self._connection.commit()
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Iterator, Literal, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    ModelInfo,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+from clients.pool import _sum_usage
+
+SMALL = "small"
+LARGE = "large"
+TIERS = (SMALL, LARGE)
+
+
+@dataclass
+class TierCall:
+    """Tier requested for the model calls of a block and the tier that answered the last one"""
+    requested: str = SMALL
+    answered: Optional[str] = None
+    fell_back: bool = False
+
+
+_current_call: ContextVar[Optional[TierCall]] = ContextVar("model_tier", default=None)
+
+
+@contextmanager
+def model_tier(tier: str) -> Iterator[TierCall]:
+    """Route the model calls made inside the block (in this task) to `tier`"""
+    call = TierCall(requested=tier)
+    reset = _current_call.set(call)
+    try:
+        yield call
+    finally:
+        _current_call.reset(reset)
+
+
+@dataclass
+class TierStats:
+    name: str
+    model: str
+    calls: int = 0
+    fallbacks: int = 0  # respuestas de este nivel a llamadas pedidas al otro
+    timeouts: int = 0
+    seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+    def __add__(self, other: "TierStats") -> "TierStats":
+        """Counters of the same tier over two runs, possibly with different models"""
+        models = dict.fromkeys(self.model.split(", ") + other.model.split(", "))
+        return TierStats(
+            name=self.name,
+            model=", ".join(models),
+            calls=self.calls + other.calls,
+            fallbacks=self.fallbacks + other.fallbacks,
+            timeouts=self.timeouts + other.timeouts,
+            seconds=self.seconds + other.seconds
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name} ({self.model}): calls={self.calls} fallbacks={self.fallbacks} "
+            f"timeouts={self.timeouts} mean={self.mean_seconds * 1000:.1f}ms"
+        )
+
+
+@dataclass
+class CascadeStats:
+    small: TierStats
+    large: TierStats
+
+    def __add__(self, other: "CascadeStats") -> "CascadeStats":
+        return CascadeStats(small=self.small + other.small, large=self.large + other.large)
+
+    def __str__(self) -> str:
+        return f"{self.small}; {self.large}"
+
+
+class CascadeChatCompletionClient(ChatCompletionClient):
+    """Send each model call to a small or a large model.
+
+    Calls go to the tier set with `model_tier` (the small one by default). A call
+    that exceeds its tier's timeout is retried once on the other tier, without a
+    timeout of its own; the session timeout still bounds it. The tier that
+    answered is written back to the active `TierCall`.
+    """
+
+    def __init__(self, small: ChatCompletionClient, large: ChatCompletionClient,
+                 small_timeout: Optional[float] = None, large_timeout: Optional[float] = None,
+                 small_model: str = SMALL, large_model: str = LARGE):
+        self._clients = {SMALL: small, LARGE: large}
+        self._timeouts = {SMALL: small_timeout, LARGE: large_timeout}
+        self._stats = {SMALL: TierStats(SMALL, small_model), LARGE: TierStats(LARGE, large_model)}
+
+    @property
+    def clients(self) -> Mapping[str, ChatCompletionClient]:
+        return self._clients
+
+    @property
+    def stats(self) -> CascadeStats:
+        return CascadeStats(self._stats[SMALL], self._stats[LARGE])
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        call = _current_call.get() or TierCall()
+        tier = call.requested
+        fallback = LARGE if tier == SMALL else SMALL
+        arguments = dict(tools=tools, tool_choice=tool_choice, json_output=json_output,
+                         extra_create_args=extra_create_args, cancellation_token=cancellation_token)
+        try:
+            result = await self._call(tier, messages, self._timeouts[tier], arguments)
+        except asyncio.TimeoutError:
+            self._stats[tier].timeouts += 1
+            result = await self._call(fallback, messages, None, arguments)
+            self._stats[fallback].fallbacks += 1
+            tier = fallback
+        call.answered = tier
+        call.fell_back = tier != call.requested
+        return result
+
+    async def _call(self, tier: str, messages: Sequence[LLMMessage], timeout: Optional[float],
+                    arguments: Mapping[str, Any]) -> CreateResult:
+        started = time.perf_counter()
+        result = await asyncio.wait_for(self._clients[tier].create(messages, **arguments), timeout)
+        stats = self._stats[tier]
+        stats.calls += 1
+        stats.seconds += time.perf_counter() - started
+        return result
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        # Sin timeout ni cambio de nivel: un flujo ya empezado no se puede repetir en el otro modelo
+        call = _current_call.get() or TierCall()
+        call.answered = call.requested
+        self._stats[call.requested].calls += 1
+        return self._clients[call.requested].create_stream(
+            messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+            extra_create_args=extra_create_args, cancellation_token=cancellation_token
+        )
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return _sum_usage(client.actual_usage() for client in self._clients.values())
+
+    def total_usage(self) -> RequestUsage:
+        return _sum_usage(client.total_usage() for client in self._clients.values())
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._clients[SMALL].count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._clients[SMALL].remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self._clients[SMALL].capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._clients[SMALL].model_info
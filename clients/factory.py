@@ -0,0 +1,168 @@
+import asyncio
+from dataclasses import asdict, dataclass, fields, replace
+from typing import List, Optional
+
+from autogen_core.models import ChatCompletionClient
+from autogen_ext.models.cache import ChatCompletionCache
+from autogen_ext.models.ollama import OllamaChatCompletionClient
+from ollama import AsyncClient
+
+from clients.cache import CacheStats, SqliteCacheStore
+from clients.cascade import CascadeChatCompletionClient, CascadeStats
+from clients.pool import PooledChatCompletionClient, PoolStats
+from clients.scripted import ScriptedChatCompletionClient
+from config import Config
+
+
+@dataclass
+class ClientStats:
+    """Cache, pool and cascade counters of a model client; None for the layers it does not use.
+
+    Adding two of them merges the counters of separate runs, e.g. the processes of a sweep.
+    """
+    cache: Optional[CacheStats] = None
+    pool: Optional[PoolStats] = None
+    cascade: Optional[CascadeStats] = None
+
+    def __add__(self, other: "ClientStats") -> "ClientStats":
+        merged = {}
+        for name in (field.name for field in fields(self)):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            merged[name] = theirs if mine is None else mine if theirs is None else mine + theirs
+        return ClientStats(**merged)
+
+
+def build_model_client(config: Config) -> ChatCompletionClient:
+    """Crea el cliente del modelo, con el pool de conexiones y la caché persistente si están activados.
+
+    Con la cascada activada cada modelo tiene su propio pool y su propia caché.
+    """
+    cascade = config.cascade
+    if not cascade.enabled:
+        return _model_stack(config)
+    small_model, large_model = cascade.small_model or config.model, cascade.large_model or config.model
+    return CascadeChatCompletionClient(
+        _model_stack(replace(config, model=small_model)),
+        _model_stack(replace(config, model=large_model)),
+        small_timeout=cascade.small_timeout,
+        large_timeout=cascade.large_timeout,
+        small_model=small_model,
+        large_model=large_model
+    )
+
+
+def _model_stack(config: Config) -> ChatCompletionClient:
+    if config.pool.enabled:
+        endpoints = config.pool.endpoints or [config.ollama_host]
+        model_client: ChatCompletionClient = PooledChatCompletionClient(
+            {endpoint or "default": _endpoint_client(config, endpoint) for endpoint in endpoints},
+            max_in_flight=config.pool.max_in_flight,
+            coalesce=config.pool.coalesce
+        )
+    else:
+        model_client = _endpoint_client(config, config.ollama_host)
+
+    if config.cache.enabled:
+        max_age = config.cache.max_age_days
+        store = SqliteCacheStore(
+            config.cache.path,
+            namespace=config.model,
+            max_entries=config.cache.max_entries,
+            max_age_seconds=max_age * 86400 if max_age is not None else None
+        )
+        model_client = ChatCompletionCache(model_client, store)
+
+    return model_client
+
+
+def _endpoint_client(config: Config, host: Optional[str]) -> ChatCompletionClient:
+    if config.backend == "ollama":
+        options = {"keep_alive": config.keep_alive} if config.keep_alive is not None else {}
+        return OllamaChatCompletionClient(model=config.model, host=host, **options)
+    if config.backend == "scripted":
+        return ScriptedChatCompletionClient(**asdict(config.scripted))
+    raise ValueError(f"Unknown model backend: {config.backend}")
+
+
+async def preload_model(config: Config) -> None:
+    """Carga el modelo en cada servidor de Ollama para que la primera negociación no espere"""
+    if config.backend != "ollama":
+        return
+    hosts = (config.pool.endpoints if config.pool.enabled else []) or [config.ollama_host]
+    # Una petición sin prompt solo carga el modelo y fija su keep_alive
+    await asyncio.gather(*(
+        AsyncClient(host=host).generate(model=model, keep_alive=config.keep_alive)
+        for host in hosts for model in _models(config)
+    ))
+
+
+def _models(config: Config) -> List[str]:
+    cascade = config.cascade
+    if not cascade.enabled:
+        return [config.model]
+    return sorted({cascade.small_model or config.model, cascade.large_model or config.model})
+
+
+def get_client_stats(model_client: ChatCompletionClient) -> ClientStats:
+    return ClientStats(
+        cache=get_cache_stats(model_client),
+        pool=get_pool_stats(model_client),
+        cascade=get_cascade_stats(model_client)
+    )
+
+
+def get_cache_stats(model_client: ChatCompletionClient) -> Optional[CacheStats]:
+    """Return hit/miss counters when the client goes through the persistent cache"""
+    if isinstance(model_client, CascadeChatCompletionClient):
+        tiers = [stats for stats in map(get_cache_stats, model_client.clients.values()) if stats is not None]
+        if not tiers:
+            return None
+        return CacheStats(
+            hits=sum(stats.hits for stats in tiers),
+            misses=sum(stats.misses for stats in tiers),
+            writes=sum(stats.writes for stats in tiers),
+            evictions=sum(stats.evictions for stats in tiers)
+        )
+    if isinstance(model_client, ChatCompletionCache) and isinstance(model_client.store, SqliteCacheStore):
+        return model_client.store.stats
+    return None
+
+
+def get_pool_stats(model_client: ChatCompletionClient) -> Optional[PoolStats]:
+    """Return queue depth, wait times and coalesced requests when the client goes through the pool"""
+    if isinstance(model_client, CascadeChatCompletionClient):
+        tiers = {tier: get_pool_stats(client) for tier, client in model_client.clients.items()}
+        if all(stats is None for stats in tiers.values()):
+            return None
+        return PoolStats(
+            coalesced=sum(stats.coalesced for stats in tiers.values() if stats is not None),
+            endpoints=[replace(endpoint, name=f"{tier}/{endpoint.name}")
+                       for tier, stats in tiers.items() if stats is not None for endpoint in stats.endpoints]
+        )
+    if isinstance(model_client, ChatCompletionCache):
+        model_client = model_client.client
+    if isinstance(model_client, PooledChatCompletionClient):
+        return model_client.stats
+    return None
+
+
+def get_cascade_stats(model_client: ChatCompletionClient) -> Optional[CascadeStats]:
+    """Return calls, fallbacks, timeouts and mean latency per tier when the model cascade is on"""
+    if isinstance(model_client, CascadeChatCompletionClient):
+        return model_client.stats
+    return None
+
+
+def get_idle_slots(model_client: ChatCompletionClient) -> Optional[int]:
+    """Requests the model backend could start without queueing, None when the pool does not bound it.
+
+    With the cascade, the tightest of the two tiers.
+    """
+    if isinstance(model_client, CascadeChatCompletionClient):
+        tiers = [slots for slots in map(get_idle_slots, model_client.clients.values()) if slots is not None]
+        return min(tiers) if tiers else None
+    if isinstance(model_client, ChatCompletionCache):
+        model_client = model_client.client
+    if isinstance(model_client, PooledChatCompletionClient):
+        return model_client.idle_slots
+    return None
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Literal, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    ModelInfo,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+
+@dataclass
+class EndpointStats:
+    name: str
+    requests: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.wait_seconds / self.requests if self.requests else 0.0
+
+    def __add__(self, other: "EndpointStats") -> "EndpointStats":
+        """Counters of the same endpoint over two runs"""
+        return EndpointStats(
+            name=self.name,
+            requests=self.requests + other.requests,
+            queue_depth=self.queue_depth + other.queue_depth,
+            max_queue_depth=max(self.max_queue_depth, other.max_queue_depth),
+            wait_seconds=self.wait_seconds + other.wait_seconds,
+            max_wait_seconds=max(self.max_wait_seconds, other.max_wait_seconds)
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: requests={self.requests} max_queue={self.max_queue_depth} "
+            f"mean_wait={self.mean_wait_seconds * 1000:.1f}ms max_wait={self.max_wait_seconds * 1000:.1f}ms"
+        )
+
+
+@dataclass
+class PoolStats:
+    coalesced: int = 0
+    endpoints: List[EndpointStats] = field(default_factory=list)
+
+    def __add__(self, other: "PoolStats") -> "PoolStats":
+        endpoints = {endpoint.name: endpoint for endpoint in self.endpoints}
+        for endpoint in other.endpoints:
+            endpoints[endpoint.name] = endpoints[endpoint.name] + endpoint if endpoint.name in endpoints else endpoint
+        return PoolStats(coalesced=self.coalesced + other.coalesced, endpoints=list(endpoints.values()))
+
+    def __str__(self) -> str:
+        return "; ".join([f"coalesced={self.coalesced}"] + [str(endpoint) for endpoint in self.endpoints])
+
+
+class _Endpoint:
+    def __init__(self, name: str, client: ChatCompletionClient, max_in_flight: int):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.assigned = 0  # en cola o en curso
+        self.in_flight = 0
+        self.stats = EndpointStats(name)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.assigned - self.max_in_flight)
+
+    @property
+    def load(self) -> float:
+        return self.assigned / self.max_in_flight
+
+
+class _SharedRequest:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class PooledChatCompletionClient(ChatCompletionClient):
+    """Share one or more model endpoints between every agent and session.
+
+    Each endpoint accepts at most `max_in_flight` concurrent requests; the rest
+    wait in its queue. New requests go to the least loaded endpoint, and a
+    request identical to one already in flight waits for that one instead of
+    reaching the server again. Queue depth and wait time are kept per endpoint.
+    """
+
+    def __init__(self, clients: Dict[str, ChatCompletionClient], max_in_flight: int = 2, coalesce: bool = True):
+        if not clients:
+            raise ValueError("PooledChatCompletionClient needs at least one endpoint")
+        self._endpoints = [_Endpoint(name, client, max_in_flight) for name, client in clients.items()]
+        self._coalesce = coalesce
+        self._in_flight: Dict[str, _SharedRequest] = {}
+        self._stats = PoolStats(endpoints=[endpoint.stats for endpoint in self._endpoints])
+
+    @property
+    def stats(self) -> PoolStats:
+        return self._stats
+
+    @property
+    def idle_slots(self) -> int:
+        """Requests the endpoints could start right now without queueing"""
+        return sum(max(0, endpoint.max_in_flight - endpoint.assigned) for endpoint in self._endpoints)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = _request_key(messages, tools, json_output, extra_create_args) if self._coalesce else None
+        shared = self._in_flight.get(key) if key is not None else None
+        coalesced = shared is not None
+        if shared is None:
+            endpoint = self._least_loaded()
+            endpoint.assigned += 1
+            shared = _SharedRequest(asyncio.ensure_future(self._call(
+                endpoint, messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args
+            )))
+            if key is not None:
+                self._in_flight[key] = shared
+                shared.task.add_done_callback(lambda _task: self._in_flight.pop(key, None))
+        else:
+            self._stats.coalesced += 1
+
+        # Cancelar una petición solo deja de esperarla; la llamada se aborta si nadie más la espera
+        shared.waiters += 1
+        waiter = asyncio.ensure_future(asyncio.shield(shared.task))
+        if cancellation_token is not None:
+            cancellation_token.link_future(waiter)
+        try:
+            result = await waiter
+        except asyncio.CancelledError:
+            if shared.waiters == 1:
+                shared.task.cancel()
+            raise
+        finally:
+            shared.waiters -= 1
+        return result.model_copy(update={"cached": True}) if coalesced else result
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        async def _stream() -> AsyncGenerator[Union[str, CreateResult], None]:
+            endpoint = self._least_loaded()
+            endpoint.assigned += 1
+            try:
+                await self._acquire(endpoint)
+                try:
+                    async for chunk in endpoint.client.create_stream(
+                        messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                        extra_create_args=extra_create_args, cancellation_token=cancellation_token
+                    ):
+                        yield chunk
+                finally:
+                    self._release(endpoint)
+            finally:
+                endpoint.assigned -= 1
+
+        return _stream()
+
+    async def _call(self, endpoint: _Endpoint, messages: Sequence[LLMMessage], **kwargs: Any) -> CreateResult:
+        try:
+            await self._acquire(endpoint)
+            try:
+                return await endpoint.client.create(messages, **kwargs)
+            finally:
+                self._release(endpoint)
+        finally:
+            endpoint.assigned -= 1
+
+    async def _acquire(self, endpoint: _Endpoint) -> None:
+        stats = endpoint.stats
+        stats.requests += 1
+        stats.queue_depth = endpoint.queue_depth
+        stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+        started = time.perf_counter()
+        await endpoint.semaphore.acquire()
+        waited = time.perf_counter() - started
+        stats.wait_seconds += waited
+        stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+        endpoint.in_flight += 1
+
+    def _release(self, endpoint: _Endpoint) -> None:
+        endpoint.in_flight -= 1
+        endpoint.semaphore.release()
+        endpoint.stats.queue_depth = max(0, endpoint.queue_depth - 1)
+
+    def _least_loaded(self) -> _Endpoint:
+        return min(self._endpoints, key=lambda endpoint: endpoint.load)
+
+    async def close(self) -> None:
+        for endpoint in self._endpoints:
+            await endpoint.client.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return _sum_usage(endpoint.client.actual_usage() for endpoint in self._endpoints)
+
+    def total_usage(self) -> RequestUsage:
+        return _sum_usage(endpoint.client.total_usage() for endpoint in self._endpoints)
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._endpoints[0].client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._endpoints[0].client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self._endpoints[0].client.capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._endpoints[0].client.model_info
+
+
+def _request_key(messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema],
+                 json_output: Optional[bool | type[BaseModel]], extra_create_args: Mapping[str, Any]) -> str:
+    # Misma clave que ChatCompletionCache: mensajes, herramientas, esquema de salida y argumentos extra
+    if isinstance(json_output, type) and issubclass(json_output, BaseModel):
+        json_output_data: Any = json.dumps(json_output.model_json_schema())
+    else:
+        json_output_data = json_output
+    data = {
+        "messages": [message.model_dump() for message in messages],
+        "tools": [(tool.schema if isinstance(tool, Tool) else tool) for tool in tools],
+        "json_output": json_output_data,
+        "extra_create_args": extra_create_args,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _sum_usage(usages) -> RequestUsage:
+    prompt_tokens = completion_tokens = 0
+    for usage in usages:
+        prompt_tokens += usage.prompt_tokens
+        completion_tokens += usage.completion_tokens
+    return RequestUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import random
+import re
+from typing import Any, AsyncGenerator, Literal, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    AssistantMessage,
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    ModelFamily,
+    ModelInfo,
+    RequestUsage,
+    SystemMessage,
+    UserMessage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+from models.units import Money, parse_duration_days, parse_money
+
+# Exponente de la curva de concesión: objetivo = inicio + (límite - inicio) * progreso ** e
+CONCESSION_EXPONENTS = {
+    "linear": 1.0,
+    "boulware": 3.0,   # concede poco al principio y mucho al final
+    "conceder": 1 / 3,  # concede mucho al principio
+    "hardline": None,  # nunca se mueve de su oferta inicial
+}
+
+_CLIENT_LIMITS = re.compile(r"maximum budget is (.+?) and the maximum time you can wait is (.+?)\. ")
+_DEVELOPER_LIMITS = re.compile(r"minimum acceptable budget is (.+?) and minimum acceptable time is (.+?)\. ")
+_COUNTERPART_OFFER = re.compile(
+    r"(?:counter-offered: (?P<time>.+?) timeline and (?P<budget>.+?) budget"
+    r"|estimates a timeline of (?P<initial_time>.+?) and offers a budget of (?P<initial_budget>.+?)\.\n)"
+)
+
+
+class ScriptedChatCompletionClient(ChatCompletionClient):
+    """Deterministic stand-in for a model server that negotiates by formula.
+
+    It reads the party's limits from the system message and the counterpart's
+    offer from the last prompt, then answers with a valid `ClientResponse` or
+    `DeveloperResponse` following a concession curve over `horizon` turns. Used
+    to measure framework overhead and to run the system without Ollama.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, strategy: str = "linear",
+                 horizon: int = 4, seed: int = 0):
+        if strategy not in CONCESSION_EXPONENTS:
+            raise ValueError(f"Unknown concession strategy: {strategy}")
+        self._latency = latency
+        self._jitter = jitter
+        self._exponent = CONCESSION_EXPONENTS[strategy]
+        self._horizon = horizon
+        self._random = random.Random(seed)
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._actual_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        delay = self._latency + self._random.uniform(0, self._jitter) if self._jitter else self._latency
+        if delay > 0:
+            # Como un servidor real, la espera se aborta si se cancela la petición
+            sleep = asyncio.ensure_future(asyncio.sleep(delay))
+            if cancellation_token is not None:
+                cancellation_token.link_future(sleep)
+            await sleep
+
+        if not isinstance(json_output, type) or not issubclass(json_output, BaseModel):
+            raise ValueError("ScriptedChatCompletionClient only answers structured negotiation requests")
+
+        fields = json_output.model_fields
+        if "budget" in fields:
+            content = self._client_turn(messages)
+        elif "developer_budget_request" in fields:
+            content = self._developer_turn(messages)
+        else:
+            raise ValueError(f"Unsupported output schema: {json_output.__name__}")
+
+        usage = RequestUsage(
+            prompt_tokens=self.count_tokens(messages),
+            completion_tokens=max(1, len(content) // 4),
+        )
+        self._actual_usage = usage
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + usage.completion_tokens,
+        )
+        return CreateResult(finish_reason="stop", content=content, usage=usage, cached=False)
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        async def _stream() -> AsyncGenerator[Union[str, CreateResult], None]:
+            yield await self.create(messages, json_output=json_output, cancellation_token=cancellation_token)
+
+        return _stream()
+
+    def _progress(self, messages: Sequence[LLMMessage]) -> float:
+        if self._exponent is None:
+            return 0.0
+        turn = sum(1 for message in messages if isinstance(message, AssistantMessage))
+        return min(1.0, turn / self._horizon) ** self._exponent
+
+    def _client_turn(self, messages: Sequence[LLMMessage]) -> str:
+        max_budget, max_days = _limits(messages, _CLIENT_LIMITS)
+        progress = self._progress(messages)
+        target_budget = max_budget.amount * (0.55 + 0.45 * progress)
+        target_days = max_days * (0.7 + 0.3 * progress)
+
+        offer = _counterpart_offer(messages)
+        accepted = offer is not None and offer[0].amount <= target_budget and offer[1] <= max_days
+        if accepted:
+            target_budget, target_days = offer[0].amount, offer[1]
+
+        return json.dumps({
+            "time": _format_days(target_days),
+            "budget": _format_money(target_budget, max_budget),
+            "conditions_accepted": accepted,
+            "reasoning": "Scripted client offer." if not accepted else "Scripted client accepts the request.",
+        })
+
+    def _developer_turn(self, messages: Sequence[LLMMessage]) -> str:
+        min_budget, min_days = _limits(messages, _DEVELOPER_LIMITS)
+        progress = self._progress(messages)
+        target_budget = min_budget.amount * (1.75 - 0.75 * progress)
+        target_days = min_days * (1.5 - 0.5 * progress)
+
+        offer = _counterpart_offer(messages)
+        accepted = offer is not None and offer[0].amount >= target_budget and offer[1] >= min_days
+        if accepted:
+            target_budget, target_days = offer[0].amount, offer[1]
+
+        return json.dumps({
+            "developer_estimated_time": _format_days(target_days),
+            "developer_budget_request": _format_money(target_budget, min_budget),
+            "conditions_accepted": accepted,
+            "reasoning": "Scripted developer request." if not accepted else "Scripted developer accepts the offer.",
+        })
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._actual_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        # Aproximación habitual de cuatro caracteres por token
+        return sum(len(str(message.content)) for message in messages) // 4
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return max(0, 32768 - self.count_tokens(messages))
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self.model_info  # type: ignore
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return ModelInfo(
+            vision=False,
+            function_calling=False,
+            json_output=True,
+            family=ModelFamily.UNKNOWN,
+            structured_output=True,
+        )
+
+
+def _limits(messages: Sequence[LLMMessage], pattern: re.Pattern) -> tuple:
+    system = next(message.content for message in messages if isinstance(message, SystemMessage))
+    match = pattern.search(system)
+    budget = parse_money(match.group(1)) if match else None
+    days = parse_duration_days(match.group(2)) if match else None
+    if budget is None or days is None:
+        raise ValueError("Could not read the negotiation limits from the system message")
+    return budget, days
+
+
+def _counterpart_offer(messages: Sequence[LLMMessage]) -> Optional[tuple]:
+    prompt = next((message.content for message in reversed(messages) if isinstance(message, UserMessage)), "")
+    match = _COUNTERPART_OFFER.search(str(prompt))
+    if match is None:
+        return None
+    budget = parse_money(match.group("budget") or match.group("initial_budget"))
+    days = parse_duration_days(match.group("time") or match.group("initial_time"))
+    if budget is None or days is None:
+        return None
+    return budget, days
+
+
+def _format_money(amount: float, limit: Money) -> str:
+    return f"{amount:.0f} {(limit.currency or '').lower()}".strip()
+
+
+def _format_days(days: float) -> str:
+    return f"{round(days)} days"
@@ -1,5 +1,106 @@
 import yaml
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+
+@dataclass
+class CacheConfig:
+    enabled: bool = True
+    path: str = ".cache/llm_cache.sqlite"
+    max_entries: int = 10000
+    max_age_days: Optional[float] = 30
+
+@dataclass
+class ScriptedConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    strategy: str = "linear"
+    horizon: int = 4
+    seed: int = 0
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = True
+    json_path: Optional[str] = "metrics.json"
+    prometheus_path: Optional[str] = "metrics.prom"
+    otlp_endpoint: Optional[str] = None  # p. ej. "http://localhost:4317" para exportar spans
+
+@dataclass
+class EventsConfig:
+    console: bool = True
+    transcripts_dir: Optional[str] = None  # un fichero JSONL por sesión
+    compress: bool = False
+    buffer_size: int = 64
+
+@dataclass
+class CheckpointConfig:
+    enabled: bool = True
+    path: str = ".cache/checkpoints.sqlite"
+
+@dataclass
+class PoolConfig:
+    enabled: bool = True
+    # Servidores de Ollama que comparten la carga; vacío = solo ollama_host
+    endpoints: List[str] = field(default_factory=list)
+    max_in_flight: int = 2  # peticiones simultáneas por servidor, el resto espera en cola
+    coalesce: bool = True  # una petición idéntica a otra en curso espera su respuesta
+
+@dataclass
+class CascadeConfig:
+    enabled: bool = False
+    small_model: Optional[str] = None  # rondas rutinarias; por defecto `model`
+    large_model: Optional[str] = None  # rondas decisivas y respuestas no válidas; por defecto `model`
+    small_timeout: Optional[float] = 30.0  # segundos; si se agota, responde el otro modelo
+    large_timeout: Optional[float] = 120.0
+    # Se escala al modelo grande si la oferta está a menos de este margen relativo de los límites de la parte
+    escalate_margin: float = 0.1
+
+@dataclass
+class SpeculationConfig:
+    enabled: bool = False
+    candidates: int = 2  # peticiones del desarrollador para las que se prepara respuesta en cada turno
+    # Una petición real a menos de este margen relativo de la prevista usa la respuesta preparada
+    tolerance: float = 0.05
+
+@dataclass
+class WorkerConfig:
+    roles: List[str] = field(default_factory=lambda: ["client", "developer"])
+    ollama_host: Optional[str] = None  # p. ej. "http://gpu-1:11434"; por defecto el de la configuración
+    model: Optional[str] = None
+
+@dataclass
+class DistributedConfig:
+    host_address: str = "localhost:50060"
+    # Cada worker es un proceso; las sesiones se reparten entre los workers de cada rol
+    workers: List[WorkerConfig] = field(default_factory=lambda: [WorkerConfig()])
+    # Mensajes en binario compacto; false vuelve a JSON. Host y workers deben coincidir
+    compact_messages: bool = True
+
+    def __post_init__(self):
+        self.workers = [WorkerConfig(**worker) if isinstance(worker, dict) else worker for worker in self.workers]
+
+@dataclass
+class ServerConfig:
+    host: str = "127.0.0.1"
+    port: int = 8765
+    unix_socket: Optional[str] = None  # si se indica, escucha en este socket en lugar de TCP
+    preload: bool = True  # carga el modelo en Ollama al arrancar el servidor
+    session_timeout: float = 600.0
+
+@dataclass
+class BidderConfig:
+    name: str
+    min_budget: str
+    min_time: str
+
+@dataclass
+class AuctionConfig:
+    # Perfiles de los desarrolladores que pujan a la vez por el proyecto
+    developers: List[BidderConfig] = field(default_factory=list)
+    timeout: float = 600.0
+
+    def __post_init__(self):
+        self.developers = [BidderConfig(**bidder) if isinstance(bidder, dict) else bidder
+                           for bidder in self.developers]
 
 @dataclass
 class Config:
@@ -9,6 +110,52 @@ class Config:
     min_budget: str
     min_time: str
     description: str
+    max_round: int = 5
+    decision_rules: bool = True
+    max_reasks: int = 2  # nuevas peticiones al modelo si su respuesta no es válida
+    compact_prompts: bool = True  # a partir de la segunda ronda solo se envían los cambios
+    prompt_token_budget: int = 200
+    predict_deadlock: bool = True  # termina antes si las ofertas no convergen a tiempo
+    deadlock_confidence: float = 0.9
+    backend: str = "ollama"  # "ollama" o "scripted" (sin servidor de modelos)
+    ollama_host: Optional[str] = None
+    keep_alive: Optional[Union[str, float]] = None  # tiempo que Ollama mantiene el modelo cargado ("30m", -1 = siempre)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    pool: PoolConfig = field(default_factory=PoolConfig)
+    cascade: CascadeConfig = field(default_factory=CascadeConfig)
+    speculation: SpeculationConfig = field(default_factory=SpeculationConfig)
+    scripted: ScriptedConfig = field(default_factory=ScriptedConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    events: EventsConfig = field(default_factory=EventsConfig)
+    checkpoints: CheckpointConfig = field(default_factory=CheckpointConfig)
+    distributed: DistributedConfig = field(default_factory=DistributedConfig)
+    auction: AuctionConfig = field(default_factory=AuctionConfig)
+    server: ServerConfig = field(default_factory=ServerConfig)
+
+    def __post_init__(self):
+        # Las secciones anidadas del YAML llegan como diccionarios
+        if isinstance(self.cache, dict):
+            self.cache = CacheConfig(**self.cache)
+        if isinstance(self.pool, dict):
+            self.pool = PoolConfig(**self.pool)
+        if isinstance(self.cascade, dict):
+            self.cascade = CascadeConfig(**self.cascade)
+        if isinstance(self.speculation, dict):
+            self.speculation = SpeculationConfig(**self.speculation)
+        if isinstance(self.scripted, dict):
+            self.scripted = ScriptedConfig(**self.scripted)
+        if isinstance(self.metrics, dict):
+            self.metrics = MetricsConfig(**self.metrics)
+        if isinstance(self.events, dict):
+            self.events = EventsConfig(**self.events)
+        if isinstance(self.checkpoints, dict):
+            self.checkpoints = CheckpointConfig(**self.checkpoints)
+        if isinstance(self.distributed, dict):
+            self.distributed = DistributedConfig(**self.distributed)
+        if isinstance(self.auction, dict):
+            self.auction = AuctionConfig(**self.auction)
+        if isinstance(self.server, dict):
+            self.server = ServerConfig(**self.server)
 
 def load_config(config_file: str = "config.yaml") -> Config:
     """Carga la configuración desde el archivo YAML"""
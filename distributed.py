@@ -0,0 +1,243 @@
+import asyncio
+import os
+import sys
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from autogen_core import AgentRuntime, try_get_known_serializers_for_type
+
+from batch import Scenario, drive_sessions, load_scenarios, register_agents, report_run
+from clients.factory import build_model_client
+from config import Config, DistributedConfig, WorkerConfig
+from event_stream import create_event_stream
+from metrics import create_metrics
+from models.codec import CompactMessageSerializer
+from models.interfaces import ApplicationDescription, FinalAgreement, InitialDescription, NegotiationOffer
+from models.topics import ROLE_TOPICS, TopicRouter
+
+# Línea que escribe un worker cuando sus agentes ya están registrados en el host
+WORKER_READY = "negotiation-worker-ready"
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def _grpc_runtime():
+    try:
+        from autogen_ext.runtimes.grpc import GrpcWorkerAgentRuntime, GrpcWorkerAgentRuntimeHost
+    except ImportError as error:
+        raise RuntimeError(
+            "The distributed mode needs the distributed extras: uv sync --extra distributed"
+        ) from error
+    return GrpcWorkerAgentRuntime, GrpcWorkerAgentRuntimeHost
+
+
+def with_workers(settings: DistributedConfig, workers: Optional[int]) -> DistributedConfig:
+    """Replace the topology by `workers` processes hosting both roles"""
+    if workers is None:
+        return settings
+    return replace(settings, workers=[WorkerConfig() for _ in range(workers)])
+
+
+def worker_shards(settings: DistributedConfig) -> List[Dict[str, int]]:
+    """Shard of each role hosted by every worker, in topology order"""
+    next_shard = {role: 0 for role in ROLE_TOPICS}
+    shards = []
+    for worker in settings.workers:
+        unknown = set(worker.roles) - set(ROLE_TOPICS)
+        if unknown:
+            raise ValueError(f"Unknown worker roles: {sorted(unknown)}")
+        shards.append({role: next_shard[role] for role in worker.roles})
+        for role in worker.roles:
+            next_shard[role] += 1
+
+    missing = [role for role, count in next_shard.items() if count == 0]
+    if missing:
+        raise ValueError(f"No worker hosts the roles: {missing}")
+    return shards
+
+
+def topic_router(settings: DistributedConfig) -> TopicRouter:
+    counts = {role: sum(1 for worker in settings.workers if role in worker.roles) for role in ROLE_TOPICS}
+    return TopicRouter(client_shards=counts["client"], developer_shards=counts["developer"])
+
+
+def add_message_serializers(runtime: AgentRuntime, compact: bool = True) -> None:
+    # Todos los workers publican mensajes que solo manejan agentes de otros procesos.
+    # Registrar un agente vuelve a poner el serializador JSON de los tipos que maneja,
+    # así que se llama después de registrar los agentes
+    for message_type in (InitialDescription, ApplicationDescription, NegotiationOffer, FinalAgreement):
+        if compact:
+            runtime.add_message_serializer(CompactMessageSerializer(message_type))
+        else:
+            runtime.add_message_serializer(try_get_known_serializers_for_type(message_type))
+
+
+async def run_host(settings: DistributedConfig) -> None:
+    """Serve the gRPC host until SIGTERM/SIGINT"""
+    _, GrpcWorkerAgentRuntimeHost = _grpc_runtime()
+    host = GrpcWorkerAgentRuntimeHost(address=settings.host_address)
+    host.start()
+    await host.stop_when_signal()
+
+
+async def run_worker(config: Config, index: int, scenario_file: Optional[str] = None,
+                     quiet: bool = False) -> None:
+    """Host the agents of one worker of the topology until SIGTERM/SIGINT"""
+    GrpcWorkerAgentRuntime, _ = _grpc_runtime()
+    settings = config.distributed
+    worker = settings.workers[index]
+    config = replace(
+        config,
+        model=worker.model or config.model,
+        ollama_host=worker.ollama_host or config.ollama_host,
+        # Un worker con servidor propio no reparte sus peticiones con los del pool global
+        pool=replace(config.pool, endpoints=[worker.ollama_host]) if worker.ollama_host else config.pool
+    )
+    scenarios = load_scenarios(scenario_file, config) if scenario_file else [Scenario.from_config(config)]
+    scenarios_by_session = {scenario.session_id: scenario for scenario in scenarios}
+
+    model_client = build_model_client(config)
+    metrics = create_metrics(config.metrics)
+    events, transcripts = create_event_stream(config.events, quiet)
+
+    runtime = GrpcWorkerAgentRuntime(host_address=settings.host_address)
+    await runtime.start()
+    await register_agents(
+        runtime,
+        model_client,
+        scenarios_by_session.__getitem__,
+        metrics,
+        events,
+        router=topic_router(settings),
+        shards=worker_shards(settings)[index]
+    )
+    add_message_serializers(runtime, settings.compact_messages)
+    print(WORKER_READY, flush=True)
+
+    await runtime.stop_when_signal()
+
+    report_run(model_client, metrics, _worker_path(config.metrics.json_path, index),
+               _worker_path(config.metrics.prometheus_path, index), label=f"worker {index}")
+    events.close()
+    if transcripts is not None:
+        transcripts.close()
+    await model_client.close()
+
+
+async def run_distributed_batch(config: Config, scenario_file: Optional[str] = None, concurrency: int = 4,
+                                output_file: str = "results.jsonl", session_timeout: Optional[float] = 600.0,
+                                quiet: bool = False, launch: bool = True,
+                                workers: Optional[int] = None) -> List[dict]:
+    """Drive the scenarios through the gRPC host.
+
+    With `launch` the host and one process per worker of the topology are started
+    on this machine and stopped at the end; otherwise they must already be running.
+    """
+    GrpcWorkerAgentRuntime, _ = _grpc_runtime()
+    settings = with_workers(config.distributed, workers)
+    scenarios = load_scenarios(scenario_file, config) if scenario_file else [Scenario.from_config(config)]
+
+    processes: List[asyncio.subprocess.Process] = []
+    forwarders: List[asyncio.Task] = []
+    try:
+        if launch:
+            host, forwarder = await _spawn(["host"])
+            processes.append(host)
+            forwarders.append(forwarder)
+            await _wait_for_host(settings.host_address, host)
+
+            ready = []
+            for index in range(len(settings.workers)):
+                arguments = ["worker", str(index)]
+                if scenario_file:
+                    arguments += ["--scenarios", scenario_file]
+                if quiet:
+                    arguments.append("--quiet")
+                if workers is not None:
+                    arguments += ["--workers", str(workers)]
+                event = asyncio.Event()
+                worker, forwarder = await _spawn(arguments, event)
+                processes.append(worker)
+                forwarders.append(forwarder)
+                ready.append(_wait_until_ready(event, worker))
+            await asyncio.gather(*ready)
+
+        metrics = create_metrics(config.metrics)
+        # Los turnos los escriben los workers; aquí solo se añade el resultado de cada sesión
+        events, transcripts = create_event_stream(config.events, quiet=True)
+        runtime = GrpcWorkerAgentRuntime(host_address=settings.host_address)
+        add_message_serializers(runtime, settings.compact_messages)
+        await runtime.start()
+        try:
+            results = await drive_sessions(
+                runtime, scenarios, concurrency, output_file, session_timeout,
+                metrics, router=topic_router(settings), record_outcomes=True,
+                add_serializers=lambda runtime: add_message_serializers(runtime, settings.compact_messages),
+                events=events
+            )
+        finally:
+            await runtime.stop()
+            events.close()
+            if transcripts is not None:
+                transcripts.close()
+        if metrics is not None:
+            metrics.export(config.metrics.json_path, config.metrics.prometheus_path)
+        return results
+    finally:
+        for process in reversed(processes):
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+        await asyncio.gather(*forwarders, return_exceptions=True)
+
+
+async def _spawn(arguments: List[str], ready: Optional[asyncio.Event] = None) -> tuple:
+    # Los procesos hijos leen el mismo config.yaml desde el directorio actual
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, MAIN_SCRIPT, *arguments,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=None
+    )
+
+    async def forward_output() -> None:
+        async for line in process.stdout:
+            text = line.decode("utf-8", errors="replace").rstrip("\n")
+            if ready is not None and text == WORKER_READY:
+                ready.set()
+            else:
+                print(text, flush=True)
+
+    return process, asyncio.create_task(forward_output())
+
+
+async def _wait_for_host(address: str, process: asyncio.subprocess.Process, timeout: float = 30.0) -> None:
+    host, port = address.rsplit(":", 1)
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        if process.returncode is not None:
+            raise RuntimeError(f"The gRPC host exited with code {process.returncode}")
+        try:
+            _, writer = await asyncio.open_connection(host, int(port))
+            writer.close()
+            await writer.wait_closed()
+            return
+        except OSError:
+            if asyncio.get_running_loop().time() > deadline:
+                raise RuntimeError(f"The gRPC host is not listening on {address}")
+            await asyncio.sleep(0.1)
+
+
+async def _wait_until_ready(ready: asyncio.Event, process: asyncio.subprocess.Process) -> None:
+    exited = asyncio.create_task(process.wait())
+    became_ready = asyncio.create_task(ready.wait())
+    await asyncio.wait({exited, became_ready}, return_when=asyncio.FIRST_COMPLETED)
+    if not ready.is_set():
+        raise RuntimeError(f"A worker exited with code {process.returncode} before registering its agents")
+    exited.cancel()
+
+
+def _worker_path(path: Optional[str], index: int) -> Optional[str]:
+    if not path:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.worker-{index}{extension}"
@@ -0,0 +1,151 @@
+import asyncio
+import gzip
+import json
+import os
+from collections import defaultdict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from config import EventsConfig
+from models.events import (
+    AgreementEvent,
+    CounterOfferEvent,
+    DeadlockPredictedEvent,
+    HandlerErrorEvent,
+    InvalidResponseEvent,
+    IterationLimitEvent,
+    NegotiationEvent,
+    OfferEvent,
+    RejectionEvent,
+)
+
+EventCallback = Callable[[NegotiationEvent], None]
+
+_END = object()
+
+
+class EventStream:
+    """Fan-out of negotiation events to callbacks and async iterators"""
+
+    def __init__(self):
+        self._callbacks: List[EventCallback] = []
+        self._queues: List[asyncio.Queue] = []
+
+    def subscribe(self, callback: EventCallback) -> Callable[[], None]:
+        """Call `callback` for every event; returns a function that unsubscribes it"""
+        self._callbacks.append(callback)
+        return lambda: self._callbacks.remove(callback)
+
+    async def iterate(self, session_id: Optional[str] = None) -> AsyncIterator[NegotiationEvent]:
+        """Yield events (optionally of one session) until the stream is closed.
+
+        With a `session_id` the iteration also stops after that session's terminal event.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is _END:
+                    return
+                if session_id is not None and event.session_id != session_id:
+                    continue
+                yield event
+                if session_id is not None and event.terminal:
+                    return
+        finally:
+            self._queues.remove(queue)
+
+    def emit(self, event: NegotiationEvent) -> None:
+        for callback in self._callbacks:
+            callback(event)
+        for queue in self._queues:
+            queue.put_nowait(event)
+
+    def close(self) -> None:
+        for queue in self._queues:
+            queue.put_nowait(_END)
+
+
+def create_event_stream(settings: EventsConfig, quiet: bool = False) -> Tuple[EventStream, Optional["TranscriptSink"]]:
+    """Build the stream with the sinks enabled in the configuration"""
+    stream = EventStream()
+    if settings.console and not quiet:
+        stream.subscribe(ConsoleSink())
+
+    transcripts = None
+    if settings.transcripts_dir:
+        transcripts = TranscriptSink(settings.transcripts_dir, settings.compress, settings.buffer_size)
+        stream.subscribe(transcripts)
+    return stream, transcripts
+
+
+class ConsoleSink:
+    """Human readable one-line-per-event console output"""
+
+    def __call__(self, event: NegotiationEvent) -> None:
+        role = "Cliente" if event.role == "client" else "Desarrollador"
+        prefix = f"[{event.session_id} #{event.iteration}]"
+        rules = " (reglas)" if getattr(event, "decided_by", "model") == "rules" else ""
+        if getattr(event, "model_tier", ""):
+            rules = f" (modelo {'grande' if event.model_tier == 'large' else 'pequeño'})"
+
+        if isinstance(event, CounterOfferEvent):
+            print(f"{prefix} {role} contraoferta{rules}: {event.time}, {event.budget} - {event.reasoning}")
+        elif isinstance(event, OfferEvent):
+            print(f"{prefix} {role} propone{rules}: {event.time}, {event.budget} - {event.reasoning}")
+        elif isinstance(event, AgreementEvent):
+            print(f"{prefix} ¡ACUERDO ALCANZADO! {role} acepta{rules}: {event.time}, {event.budget}")
+        elif isinstance(event, RejectionEvent):
+            print(f"{prefix} NEGOCIACIÓN TERMINADA - {role} rechaza la oferta final: {event.time}, {event.budget}")
+        elif isinstance(event, InvalidResponseEvent):
+            print(f"{prefix} NEGOCIACIÓN TERMINADA - respuesta no válida del {role.lower()}: {event.error}")
+        elif isinstance(event, HandlerErrorEvent):
+            print(f"{prefix} NEGOCIACIÓN TERMINADA - error del {role.lower()}: {event.error}")
+        elif isinstance(event, IterationLimitEvent):
+            print(f"{prefix} NEGOCIACIÓN TERMINADA POR LÍMITE DE ITERACIONES - "
+                  f"cliente {event.client_time}, {event.client_budget} / "
+                  f"desarrollador {event.developer_time}, {event.developer_budget}")
+        elif isinstance(event, DeadlockPredictedEvent):
+            print(f"{prefix} NEGOCIACIÓN TERMINADA - no se prevé acuerdo "
+                  f"(probabilidad {event.deal_probability:.0%}): "
+                  f"cliente {event.client_time}, {event.client_budget} / "
+                  f"desarrollador {event.developer_time}, {event.developer_budget}")
+
+
+class TranscriptSink:
+    """Buffered per-session JSONL transcripts, optionally gzip compressed.
+
+    Lines are kept in memory and appended to `<directory>/<session>.jsonl[.gz]`
+    when a session buffers `buffer_size` events, ends, or the sink is closed.
+    """
+
+    def __init__(self, directory: str, compress: bool = False, buffer_size: int = 64):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._compress = compress
+        self._buffer_size = buffer_size
+        self._buffers: Dict[str, List[str]] = defaultdict(list)
+
+    def path_for(self, session_id: str) -> str:
+        extension = ".jsonl.gz" if self._compress else ".jsonl"
+        return os.path.join(self._directory, f"{session_id}{extension}")
+
+    def __call__(self, event: NegotiationEvent) -> None:
+        buffer = self._buffers[event.session_id]
+        buffer.append(json.dumps(event.to_dict(), ensure_ascii=False))
+        if event.terminal or len(buffer) >= self._buffer_size:
+            self.flush(event.session_id)
+
+    def flush(self, session_id: str) -> None:
+        lines = self._buffers.pop(session_id, None)
+        if not lines:
+            return
+        data = "\n".join(lines) + "\n"
+        # Cada volcado añade un miembro gzip; los lectores los concatenan de forma transparente
+        opener = gzip.open if self._compress else open
+        with opener(self.path_for(session_id), "at", encoding="utf-8") as file:
+            file.write(data)
+
+    def close(self) -> None:
+        for session_id in list(self._buffers):
+            self.flush(session_id)
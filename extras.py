@@ -0,0 +1,11 @@
+# Dependencias opcionales (extras de pyproject.toml): se importan solo al usarlas,
+# así el resto del sistema funciona sin ellas
+
+
+def require_numpy(feature: str):
+    """The numpy module, or a RuntimeError telling how to install the extras `feature` needs"""
+    try:
+        import numpy
+    except ImportError as error:
+        raise RuntimeError(f"{feature} needs NumPy, from the sweep extras: uv sync --extra sweep") from error
+    return numpy
@@ -1,46 +1,273 @@
-from agents.developer import DeveloperAgent
-from agents.client import ClientAgent
+import argparse
+import json
+from dataclasses import asdict, replace
+
+from analytics import run_analysis
+from auction import run_auction
+from benchmark import run_benchmark, run_payload_benchmark
+from batch import Scenario, load_scenarios, register_agents, report_run, resume_batch, run_batch
+from server import run_server
+from sweep import expand_grid, load_grid, run_sweep
+from distributed import run_distributed_batch, run_host, run_worker, with_workers
+from event_stream import create_event_stream
+from metrics import MetricsInterventionHandler, create_metrics
+from clients.scripted import CONCESSION_EXPONENTS
+from clients.factory import build_model_client
 from models.interfaces import InitialDescription
 from autogen_core import SingleThreadedAgentRuntime
-from autogen_ext.models.ollama import OllamaChatCompletionClient
 from autogen_core import TopicId
 from config import load_config
 
-async def run_requirements_gathering():
+async def run_requirements_gathering(quiet: bool = False):
     # Cargar configuración
     config = load_config()
+    scenario = Scenario.from_config(config)
     
     # Configurar cliente del modelo
-    model_client = OllamaChatCompletionClient(model=config.model)
+    model_client = build_model_client(config)
+    metrics = create_metrics(config.metrics)
     
-    runtime = SingleThreadedAgentRuntime()
+    runtime = SingleThreadedAgentRuntime(
+        intervention_handlers=[MetricsInterventionHandler(metrics)] if metrics is not None else None
+    )
     
     # Registrar agentes con configuración
-    await ClientAgent.register(runtime, "client", lambda: ClientAgent(
-        model_client,
-        max_round=5,
-        max_budget=config.max_budget,
-        max_time=config.max_time
-    ))
-    
-    await DeveloperAgent.register(runtime, "developer", lambda: DeveloperAgent(
-        model_client,
-        min_budget=config.min_budget,
-        min_time=config.min_time
-    ))
+    events, transcripts = create_event_stream(config.events, quiet)
+    await register_agents(runtime, model_client, lambda session_id: scenario, metrics, events)
     
     runtime.start()
     
     await runtime.publish_message(
-        InitialDescription(description=config.description),
-        topic_id=TopicId(type="client_topic", source="default")
+        InitialDescription(description=scenario.description),
+        topic_id=TopicId(type="client_topic", source=scenario.session_id)
     )
     
     await runtime.stop_when_idle()
 
+    report_run(model_client, metrics, config.metrics.json_path, config.metrics.prometheus_path)
+    events.close()
+    if transcripts is not None:
+        transcripts.close()
+
+async def run_batch_negotiations(args: argparse.Namespace):
+    config = load_config()
+    scenarios = load_scenarios(args.scenarios, config)
+    results = await run_batch(
+        scenarios,
+        config,
+        concurrency=args.concurrency,
+        output_file=args.output,
+        session_timeout=args.session_timeout,
+        quiet=args.quiet
+    )
+    agreements = sum(1 for result in results if result["agreement_reached"])
+    print(f"{len(results)} negociaciones, {agreements} acuerdos. Resultados en {args.output}")
+
+async def resume_batch_negotiations(args: argparse.Namespace):
+    config = load_config()
+    results = await resume_batch(
+        config,
+        concurrency=args.concurrency,
+        output_file=args.output,
+        session_timeout=args.session_timeout,
+        quiet=args.quiet
+    )
+    agreements = sum(1 for result in results if result["agreement_reached"])
+    print(f"{len(results)} negociaciones reanudadas, {agreements} acuerdos. Resultados en {args.output}")
+
+async def run_project_auction(args: argparse.Namespace):
+    config = load_config()
+    result = await run_auction(
+        config,
+        config.auction.developers,
+        timeout=args.timeout if args.timeout is not None else config.auction.timeout,
+        quiet=args.quiet
+    )
+    if result.winner is not None:
+        agreement = result.agreement
+        print(f"Gana {result.winner}: {agreement['agreed_time']}, {agreement['agreed_budget']} "
+              f"en {result.wall_seconds} s")
+    else:
+        print(f"Sin acuerdo con ningún desarrollador ({result.wall_seconds} s)")
+    for name, reason in result.outcomes.items():
+        print(f"  {name}: {reason}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(asdict(result), file, indent=2, ensure_ascii=False)
+
+async def run_distributed(args: argparse.Namespace):
+    config = load_config()
+    results = await run_distributed_batch(
+        config,
+        scenario_file=args.scenarios,
+        concurrency=args.concurrency,
+        output_file=args.output,
+        session_timeout=args.session_timeout,
+        quiet=args.quiet,
+        launch=not args.attach,
+        workers=args.workers
+    )
+    agreements = sum(1 for result in results if result["agreement_reached"])
+    print(f"{len(results)} negociaciones, {agreements} acuerdos. Resultados en {args.output}")
+
+async def run_distributed_worker(args: argparse.Namespace):
+    config = load_config()
+    config = replace(config, distributed=with_workers(config.distributed, args.workers))
+    await run_worker(config, args.index, scenario_file=args.scenarios, quiet=args.quiet)
+
+async def run_negotiation_server(args: argparse.Namespace):
+    config = load_config()
+    settings = config.server
+    if args.host is not None or args.port is not None or args.unix_socket is not None:
+        settings = replace(
+            settings,
+            host=args.host if args.host is not None else settings.host,
+            port=args.port if args.port is not None else settings.port,
+            unix_socket=args.unix_socket if args.unix_socket is not None else settings.unix_socket
+        )
+    await run_server(replace(config, server=settings), quiet=args.quiet)
+
+def run_parameter_sweep(args: argparse.Namespace):
+    config = load_config()
+    points = expand_grid(load_grid(args.grid), config)
+    summary = run_sweep(
+        config,
+        points,
+        output_dir=args.output_dir,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        session_timeout=args.session_timeout
+    )
+    print(f"{summary.points} configuraciones ({summary.skipped} ya calculadas), {summary.agreements} acuerdos. "
+          f"Resultados en {summary.results_file}")
+
+async def run_benchmark_suite(args: argparse.Namespace):
+    config = load_config()
+    if args.payloads:
+        run_payload_benchmark(config, iterations=args.iterations, output_file=args.output)
+        return
+    await run_benchmark(
+        config,
+        levels=args.sessions,
+        latency=args.latency,
+        strategy=args.strategy,
+        measure_memory=not args.no_memory,
+        output_file=args.output
+    )
+
+def run_transcript_analysis(args: argparse.Namespace):
+    directory = args.directory or load_config().events.transcripts_dir
+    if not directory:
+        raise SystemExit("Indica el directorio de transcripciones o define events.transcripts_dir en config.yaml")
+    run_analysis(directory, chunk_size=args.chunk_size, output_file=args.output)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sistema de negociación multiagente")
+    parser.add_argument("--quiet", action="store_true", help="Sin salida por consola en cada turno")
+    # --quiet también vale después del subcomando; sin valor por defecto, para no anular el de antes
+    quiet = argparse.ArgumentParser(add_help=False)
+    quiet.add_argument("--quiet", action="store_true", default=argparse.SUPPRESS,
+                       help="Sin salida por consola en cada turno")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", parents=[quiet], help="Ejecuta muchas negociaciones concurrentes")
+    batch_parser.add_argument("scenarios", help="Fichero de escenarios (JSONL o YAML)")
+    batch_parser.add_argument("--concurrency", type=int, default=4)
+    batch_parser.add_argument("--output", default="results.jsonl")
+    batch_parser.add_argument("--session-timeout", type=float, default=600.0)
+
+    resume_parser = subparsers.add_parser(
+        "resume", parents=[quiet], help="Reanuda desde su última ronda las negociaciones del lote que no terminaron"
+    )
+    resume_parser.add_argument("--concurrency", type=int, default=4)
+    resume_parser.add_argument("--output", default="results.resumed.jsonl")
+    resume_parser.add_argument("--session-timeout", type=float, default=600.0)
+
+    auction_parser = subparsers.add_parser(
+        "auction", parents=[quiet], help="Negocia el proyecto a la vez con los desarrolladores de auction.developers"
+    )
+    auction_parser.add_argument("--timeout", type=float, help="Segundos máximos de la subasta")
+    auction_parser.add_argument("--output", help="Guarda el resultado en JSON")
+
+    distributed_parser = subparsers.add_parser(
+        "distributed", parents=[quiet], help="Reparte las negociaciones entre procesos worker conectados por gRPC"
+    )
+    distributed_parser.add_argument("scenarios", nargs="?", help="Fichero de escenarios (JSONL o YAML)")
+    distributed_parser.add_argument("--workers", type=int, help="N workers locales con ambos roles (ignora la topología)")
+    distributed_parser.add_argument("--attach", action="store_true", help="Usa un host y workers ya arrancados")
+    distributed_parser.add_argument("--concurrency", type=int, default=4)
+    distributed_parser.add_argument("--output", default="results.jsonl")
+    distributed_parser.add_argument("--session-timeout", type=float, default=600.0)
+
+    subparsers.add_parser("host", help="Arranca el host gRPC del modo distribuido")
+
+    worker_parser = subparsers.add_parser("worker", parents=[quiet], help="Arranca un worker de la topología distribuida")
+    worker_parser.add_argument("index", type=int, help="Posición del worker en distributed.workers")
+    worker_parser.add_argument("--scenarios", help="Fichero de escenarios (JSONL o YAML)")
+    worker_parser.add_argument("--workers", type=int, help="N workers con ambos roles (ignora la topología)")
+
+    serve_parser = subparsers.add_parser(
+        "serve", parents=[quiet], help="Servidor HTTP con el runtime y el modelo siempre cargados"
+    )
+    serve_parser.add_argument("--host", help="Dirección en la que escuchar (sección server de config.yaml)")
+    serve_parser.add_argument("--port", type=int)
+    serve_parser.add_argument("--unix-socket", help="Escucha en un socket Unix en lugar de TCP")
+
+    sweep_parser = subparsers.add_parser(
+        "sweep", help="Barre una rejilla de parámetros en varios procesos y guarda los resultados por columnas"
+    )
+    sweep_parser.add_argument("grid", help="Fichero YAML con los valores de cada parámetro")
+    sweep_parser.add_argument("--output-dir", default="sweep", help="Directorio de resultados; al repetir se reanuda")
+    sweep_parser.add_argument("--processes", type=int, help="Procesos (por defecto, uno por núcleo)")
+    sweep_parser.add_argument("--chunk-size", type=int, default=32, help="Configuraciones por tarea")
+    sweep_parser.add_argument("--concurrency", type=int, default=8, help="Negociaciones simultáneas por proceso")
+    sweep_parser.add_argument("--session-timeout", type=float, default=600.0)
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Mide la sobrecarga del sistema con un modelo simulado")
+    benchmark_parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100, 1000])
+    benchmark_parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada por llamada (s)")
+    benchmark_parser.add_argument("--strategy", default="linear", choices=sorted(CONCESSION_EXPONENTS))
+    benchmark_parser.add_argument("--no-memory", action="store_true", help="No medir memoria por sesión")
+    benchmark_parser.add_argument("--payloads", action="store_true",
+                                  help="Mide bytes y tiempo de serialización por mensaje en lugar de sesiones")
+    benchmark_parser.add_argument("--iterations", type=int, default=20000, help="Repeticiones con --payloads")
+    benchmark_parser.add_argument("--output", help="Guarda los resultados en JSON")
+
+    analyze_parser = subparsers.add_parser(
+        "analyze", help="Resume las transcripciones de una ejecución: concesiones, tasa de acuerdo y rondas"
+    )
+    analyze_parser.add_argument("directory", nargs="?", help="Directorio de transcripciones (por defecto, events.transcripts_dir)")
+    analyze_parser.add_argument("--chunk-size", type=int, default=4096, help="Sesiones por bloque en memoria")
+    analyze_parser.add_argument("--output", help="Guarda el resumen en JSON")
+
+    return parser.parse_args()
+
 def main():
     import asyncio
-    asyncio.run(run_requirements_gathering())
+    args = parse_args()
+    if args.command == "batch":
+        asyncio.run(run_batch_negotiations(args))
+    elif args.command == "resume":
+        asyncio.run(resume_batch_negotiations(args))
+    elif args.command == "auction":
+        asyncio.run(run_project_auction(args))
+    elif args.command == "distributed":
+        asyncio.run(run_distributed(args))
+    elif args.command == "host":
+        asyncio.run(run_host(load_config().distributed))
+    elif args.command == "worker":
+        asyncio.run(run_distributed_worker(args))
+    elif args.command == "serve":
+        asyncio.run(run_negotiation_server(args))
+    elif args.command == "sweep":
+        run_parameter_sweep(args)
+    elif args.command == "benchmark":
+        asyncio.run(run_benchmark_suite(args))
+    elif args.command == "analyze":
+        run_transcript_analysis(args)
+    else:
+        asyncio.run(run_requirements_gathering(quiet=args.quiet))
 
 if __name__ == "__main__":
     main()
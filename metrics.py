@@ -0,0 +1,319 @@
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from autogen_core import DefaultInterventionHandler, MessageContext
+from autogen_core.models import RequestUsage
+from opentelemetry import trace
+
+from config import MetricsConfig
+from models.interfaces import FinalAgreement
+from models.topics import RESULT_TOPIC
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+ROUND_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+TOKEN_BUCKETS = (0, 25, 50, 100, 200, 400, 800, 1600, 3200)
+
+# Sin un TracerProvider configurado (ver configure_tracing) los spans no hacen nada
+tracer = trace.get_tracer("negotiation")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class NegotiationMetrics:
+    """Per-round timing, token and outcome counters for one run"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.llm_latency: Dict[str, Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.handler_latency: Dict[Tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.rounds_to_agreement = Histogram(ROUND_BUCKETS)
+        self.prompt_size: Dict[str, Histogram] = defaultdict(lambda: Histogram(TOKEN_BUCKETS))
+        self.prompt_tokens_saved: Dict[str, Histogram] = defaultdict(lambda: Histogram(TOKEN_BUCKETS))
+        self.llm_calls: Counter = Counter()
+        # Con la cascada de modelos: llamadas por (rol, nivel) y latencia por nivel
+        self.tier_calls: Counter = Counter()
+        self.tier_latency: Dict[str, Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        # Con la especulación: respuestas preparadas por (rol, resultado) y segundos de modelo ahorrados
+        self.speculations: Counter = Counter()
+        self.speculation_saved_seconds: Counter = Counter()
+        self.prompt_tokens: Counter = Counter()
+        self.completion_tokens: Counter = Counter()
+        self.rule_decisions: Counter = Counter()
+        self.handler_errors: Counter = Counter()
+        self.parse_failures: Counter = Counter()
+        self.messages_published: Counter = Counter()
+        self.outcomes: Counter = Counter()
+
+    def observe_llm_call(self, role: str, seconds: float, usage: Optional[RequestUsage],
+                         tier: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        self.llm_latency[role].observe(seconds)
+        self.llm_calls[role] += 1
+        if tier is not None:
+            self.tier_calls[(role, tier)] += 1
+            self.tier_latency[tier].observe(seconds)
+        if usage is not None:
+            self.prompt_tokens[role] += usage.prompt_tokens
+            self.completion_tokens[role] += usage.completion_tokens
+
+    def observe_prompt(self, role: str, tokens: int, saved_tokens: int) -> None:
+        """Estimated size of a prompt and the tokens it saves over the full-context prompt"""
+        if not self.enabled:
+            return
+        self.prompt_size[role].observe(tokens)
+        self.prompt_tokens_saved[role].observe(saved_tokens)
+
+    def observe_speculation(self, role: str, outcome: str, saved_seconds: float = 0.0) -> None:
+        """Count a speculative answer ("started") or how the turn it was prepared for used it"""
+        if not self.enabled:
+            return
+        self.speculations[(role, outcome)] += 1
+        if saved_seconds > 0:
+            self.speculation_saved_seconds[role] += saved_seconds
+
+    def speculation_summary(self) -> Dict[str, dict]:
+        """Per role: speculations started, turns with a hit, a miss or unused, hit rate and seconds saved"""
+        summary: Dict[str, dict] = {}
+        for role in sorted({role for role, _outcome in self.speculations}):
+            counts = {outcome: self.speculations[(role, outcome)] for outcome in ("started", "hit", "miss", "unused")}
+            resolved = counts["hit"] + counts["miss"]
+            summary[role] = {
+                **counts,
+                "hit_rate": counts["hit"] / resolved if resolved else 0.0,
+                "saved_seconds": round(self.speculation_saved_seconds[role], 6),
+            }
+        return summary
+
+    def speculation_report(self) -> str:
+        """Speculation summary for the console, one part per role"""
+        return "; ".join(
+            f"{role}: started={values['started']} hits={values['hit']} misses={values['miss']} "
+            f"unused={values['unused']} hit_rate={values['hit_rate']:.0%} saved={values['saved_seconds']:.2f}s"
+            for role, values in self.speculation_summary().items()
+        )
+
+    def observe_rule_decision(self, role: str, decision: str) -> None:
+        if self.enabled:
+            self.rule_decisions[(role, decision)] += 1
+
+    def observe_published(self, message: Any) -> None:
+        if not self.enabled:
+            return
+        self.messages_published[type(message).__name__] += 1
+        if isinstance(message, FinalAgreement):
+            self.record_outcome(message.reason or "unknown", message.agreement_reached, message.total_iterations)
+
+    def record_outcome(self, reason: str, agreement_reached: bool, iterations: int) -> None:
+        if not self.enabled:
+            return
+        self.outcomes[reason] += 1
+        if agreement_reached:
+            self.rounds_to_agreement.observe(iterations)
+
+    def observe_parse_failure(self, role: str, resolution: str) -> None:
+        """Count an answer that did not validate, by how it was resolved"""
+        if self.enabled:
+            self.parse_failures[(role, resolution)] += 1
+
+    @contextmanager
+    def measure_handler(self, role: str, session_id: str, message: Any) -> Iterator[None]:
+        """Time a message handler, count its failures and trace it as one round"""
+        message_type = type(message).__name__
+        attributes = {"negotiation.session": session_id, "negotiation.role": role, "message.type": message_type}
+        if hasattr(message, "iteration_number"):
+            attributes["negotiation.iteration"] = message.iteration_number
+
+        with tracer.start_as_current_span(f"{role}.round", attributes=attributes):
+            started = time.perf_counter()
+            try:
+                yield
+            except Exception as error:
+                if self.enabled:
+                    self.handler_errors[(role, type(error).__name__)] += 1
+                raise
+            finally:
+                if self.enabled:
+                    self.handler_latency[(role, message_type)].observe(time.perf_counter() - started)
+
+    def summary(self) -> dict:
+        return {
+            "llm_latency_seconds": {role: histogram.to_dict() for role, histogram in self.llm_latency.items()},
+            "handler_latency_seconds": {
+                f"{role}/{message_type}": histogram.to_dict()
+                for (role, message_type), histogram in self.handler_latency.items()
+            },
+            "prompt_size_tokens": {role: histogram.to_dict() for role, histogram in self.prompt_size.items()},
+            "prompt_tokens_saved": {role: histogram.to_dict() for role, histogram in self.prompt_tokens_saved.items()},
+            "llm_calls": dict(self.llm_calls),
+            "llm_tier_latency_seconds": {tier: histogram.to_dict() for tier, histogram in self.tier_latency.items()},
+            "llm_tier_calls": {f"{role}/{tier}": count for (role, tier), count in self.tier_calls.items()},
+            "speculation": self.speculation_summary(),
+            "prompt_tokens": dict(self.prompt_tokens),
+            "completion_tokens": dict(self.completion_tokens),
+            "rule_decisions": {f"{role}/{decision}": count for (role, decision), count in self.rule_decisions.items()},
+            "handler_errors": {f"{role}/{error}": count for (role, error), count in self.handler_errors.items()},
+            "parse_failures": {
+                f"{role}/{resolution}": count for (role, resolution), count in self.parse_failures.items()
+            },
+            "messages_published": dict(self.messages_published),
+            "outcomes": dict(self.outcomes),
+            "rounds_to_agreement": self.rounds_to_agreement.to_dict(),
+        }
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        _histogram_lines(lines, "negotiation_llm_latency_seconds", "Latency of model calls",
+                         {(("role", role),): histogram for role, histogram in self.llm_latency.items()})
+        _histogram_lines(lines, "negotiation_handler_latency_seconds", "Time spent handling a message",
+                         {(("role", role), ("message", message_type)): histogram
+                          for (role, message_type), histogram in self.handler_latency.items()})
+        _histogram_lines(lines, "negotiation_rounds_to_agreement", "Iterations needed to reach an agreement",
+                         {(): self.rounds_to_agreement})
+        _histogram_lines(lines, "negotiation_prompt_size_tokens", "Estimated tokens of each prompt",
+                         {(("role", role),): histogram for role, histogram in self.prompt_size.items()})
+        _histogram_lines(lines, "negotiation_prompt_tokens_saved", "Estimated tokens saved per round by compact prompts",
+                         {(("role", role),): histogram for role, histogram in self.prompt_tokens_saved.items()})
+        _counter_lines(lines, "negotiation_llm_calls_total", "Model calls",
+                       {(("role", role),): value for role, value in self.llm_calls.items()})
+        _histogram_lines(lines, "negotiation_llm_tier_latency_seconds", "Latency of model calls by cascade tier",
+                         {(("tier", tier),): histogram for tier, histogram in self.tier_latency.items()})
+        _counter_lines(lines, "negotiation_llm_tier_calls_total", "Model calls by the cascade tier that answered",
+                       {(("role", role), ("tier", tier)): value for (role, tier), value in self.tier_calls.items()})
+        _counter_lines(lines, "negotiation_speculations_total",
+                       "Speculative answers started and how the turns they were prepared for used them",
+                       {(("role", role), ("outcome", outcome)): value
+                        for (role, outcome), value in self.speculations.items()})
+        _counter_lines(lines, "negotiation_speculation_saved_seconds_total",
+                       "Model time already spent by speculation when the real offer arrived",
+                       {(("role", role),): value for role, value in self.speculation_saved_seconds.items()})
+        _counter_lines(lines, "negotiation_prompt_tokens_total", "Prompt tokens reported by the model client",
+                       {(("role", role),): value for role, value in self.prompt_tokens.items()})
+        _counter_lines(lines, "negotiation_completion_tokens_total", "Completion tokens reported by the model client",
+                       {(("role", role),): value for role, value in self.completion_tokens.items()})
+        _counter_lines(lines, "negotiation_rule_decisions_total", "Offers decided without the model",
+                       {(("role", role), ("decision", decision)): value
+                        for (role, decision), value in self.rule_decisions.items()})
+        _counter_lines(lines, "negotiation_handler_errors_total", "Message handlers that raised",
+                       {(("role", role), ("error", error)): value
+                        for (role, error), value in self.handler_errors.items()})
+        _counter_lines(lines, "negotiation_parse_failures_total", "Model answers that did not validate",
+                       {(("role", role), ("resolution", resolution)): value
+                        for (role, resolution), value in self.parse_failures.items()})
+        _counter_lines(lines, "negotiation_messages_published_total", "Messages published to the runtime",
+                       {(("type", message_type),): value for message_type, value in self.messages_published.items()})
+        _counter_lines(lines, "negotiation_outcomes_total", "Finished negotiations by reason",
+                       {(("reason", reason),): value for reason, value in self.outcomes.items()})
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+        if json_path:
+            with open(json_path, 'w', encoding='utf-8') as file:
+                json.dump(self.summary(), file, indent=2)
+        if prometheus_path:
+            with open(prometheus_path, 'w', encoding='utf-8') as file:
+                file.write(self.to_prometheus())
+
+
+# Instancia compartida por los agentes que se crean sin métricas
+DISABLED_METRICS = NegotiationMetrics(enabled=False)
+
+
+class MetricsInterventionHandler(DefaultInterventionHandler):
+    """Counts every published message and records outcomes from FinalAgreement"""
+
+    def __init__(self, metrics: NegotiationMetrics):
+        self._metrics = metrics
+
+    async def on_publish(self, message: Any, *, message_context: MessageContext) -> Any:
+        # El desarrollador también envía su FinalAgreement al cliente: cada resultado se cuenta una sola vez
+        if not isinstance(message, FinalAgreement) or message_context.topic_id.type == RESULT_TOPIC:
+            self._metrics.observe_published(message)
+        return message
+
+
+def total_usage(messages: Sequence[Any]) -> Optional[RequestUsage]:
+    """Sum the model usage attached to the messages of an agent run"""
+    usages = [message.models_usage for message in messages if getattr(message, "models_usage", None)]
+    if not usages:
+        return None
+    return RequestUsage(
+        prompt_tokens=sum(usage.prompt_tokens for usage in usages),
+        completion_tokens=sum(usage.completion_tokens for usage in usages),
+    )
+
+
+def configure_tracing(otlp_endpoint: str) -> None:
+    """Export spans over OTLP; needs the optional `telemetry` dependencies"""
+    try:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as error:
+        raise RuntimeError(
+            "OpenTelemetry export needs the telemetry extras: uv sync --extra telemetry"
+        ) from error
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "autogen-negotiation"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=otlp_endpoint)))
+    trace.set_tracer_provider(provider)
+
+
+def create_metrics(settings: MetricsConfig) -> Optional[NegotiationMetrics]:
+    """Create the run metrics, and the span exporter if an endpoint is configured"""
+    if settings.otlp_endpoint:
+        configure_tracing(settings.otlp_endpoint)
+    return NegotiationMetrics() if settings.enabled else None
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+def _histogram_lines(lines: List[str], name: str, help_text: str,
+                     series: Dict[Tuple[Tuple[str, str], ...], Histogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in series.items():
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+def _counter_lines(lines: List[str], name: str, help_text: str,
+                   series: Dict[Tuple[Tuple[str, str], ...], int]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in series.items():
+        lines.append(f"{name}{_labels(labels)} {value}")
@@ -0,0 +1,88 @@
+import struct
+import typing
+from dataclasses import fields
+from typing import List, Type, TypeVar
+
+from autogen_core import JSON_DATA_CONTENT_TYPE, MessageSerializer
+
+# Codificación binaria de los mensajes entre procesos: sin nombres de campo, así que
+# ambos extremos deben usar la misma versión de models.interfaces.
+
+T = TypeVar("T")
+
+_FORMAT_VERSION = 1
+_FIXED_FORMATS = {float: "d", int: "q", bool: "?"}
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class CompactMessageSerializer(MessageSerializer[T]):
+    """Binary serializer for the flat negotiation dataclasses.
+
+    A payload is the format version and every float, int and bool field packed
+    with one precompiled struct, followed by the str fields as varint length and
+    UTF-8, each group in declaration order. Like the JSON serializer of autogen,
+    it only takes flat dataclasses.
+    """
+
+    def __init__(self, message_type: Type[T]):
+        hints = typing.get_type_hints(message_type)
+        names = [field.name for field in fields(message_type)]
+        unsupported = [name for name in names if hints[name] is not str and hints[name] not in _FIXED_FORMATS]
+        if unsupported:
+            raise TypeError(f"{message_type.__name__}: only str, float, int and bool fields are supported, "
+                            f"not {unsupported}")
+
+        self._message_type = message_type
+        self._fixed_names: List[str] = [name for name in names if hints[name] is not str]
+        self._text_names: List[str] = [name for name in names if hints[name] is str]
+        self._fixed = struct.Struct("<B" + "".join(_FIXED_FORMATS[hints[name]] for name in self._fixed_names))
+        # Posición de cada campo en el constructor, primero los fijos y luego los de texto
+        self._order = [names.index(name) for name in self._fixed_names + self._text_names]
+
+    @property
+    def data_content_type(self) -> str:
+        # El runtime gRPC solo envía el tipo JSON (como bytes en binary_data): el formato
+        # compacto viaja con esa etiqueta y sustituye al serializador JSON del tipo
+        return JSON_DATA_CONTENT_TYPE
+
+    @property
+    def type_name(self) -> str:
+        return self._message_type.__name__
+
+    def serialize(self, message: T) -> bytes:
+        out = bytearray(self._fixed.pack(_FORMAT_VERSION, *[getattr(message, name) for name in self._fixed_names]))
+        for name in self._text_names:
+            encoded = getattr(message, name).encode("utf-8")
+            _write_varint(out, len(encoded))
+            out += encoded
+        return bytes(out)
+
+    def deserialize(self, payload: bytes) -> T:
+        if not payload or payload[0] != _FORMAT_VERSION:
+            raise ValueError(f"{self.type_name}: not a compact payload of version {_FORMAT_VERSION}")
+        decoded = list(self._fixed.unpack_from(payload)[1:])
+        offset = self._fixed.size
+        for _ in self._text_names:
+            length, shift = 0, 0
+            while True:
+                byte = payload[offset]
+                offset += 1
+                length |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            decoded.append(payload[offset:offset + length].decode("utf-8"))
+            offset += length
+        if offset != len(payload):
+            raise ValueError(f"{self.type_name}: {len(payload) - offset} trailing bytes")
+
+        values = [None] * len(decoded)
+        for position, value in zip(self._order, decoded):
+            values[position] = value
+        return self._message_type(*values)
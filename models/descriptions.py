@@ -0,0 +1,55 @@
+import hashlib
+from collections import Counter
+from typing import Dict
+
+
+def description_ref(text: str) -> str:
+    """Short content hash that stands for a description inside messages"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+class DescriptionStore:
+    """Session-scoped store of the application descriptions of one process.
+
+    Messages between agents carry `description_ref` instead of the text. Every
+    process registers the descriptions of the sessions it hosts (the agent
+    factories do it from the scenario); sessions with the same text share one
+    entry, which is dropped when the last of them is released.
+    """
+
+    def __init__(self):
+        self._texts: Dict[str, str] = {}
+        self._sessions: Dict[str, str] = {}
+        self._users: Counter = Counter()
+
+    def register(self, session_id: str, text: str) -> str:
+        ref = description_ref(text)
+        previous = self._sessions.get(session_id)
+        if previous != ref:
+            if previous is not None:
+                self.release(session_id)
+            self._sessions[session_id] = ref
+            self._texts.setdefault(ref, text)
+            self._users[ref] += 1
+        return ref
+
+    def resolve(self, ref: str) -> str:
+        try:
+            return self._texts[ref]
+        except KeyError:
+            raise KeyError(f"Unknown application description {ref}: no session of this process registered it")
+
+    def get(self, ref: str, default: str = "") -> str:
+        return self._texts.get(ref, default)
+
+    def release(self, session_id: str) -> None:
+        ref = self._sessions.pop(session_id, None)
+        if ref is None:
+            return
+        self._users[ref] -= 1
+        if self._users[ref] <= 0:
+            del self._users[ref]
+            del self._texts[ref]
+
+    def __len__(self) -> int:
+        return len(self._texts)
@@ -0,0 +1,125 @@
+import time
+from dataclasses import asdict, dataclass, field
+from typing import ClassVar
+
+# Eventos tipados que emiten los agentes en lugar de escribir en consola
+
+
+@dataclass
+class NegotiationEvent:
+    session_id: str
+    role: str  # "client" or "developer"
+    iteration: int
+    timestamp: float = field(default_factory=time.time)
+
+    kind: ClassVar[str] = "event"
+    terminal: ClassVar[bool] = False
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, **asdict(self)}
+
+
+@dataclass
+class OfferEvent(NegotiationEvent):
+    """Opening proposal of either party"""
+    budget: str = ""
+    time: str = ""
+    reasoning: str = ""
+    decided_by: str = "model"  # "model" or "rules"
+    model_tier: str = ""  # "small" or "large" with the model cascade
+
+    kind: ClassVar[str] = "offer"
+
+
+@dataclass
+class CounterOfferEvent(OfferEvent):
+    """Any later proposal that does not accept the counterpart's terms"""
+    kind: ClassVar[str] = "counter_offer"
+
+
+@dataclass
+class AgreementEvent(NegotiationEvent):
+    """The role accepted the counterpart's terms"""
+    budget: str = ""
+    time: str = ""
+    reasoning: str = ""
+    decided_by: str = "model"
+    model_tier: str = ""
+
+    kind: ClassVar[str] = "agreement"
+    terminal: ClassVar[bool] = True
+
+
+@dataclass
+class RejectionEvent(NegotiationEvent):
+    """The role ended the negotiation refusing the counterpart's final offer"""
+    budget: str = ""
+    time: str = ""
+    decided_by: str = "rules"
+
+    kind: ClassVar[str] = "rejection"
+    terminal: ClassVar[bool] = True
+
+
+@dataclass
+class InvalidResponseEvent(NegotiationEvent):
+    """The role's model answer could not be parsed, even after repair and re-asks"""
+    error: str = ""
+
+    kind: ClassVar[str] = "invalid_response"
+    terminal: ClassVar[bool] = True
+
+
+@dataclass
+class HandlerErrorEvent(NegotiationEvent):
+    """A message handler of the role raised (model server down, unreadable limits...)"""
+    error: str = ""
+
+    kind: ClassVar[str] = "error"
+    terminal: ClassVar[bool] = True
+
+
+@dataclass
+class IterationLimitEvent(NegotiationEvent):
+    """The negotiation reached `max_round` without agreement"""
+    client_budget: str = ""
+    client_time: str = ""
+    developer_budget: str = ""
+    developer_time: str = ""
+
+    kind: ClassVar[str] = "iteration_limit"
+    terminal: ClassVar[bool] = True
+
+
+@dataclass
+class DeadlockPredictedEvent(NegotiationEvent):
+    """The offers were not converging fast enough to close the gap in the remaining rounds"""
+    client_budget: str = ""
+    client_time: str = ""
+    developer_budget: str = ""
+    developer_time: str = ""
+    deal_probability: float = 0.0
+
+    kind: ClassVar[str] = "deadlock_predicted"
+    terminal: ClassVar[bool] = True
+
+
+@dataclass
+class OutcomeEvent(NegotiationEvent):
+    """The FinalAgreement of a session with its scenario limits, written by the batch driver.
+
+    It follows the terminal event of the agent that ended the session; `role` is
+    empty and `iteration` is the total number of iterations.
+    """
+    agreement_reached: bool = False
+    reason: str = ""
+    agreed_budget: str = ""
+    agreed_time: str = ""
+    max_budget: str = ""
+    max_time: str = ""
+    min_budget: str = ""
+    min_time: str = ""
+    elapsed_seconds: float = 0.0
+
+    kind: ClassVar[str] = "outcome"
+    terminal: ClassVar[bool] = True
@@ -1,33 +1,143 @@
+import math
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict
 
-from dataclasses import dataclass
+from models.units import format_days, format_money, parse_duration_days, parse_money
+
+# Mensajes entre agentes. Son dataclasses planas con __slots__ (el serializador JSON
+# de autogen no admite dataclasses anidadas ni Optional) y, salvo el resultado final,
+# no llevan la descripción de la aplicación sino su referencia en DescriptionStore.
+
+
+@dataclass(slots=True)
+class Terms:
+    """Budget and timeline of an offer as numbers (NaN if unknown); the text is kept only when it does not parse"""
+    amount: float = math.nan
+    currency: str = ""
+    days: float = math.nan
+    budget_text: str = ""
+    time_text: str = ""
+
+    @classmethod
+    def parse(cls, budget: str, time: str) -> "Terms":
+        money = parse_money(budget)
+        days = parse_duration_days(time)
+        return cls(
+            amount=money.amount if money is not None else math.nan,
+            currency=(money.currency or "") if money is not None else "",
+            days=days if days is not None else math.nan,
+            budget_text=budget if money is None else "",
+            time_text=time if days is None else ""
+        )
+
+    @property
+    def budget(self) -> str:
+        return format_money(self.amount, self.currency) if not math.isnan(self.amount) else self.budget_text
 
-@dataclass
+    @property
+    def time(self) -> str:
+        return format_days(self.days) if not math.isnan(self.days) else self.time_text
+
+    def fields(self, prefix: str) -> Dict[str, Any]:
+        return {
+            f"{prefix}_amount": self.amount,
+            f"{prefix}_currency": self.currency,
+            f"{prefix}_days": self.days,
+            f"{prefix}_budget_text": self.budget_text,
+            f"{prefix}_time_text": self.time_text,
+        }
+
+
+@dataclass(slots=True)
 class InitialDescription:
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class ApplicationDescription:
     """Initial message from client describing the application"""
-    content: str
-    client_estimated_time: str
-    client_budget_offer: str
+    description_ref: str
+    client_amount: float
+    client_currency: str
+    client_days: float
+    client_budget_text: str
+    client_time_text: str
+
+    @classmethod
+    def from_terms(cls, description_ref: str, client: Terms) -> "ApplicationDescription":
+        return cls(description_ref=description_ref, **client.fields("client"))
+
+    @property
+    def client(self) -> Terms:
+        return Terms(self.client_amount, self.client_currency, self.client_days,
+                     self.client_budget_text, self.client_time_text)
 
-@dataclass
+    @property
+    def client_estimated_time(self) -> str:
+        return self.client.time
+
+    @property
+    def client_budget_offer(self) -> str:
+        return self.client.budget
+
+@dataclass(slots=True)
 class NegotiationOffer:
     """Unified message for both developer and client offers/counter-offers"""
-    application_description: str
-    client_estimated_time: str
-    developer_estimated_time: str
-    client_budget_offer: str
-    developer_budget_request: str
+    description_ref: str
+    client_amount: float
+    client_currency: str
+    client_days: float
+    client_budget_text: str
+    client_time_text: str
+    developer_amount: float
+    developer_currency: str
+    developer_days: float
+    developer_budget_text: str
+    developer_time_text: str
     iteration_number: int
     conditions_accepted: bool
     sender: str  # "client" or "developer"
     reasoning: str
 
-@dataclass
+    @classmethod
+    def from_terms(cls, description_ref: str, client: Terms, developer: Terms, iteration_number: int,
+                   conditions_accepted: bool, sender: str, reasoning: str) -> "NegotiationOffer":
+        return cls(
+            description_ref=description_ref,
+            **client.fields("client"),
+            **developer.fields("developer"),
+            iteration_number=iteration_number,
+            conditions_accepted=conditions_accepted,
+            sender=sender,
+            reasoning=reasoning
+        )
+
+    @property
+    def client(self) -> Terms:
+        return Terms(self.client_amount, self.client_currency, self.client_days,
+                     self.client_budget_text, self.client_time_text)
+
+    @property
+    def developer(self) -> Terms:
+        return Terms(self.developer_amount, self.developer_currency, self.developer_days,
+                     self.developer_budget_text, self.developer_time_text)
+
+    @property
+    def client_estimated_time(self) -> str:
+        return self.client.time
+
+    @property
+    def client_budget_offer(self) -> str:
+        return self.client.budget
+
+    @property
+    def developer_estimated_time(self) -> str:
+        return self.developer.time
+
+    @property
+    def developer_budget_request(self) -> str:
+        return self.developer.budget
+
+@dataclass(slots=True)
 class FinalAgreement:
     """Final agreement message when both parties accept"""
     application_description: str
@@ -35,3 +145,4 @@ class FinalAgreement:
     agreed_budget: str
     total_iterations: int
     agreement_reached: bool
+    reason: str = ""  # "client_accepted", "developer_accepted", "developer_rejected", "max_rounds", "no_deal_predicted", "invalid_response", "error" or "timeout"
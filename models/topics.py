@@ -0,0 +1,27 @@
+import zlib
+from dataclasses import dataclass
+
+ROLE_TOPICS = {"client": "client_topic", "developer": "developer_topic"}
+RESULT_TOPIC = "result_topic"
+
+
+@dataclass(frozen=True)
+class TopicRouter:
+    """Topic type that reaches each role of a session.
+
+    Sessions are spread over the shards of a role with a stable hash of the
+    session id; with a single shard (the local runtime) the topic types are the
+    plain role topics the agents subscribe to.
+    """
+    client_shards: int = 1
+    developer_shards: int = 1
+
+    def shard_count(self, role: str) -> int:
+        return self.client_shards if role == "client" else self.developer_shards
+
+    def shard_topic(self, role: str, shard: int) -> str:
+        topic = ROLE_TOPICS[role]
+        return topic if self.shard_count(role) == 1 else f"{topic}.{shard}"
+
+    def topic_for(self, role: str, session_id: str) -> str:
+        return self.shard_topic(role, zlib.crc32(session_id.encode("utf-8")) % self.shard_count(role))
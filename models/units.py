@@ -0,0 +1,157 @@
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+# Los presupuestos y plazos viajan como texto libre ("1500 eur", "1 mes", "3 weeks").
+# Estas funciones los normalizan a importes (moneda + valor) y duraciones en días.
+# Ante cualquier ambigüedad (rangos, varias monedas, unidades desconocidas, importes
+# por periodo) devuelven None.
+
+_CURRENCIES = {
+    "EUR": ("€", "eur", "euro", "euros"),
+    "USD": ("$", "usd", "dollar", "dollars", "dólar", "dólares", "dolar", "dolares"),
+    "GBP": ("£", "gbp", "pound", "pounds", "libra", "libras"),
+}
+
+_MULTIPLIERS = {"k": 1_000, "mil": 1_000, "thousand": 1_000}
+
+_DAYS_PER_UNIT = {
+    "day": 1, "days": 1, "día": 1, "días": 1, "dia": 1, "dias": 1, "d": 1,
+    "week": 7, "weeks": 7, "semana": 7, "semanas": 7, "wk": 7, "wks": 7,
+    "fortnight": 14, "quincena": 15, "quincenas": 15,
+    "month": 30, "months": 30, "mes": 30, "meses": 30,
+    "year": 365, "years": 365, "año": 365, "años": 365, "yr": 365, "yrs": 365,
+}
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "un": 1, "una": 1, "uno": 1,
+    "two": 2, "dos": 2, "three": 3, "tres": 3, "four": 4, "cuatro": 4,
+    "five": 5, "cinco": 5, "six": 6, "seis": 6, "seven": 7, "siete": 7,
+    "eight": 8, "ocho": 8, "nine": 9, "nueve": 9, "ten": 10, "diez": 10,
+    "twelve": 12, "doce": 12, "half": 0.5, "medio": 0.5, "media": 0.5,
+}
+
+_NUMBER = r"\d+(?:[.,]\d+)*"
+_MONEY_NUMBER = re.compile(rf"({_NUMBER})(?:\s*({'|'.join(_MULTIPLIERS)})\b)?")
+_CURRENCY_TOKEN = re.compile(r"[€$£]|[a-záéíóú]+")
+_UNITS = "|".join(sorted(_DAYS_PER_UNIT, key=len, reverse=True))
+# Media unidad más: "1 mes y medio", "1 month and a half", "one and a half months"
+_HALF = r"(?:y|and)\s+(?:a\s+|one\s+)?(?:half|medio|media)"
+# Las cifras pueden ir pegadas a la unidad ("3d"); las palabras no, o "and" se leería como "an d".
+# "y media" tras una unidad no es la fracción si le sigue otra unidad ("1 mes y media semana")
+_DURATION_PART = re.compile(
+    rf"(?:({_NUMBER})\s*|\b({'|'.join(_NUMBER_WORDS)})\s+)(?:({_HALF})\s+)?({_UNITS})\b"
+    rf"(?:\s+({_HALF})\b(?!\s+(?:{_UNITS})\b))?"
+)
+_DURATION_JOINER = re.compile(r"\s*(?:,|\+|and|plus|y)?\s*")
+# Fracciones que no se han podido leer ("a month and a quarter") hacen la duración ambigua
+_FRACTION = re.compile(r"\b(?:half|medio|media|quarter|cuarto)\b|[½¼¾]")
+# Importes o plazos por periodo ("1500 eur/month", "50 € por hora", "2 weeks per module")
+_PER_PERIOD = re.compile(
+    r"/|\b(?:per|por|each|cada|hourly|daily|weekly|monthly|yearly|annually"
+    r"|mensual(?:es)?|semanal(?:es)?|diari[oa]s?|anual(?:es)?"
+    r"|an?\s+(?:hour|day|week|month|year)|al\s+(?:d[ií]a|mes|año)|a\s+la\s+(?:hora|semana))\b"
+)
+
+
+@dataclass(frozen=True)
+class Money:
+    amount: float
+    currency: Optional[str]  # código ISO, None si el texto no indica moneda
+
+
+def comparable(first: Optional[Money], second: Optional[Money]) -> bool:
+    """Whether two parsed budgets can be compared: both known and in the same currency (or one without)"""
+    if first is None or second is None:
+        return False
+    return first.currency is None or second.currency is None or first.currency == second.currency
+
+
+def _parse_number(token: str) -> float:
+    """Interpret "1.500", "1,500.50", "1.500,50" or "1,5" as a float"""
+    if "." in token and "," in token:
+        decimal = "." if token.rfind(".") > token.rfind(",") else ","
+        thousands = "," if decimal == "." else "."
+        return float(token.replace(thousands, "").replace(decimal, "."))
+
+    for separator in (".", ","):
+        if separator in token:
+            groups = token.split(separator)
+            # Un separador que agrupa de tres en tres es de miles
+            if len(groups) > 2 or len(groups[-1]) == 3:
+                return float("".join(groups))
+            return float(token.replace(separator, "."))
+    return float(token)
+
+
+@lru_cache(maxsize=4096)
+def parse_money(text: str) -> Optional[Money]:
+    """Parse a budget such as "1500 eur", "1.200€" or "$2k" into a Money"""
+    normalized = text.strip().lower()
+    numbers = _MONEY_NUMBER.findall(normalized)
+    if len(numbers) != 1 or _PER_PERIOD.search(normalized):
+        return None
+
+    number, multiplier = numbers[0]
+    amount = _parse_number(number) * _MULTIPLIERS.get(multiplier, 1)
+
+    currencies = {
+        code
+        for token in _CURRENCY_TOKEN.findall(normalized)
+        for code, aliases in _CURRENCIES.items()
+        if token in aliases
+    }
+    if len(currencies) > 1:
+        return None
+    return Money(amount=amount, currency=currencies.pop() if currencies else None)
+
+
+@lru_cache(maxsize=4096)
+def parse_duration_days(text: str) -> Optional[float]:
+    """Parse a timeline such as "1 mes", "3 weeks" or "1 month and 2 weeks" into days"""
+    normalized = text.strip().lower()
+    parts = list(_DURATION_PART.finditer(normalized))
+    if not parts:
+        return None
+
+    # Números sueltos sin unidad ("3-4 weeks") hacen la duración ambigua
+    remainder = _DURATION_PART.sub(" ", normalized)
+    if re.search(r"\d", remainder) or _FRACTION.search(remainder) or _PER_PERIOD.search(remainder):
+        return None
+
+    # Varias partes solo se suman si están unidas ("1 mes y 2 semanas"), no en "4 weeks (20 days)"
+    for previous, following in zip(parts, parts[1:]):
+        if not _DURATION_JOINER.fullmatch(normalized[previous.end():following.start()]):
+            return None
+
+    days = 0.0
+    for part in parts:
+        number, word, half_before, unit, half_after = part.groups()
+        quantity = _parse_number(number.replace(",", ".")) if number else _NUMBER_WORDS[word]
+        if half_before or half_after:
+            quantity += 0.5
+        days += quantity * _DAYS_PER_UNIT[unit]
+    return days
+
+
+def amount_or_nan(text: str) -> float:
+    """Amount of a budget for numeric columns, NaN if it is empty or does not parse"""
+    money = parse_money(text) if text else None
+    return money.amount if money is not None else math.nan
+
+
+def days_or_nan(text: str) -> float:
+    """Days of a timeline for numeric columns, NaN if it is empty or does not parse"""
+    days = parse_duration_days(text) if text else None
+    return days if days is not None else math.nan
+
+
+def format_money(amount: float, currency: Optional[str]) -> str:
+    """Inverse of parse_money: "1500 eur", "1250.5 usd" or "900" without currency"""
+    return f"{amount:.2f}".rstrip("0").rstrip(".") + (f" {currency.lower()}" if currency else "")
+
+
+def format_days(days: float) -> str:
+    return f"{days:.1f}".rstrip("0").rstrip(".") + " days"
@@ -0,0 +1,343 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+import signal
+import time
+import uuid
+from dataclasses import asdict, fields
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, Tuple, TypeVar
+
+from autogen_core import (
+    ClosureAgent,
+    ClosureContext,
+    MessageContext,
+    SingleThreadedAgentRuntime,
+    TopicId,
+    TypeSubscription,
+)
+from autogen_core.models import ChatCompletionClient
+
+from agents.cancellation import SessionCancellation
+from batch import Scenario, register_agents, release_session, report_run
+from clients.factory import build_model_client, preload_model
+from config import Config
+from event_stream import create_event_stream
+from metrics import MetricsInterventionHandler, create_metrics
+from models.descriptions import DescriptionStore
+from models.interfaces import FinalAgreement, InitialDescription
+from models.topics import RESULT_TOPIC
+
+_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large"}
+_MAX_BODY = 64 * 1024
+T = TypeVar("T")
+_SCENARIO_TYPES = {field.name: field.type for field in fields(Scenario)}
+# JSON no distingue enteros de decimales y bool es subclase de int en Python
+_ACCEPTED_TYPES = {str: (str,), int: (int,), float: (int, float), bool: (bool,)}
+# El session_id da nombre a la transcripción: nada de rutas ("../x") ni caracteres raros
+_SESSION_ID = re.compile(r"[A-Za-z0-9_.-]{1,128}")
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class NegotiationServer:
+    """Serve negotiations over HTTP from one warm runtime and model client.
+
+    The runtime, the agent factories and the model client are created once; each
+    `POST /negotiate` only publishes the InitialDescription of a new session and
+    streams its events as JSON lines, ending with the final agreement.
+    """
+
+    def __init__(self, config: Config, model_client: Optional[ChatCompletionClient] = None, quiet: bool = False):
+        self._config = config
+        self._settings = config.server
+        self._defaults = Scenario.from_config(config)
+        self._model_client = model_client or build_model_client(config)
+        self._metrics = create_metrics(config.metrics)
+        self._events, self._transcripts = create_event_stream(config.events, quiet)
+        self._cancellation = SessionCancellation()
+        self._descriptions = DescriptionStore()
+        self._runtime = SingleThreadedAgentRuntime(
+            intervention_handlers=[MetricsInterventionHandler(self._metrics)] if self._metrics is not None else None
+        )
+        self._scenarios: Dict[str, Scenario] = {}
+        self._results: Dict[str, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def address(self) -> str:
+        if self._settings.unix_socket:
+            return f"unix:{self._settings.unix_socket}"
+        return f"http://{self._settings.host}:{self._settings.port}"
+
+    async def start(self) -> None:
+        if self._settings.preload:
+            await preload_model(self._config)
+        await register_agents(self._runtime, self._model_client, self._scenarios.__getitem__,
+                              self._metrics, self._events, cancellation=self._cancellation,
+                              descriptions=self._descriptions)
+
+        async def collect_result(_agent: ClosureContext, message: FinalAgreement, ctx: MessageContext) -> None:
+            future = self._results.get(ctx.topic_id.source)
+            if future is not None and not future.done():
+                future.set_result(message)
+
+        await ClosureAgent.register_closure(
+            self._runtime,
+            "collector",
+            collect_result,
+            subscriptions=lambda: [TypeSubscription(topic_type=RESULT_TOPIC, agent_type="collector")]
+        )
+        self._runtime.start()
+
+        if self._settings.unix_socket:
+            if os.path.exists(self._settings.unix_socket):
+                os.remove(self._settings.unix_socket)
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=self._settings.unix_socket)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, host=self._settings.host, port=self._settings.port
+            )
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        if self._settings.unix_socket and os.path.exists(self._settings.unix_socket):
+            os.remove(self._settings.unix_socket)
+        for session_id in list(self._results):
+            self._cancellation.cancel(session_id)
+        await self._runtime.stop_when_idle()
+
+        report_run(self._model_client, self._metrics,
+                   self._config.metrics.json_path, self._config.metrics.prometheus_path)
+        self._events.close()
+        if self._transcripts is not None:
+            self._transcripts.close()
+        await self._model_client.close()
+
+    def scenario(self, request: Dict[str, Any]) -> Scenario:
+        """Scenario of a request: the configuration defaults overridden by its fields"""
+        unknown = set(request) - set(_SCENARIO_TYPES)
+        if unknown:
+            raise HttpError(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+        for name, value in request.items():
+            expected = (str, int) if name == "session_id" else _ACCEPTED_TYPES[_SCENARIO_TYPES[name]]
+            if not _is_instance(value, expected):
+                raise HttpError(400, f"Field {name} must be {_SCENARIO_TYPES[name].__name__}")
+        values = {**asdict(self._defaults), "session_id": f"req-{uuid.uuid4().hex[:12]}", **request}
+        values["session_id"] = str(values["session_id"])
+        if not _SESSION_ID.fullmatch(values["session_id"]) or ".." in values["session_id"]:
+            raise HttpError(400, "Field session_id may only contain letters, digits, '_', '-' and '.'")
+        if values["session_id"] in self._results:
+            raise HttpError(409, f"Session {values['session_id']} is already running")
+        return Scenario(**values)
+
+    async def negotiate(self, scenario: Scenario) -> AsyncIterator[Dict[str, Any]]:
+        """Run one session, yielding {"event": ...} for every event and finally {"agreement": ...}.
+
+        Closing the iterator before the end (the client went away) cancels the session.
+        """
+        session_id = scenario.session_id
+        queue: asyncio.Queue = asyncio.Queue()
+        unsubscribe = self._events.subscribe(
+            lambda event: queue.put_nowait(event) if event.session_id == session_id else None
+        )
+        result = asyncio.get_running_loop().create_future()
+        self._scenarios[session_id] = scenario
+        self._results[session_id] = result
+        started = time.perf_counter()
+        try:
+            await self._runtime.publish_message(
+                InitialDescription(description=scenario.description),
+                topic_id=TopicId(type="client_topic", source=session_id)
+            )
+            deadline = started + self._settings.session_timeout
+            while not result.done():
+                next_event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({next_event, result}, timeout=max(0.0, deadline - time.perf_counter()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if next_event in done:
+                    yield {"event": next_event.result().to_dict()}
+                else:
+                    next_event.cancel()
+                if not done:
+                    break
+            # Los agentes emiten sus eventos antes de publicar el resultado
+            while not queue.empty():
+                yield {"event": queue.get_nowait().to_dict()}
+
+            if result.done():
+                outcome = asdict(result.result())
+            else:
+                outcome = {
+                    "application_description": scenario.description,
+                    "agreed_time": "",
+                    "agreed_budget": "",
+                    "total_iterations": 0,
+                    "agreement_reached": False,
+                    "reason": "timeout",
+                }
+                if self._metrics is not None:
+                    self._metrics.record_outcome("timeout", False, 0)
+            outcome["session_id"] = session_id
+            outcome["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+            yield {"agreement": outcome}
+        finally:
+            unsubscribe()
+            self._forget(session_id, finished=result.done())
+
+    def _forget(self, session_id: str, finished: bool) -> None:
+        self._results.pop(session_id, None)
+        self._scenarios.pop(session_id, None)
+        release_session(self._runtime, session_id, self._descriptions, self._cancellation, finished,
+                        agent_types=("client", "developer", "collector"))
+        # Sin escenario un mensaje tardío ya no puede recrear los agentes: el token cancelado sobra y,
+        # si se conservara, una petición posterior con el mismo session_id empezaría cancelada
+        self._cancellation.forget(session_id)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, body = await _read_request(reader)
+            if path == "/health":
+                if method != "GET":
+                    raise HttpError(405, "Use GET")
+                await _send_json(writer, 200, {"status": "ok", "active_sessions": len(self._results)})
+            elif path == "/negotiate":
+                if method != "POST":
+                    raise HttpError(405, "Use POST")
+                await self._serve_negotiation(reader, writer, body)
+            else:
+                raise HttpError(404, f"Unknown path {path}")
+        except HttpError as error:
+            await _send_json(writer, error.status, {"error": error.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_negotiation(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                 body: bytes) -> None:
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError as error:
+            raise HttpError(400, f"Invalid JSON: {error}")
+        if not isinstance(request, dict):
+            raise HttpError(400, "The body must be a JSON object")
+        stream = request.pop("stream", True)
+        if not isinstance(stream, bool):
+            raise HttpError(400, "Field stream must be bool")
+        try:
+            scenario = self.scenario(request)
+        except TypeError as error:
+            raise HttpError(400, str(error))
+
+        lines = self.negotiate(scenario)
+        try:
+            if not stream:
+                # Sin streaming no se escribe nada hasta el final: solo leyendo se nota que el cliente se ha ido
+                agreement = await _unless_disconnected(reader, _final_agreement(lines))
+                if agreement is not None:
+                    await _send_json(writer, 200, agreement)
+                return
+
+            writer.write(_headers(200, "application/x-ndjson", chunked=True))
+            async for line in lines:
+                data = (json.dumps(line, ensure_ascii=False) + "\n").encode()
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            await lines.aclose()
+
+
+async def run_server(config: Config, quiet: bool = False) -> None:
+    """Serve negotiations until SIGTERM/SIGINT"""
+    server = NegotiationServer(config, quiet=quiet)
+    await server.start()
+    print(f"Servidor de negociación escuchando en {server.address}", flush=True)
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    await stopped.wait()
+    await server.stop()
+
+
+async def _final_agreement(lines: AsyncIterator[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    async for line in lines:
+        if "agreement" in line:
+            return line["agreement"]
+    return None
+
+
+async def _unless_disconnected(reader: asyncio.StreamReader, work: Awaitable[T]) -> Optional[T]:
+    """Result of `work`, or None if the client closes the connection first (`work` is then cancelled)"""
+    task = asyncio.ensure_future(work)
+    closed = asyncio.ensure_future(_wait_closed(reader))
+    try:
+        await asyncio.wait({task, closed}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        closed.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    return None if task.cancelled() else task.result()
+
+
+async def _wait_closed(reader: asyncio.StreamReader) -> None:
+    with contextlib.suppress(ConnectionError):
+        await reader.read()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+    request_line = (await reader.readline()).decode("latin-1").split()
+    if len(request_line) != 3:
+        raise HttpError(400, "Malformed request line")
+    method, target, _ = request_line
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > _MAX_BODY:
+        raise HttpError(413, f"The body exceeds {_MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], body
+
+
+def _is_instance(value: Any, types: Tuple[type, ...]) -> bool:
+    return isinstance(value, types) and (bool in types or not isinstance(value, bool))
+
+
+def _headers(status: int, content_type: str, length: Optional[int] = None, chunked: bool = False) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_STATUS[status]}", f"Content-Type: {content_type}", "Connection: close"]
+    if chunked:
+        lines.append("Transfer-Encoding: chunked")
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+    data = json.dumps(payload, ensure_ascii=False).encode()
+    writer.write(_headers(status, "application/json", length=len(data)) + data)
+    await writer.drain()
@@ -0,0 +1,201 @@
+import asyncio
+import glob
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from batch import Scenario, report_client_stats, run_batch
+from clients.factory import ClientStats, build_model_client, get_client_stats
+from config import CheckpointConfig, Config, EventsConfig, MetricsConfig
+from extras import require_numpy
+from models.units import amount_or_nan, days_or_nan
+
+# Campos que se pueden barrer: los de cada escenario y el modelo
+SWEEP_FIELDS = tuple(field.name for field in fields(Scenario) if field.name != "session_id") + ("model",)
+
+RESULTS_FILE = "results.npz"
+
+
+@dataclass
+class SweepPoint:
+    """One configuration of the grid; `point_id` is stable across runs"""
+    point_id: str
+    index: int
+    model: str
+    scenario: Scenario
+
+
+@dataclass
+class SweepSummary:
+    points: int
+    skipped: int  # ya calculados en una ejecución anterior
+    agreements: int
+    results_file: str
+
+
+def load_grid(grid_file: str) -> Dict[str, List[Any]]:
+    """Carga la rejilla de un fichero YAML: {campo: [valores]} o bajo la clave `grid`"""
+    with open(grid_file, 'r', encoding='utf-8') as file:
+        grid = yaml.safe_load(file) or {}
+    if "grid" in grid:
+        grid = grid["grid"]
+
+    unknown = set(grid) - set(SWEEP_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown sweep fields in {grid_file}: {', '.join(sorted(unknown))}")
+    return {name: values if isinstance(values, list) else [values] for name, values in grid.items()}
+
+
+def expand_grid(grid: Dict[str, List[Any]], defaults: Config) -> List[SweepPoint]:
+    """Cartesian product of the grid; fields not in the grid keep the config value"""
+    names = list(grid)
+    base = asdict(Scenario.from_config(defaults))
+    points = []
+    for index, values in enumerate(itertools.product(*(grid[name] for name in names))):
+        parameters = {**base, "model": defaults.model, **dict(zip(names, values))}
+        parameters.pop("session_id")
+        point_id = hashlib.sha1(json.dumps(parameters, sort_keys=True).encode()).hexdigest()[:16]
+        model = parameters.pop("model")
+        points.append(SweepPoint(point_id, index, model, Scenario(session_id=point_id, **parameters)))
+    return points
+
+
+def run_sweep(config: Config, points: List[SweepPoint], output_dir: str = "sweep",
+              processes: Optional[int] = None, chunk_size: int = 32, concurrency: int = 8,
+              session_timeout: Optional[float] = 600.0) -> SweepSummary:
+    """Run the grid over a process pool and store the outcomes as NumPy columns.
+
+    Each task runs a chunk of points of the same model in its own runtime and
+    writes them to a `part-*.npz` file, so an interrupted sweep only repeats the
+    chunks that were in flight. At the end all parts are merged into
+    `results.npz`, in grid order.
+    """
+    np = require_numpy("The sweep")
+    os.makedirs(output_dir, exist_ok=True)
+    done = {str(point_id) for part in _parts(output_dir) for point_id in _load(part)["point_id"]}
+    pending = [point for point in points if point.point_id not in done]
+
+    chunks: List[Tuple[str, List[SweepPoint]]] = []
+    for model, group in itertools.groupby(sorted(pending, key=lambda point: point.model), lambda point: point.model):
+        group = list(group)
+        chunks.extend((model, group[start:start + chunk_size]) for start in range(0, len(group), chunk_size))
+
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(_run_chunk, config, model, chunk, output_dir, concurrency, session_timeout)
+            for model, chunk in chunks
+        ]
+        finished = 0
+        client_stats = ClientStats()
+        for future in as_completed(futures):
+            count, stats = future.result()
+            finished += count
+            client_stats += stats
+            print(f"Barrido: {len(done) + finished}/{len(points)} configuraciones")
+    # Un solo resumen para todo el barrido en lugar de uno por bloque
+    report_client_stats(client_stats)
+
+    columns = _merge(np, [_load(part) for part in _parts(output_dir)], [point.point_id for point in points])
+    results_file = os.path.join(output_dir, RESULTS_FILE)
+    _save(np, results_file, columns)
+    return SweepSummary(
+        points=len(points),
+        skipped=len(points) - len(pending),
+        agreements=int(columns["agreement_reached"].sum()) if columns else 0,
+        results_file=results_file
+    )
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Columns of a sweep results file as {name: numpy array}"""
+    return _load(path)
+
+
+def _run_chunk(config: Config, model: str, chunk: List[SweepPoint], output_dir: str,
+               concurrency: int, session_timeout: Optional[float]) -> Tuple[int, ClientStats]:
+    # Cada proceso escribe solo su fichero de resultados: nada de métricas, consola ni checkpoints compartidos.
+    # Las estadísticas del cliente del modelo se devuelven para sumarlas en el proceso principal
+    config = replace(config, model=model, metrics=MetricsConfig(enabled=False),
+                     events=EventsConfig(console=False), checkpoints=CheckpointConfig(enabled=False))
+    model_client = build_model_client(config)
+    with tempfile.TemporaryDirectory() as directory:
+        results = asyncio.run(run_batch(
+            [point.scenario for point in chunk],
+            config,
+            concurrency=concurrency,
+            output_file=os.path.join(directory, "results.jsonl"),
+            session_timeout=session_timeout,
+            model_client=model_client,
+            quiet=True,
+            report=False
+        ))
+
+    np = require_numpy("The sweep")
+    by_session = {result["session_id"]: result for result in results}
+    rows = [_row(point, by_session[point.point_id]) for point in chunk]
+    columns = {name: np.array([row[name] for row in rows]) for name in rows[0]}
+    chunk_id = hashlib.sha1("".join(point.point_id for point in chunk).encode()).hexdigest()[:16]
+    _save(np, os.path.join(output_dir, f"part-{chunk_id}.npz"), columns)
+    return len(chunk), get_client_stats(model_client)
+
+
+def _row(point: SweepPoint, result: dict) -> Dict[str, Any]:
+    scenario = point.scenario
+    return {
+        "point_id": point.point_id,
+        "model": point.model,
+        "description": scenario.description,
+        "max_budget": scenario.max_budget,
+        "max_time": scenario.max_time,
+        "min_budget": scenario.min_budget,
+        "min_time": scenario.min_time,
+        "max_round": scenario.max_round,
+        # Valores numéricos de los límites para estudiar la distancia entre ellos
+        "max_budget_value": amount_or_nan(scenario.max_budget),
+        "min_budget_value": amount_or_nan(scenario.min_budget),
+        "max_time_days": days_or_nan(scenario.max_time),
+        "min_time_days": days_or_nan(scenario.min_time),
+        "agreement_reached": bool(result["agreement_reached"]),
+        "reason": result["reason"],
+        "agreed_price": amount_or_nan(result["agreed_budget"]),
+        "agreed_time_days": days_or_nan(result["agreed_time"]),
+        "rounds": int(result["total_iterations"]),
+        "latency_seconds": float(result["elapsed_seconds"]),
+    }
+
+
+def _merge(np, parts: List[Dict[str, Any]], order: List[str]) -> Dict[str, Any]:
+    if not parts:
+        return {}
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    # Una configuración puede estar en dos partes si se interrumpió justo al guardar
+    position = {point_id: index for index, point_id in enumerate(order)}
+    keys = np.array([position.get(str(point_id), len(order)) for point_id in columns["point_id"]])
+    _, first = np.unique(keys, return_index=True)
+    selected = first[keys[first] < len(order)]
+    return {name: values[selected] for name, values in columns.items()}
+
+
+def _parts(output_dir: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(output_dir, "part-*.npz")))
+
+
+def _load(path: str) -> Dict[str, Any]:
+    np = require_numpy("The sweep")
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _save(np, path: str, columns: Dict[str, Any]) -> None:
+    # Escritura atómica: una parte a medio escribir no debe contar como calculada
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as file:
+        np.savez(file, **columns)
+    os.replace(temporary, path)
@@ -0,0 +1,22 @@
+import pytest
+
+from config import CacheConfig, CheckpointConfig, Config, EventsConfig, MetricsConfig
+
+
+@pytest.fixture
+def config(tmp_path) -> Config:
+    """Configuration on the scripted backend that writes nothing outside `tmp_path`"""
+    return Config(
+        model="scripted",
+        max_budget="1500 eur",
+        max_time="1 mes",
+        min_budget="1200 eur",
+        min_time="3 weeks",
+        description="Aplicación para registrar las horas de los usuarios",
+        max_round=9,
+        backend="scripted",
+        cache=CacheConfig(enabled=False),
+        metrics=MetricsConfig(enabled=False),
+        events=EventsConfig(console=False),
+        checkpoints=CheckpointConfig(path=str(tmp_path / "checkpoints.sqlite")),
+    )
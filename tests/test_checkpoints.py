@@ -0,0 +1,82 @@
+import asyncio
+
+from batch import Scenario, resume_batch, run_batch
+from checkpoints import CheckpointStore
+from clients.scripted import ScriptedChatCompletionClient
+from models.interfaces import FinalAgreement, NegotiationOffer, Terms
+
+
+class _StallingClient(ScriptedChatCompletionClient):
+    """Scripted model whose calls after the first `calls` never return, like a model server that went down"""
+
+    def __init__(self, calls: int):
+        super().__init__()
+        self._calls = calls
+
+    async def create(self, messages, *, cancellation_token=None, **kwargs):
+        self._calls -= 1
+        if self._calls < 0:
+            stalled = asyncio.get_running_loop().create_future()
+            cancellation_token.link_future(stalled)
+            await stalled
+        return await super().create(messages, cancellation_token=cancellation_token, **kwargs)
+
+
+def _offer(iteration: int) -> NegotiationOffer:
+    return NegotiationOffer.from_terms(
+        description_ref="s", client=Terms.parse("900 eur", "20 days"), developer=Terms.parse("1400 eur", "5 weeks"),
+        iteration_number=iteration, conditions_accepted=False, sender="client", reasoning="",
+    )
+
+
+def _final(results):
+    return [{key: value for key, value in result.items() if key != "elapsed_seconds"} for result in results]
+
+
+def test_store_keeps_the_last_round_of_unfinished_sessions(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    store.start_session("a", {"session_id": "a"})
+    store.start_session("b", {"session_id": "b"})
+    store.save_round("a", "client", {"round": 1}, _offer(2), "developer_topic")
+    store.save_round("a", "client", {"round": 2}, _offer(4), "developer_topic")
+    store.finish("b", FinalAgreement("App", "", "", 1, False, "developer_rejected"))
+
+    [checkpoint] = store.unfinished()
+    assert checkpoint.session_id == "a"
+    assert checkpoint.rounds == 2
+    assert checkpoint.pending_topic == "developer_topic"
+    assert checkpoint.pending_message == _offer(4)
+    assert checkpoint.agent_states == {"client": {"round": 2}}
+
+    # Starting a session again discards the earlier run
+    store.start_session("a", {"session_id": "a"})
+    [checkpoint] = store.unfinished()
+    assert checkpoint.rounds == 0
+    assert checkpoint.pending_message is None
+    assert checkpoint.agent_states == {}
+    store.close()
+
+
+def test_resumed_session_ends_like_an_uninterrupted_one(config, tmp_path):
+    scenarios = [Scenario.from_config(config, "s")]
+    expected = asyncio.run(run_batch(scenarios, config, output_file=str(tmp_path / "full.jsonl"),
+                                     session_timeout=5, quiet=True, report=False))
+
+    config.checkpoints.path = str(tmp_path / "interrupted.sqlite")
+    interrupted = asyncio.run(run_batch(scenarios, config, output_file=str(tmp_path / "interrupted.jsonl"),
+                                        session_timeout=0.3, model_client=_StallingClient(3), quiet=True,
+                                        report=False))
+    assert interrupted[0]["reason"] == "timeout"
+    store = CheckpointStore(config.checkpoints.path)
+    [checkpoint] = store.unfinished()
+    store.close()
+    assert checkpoint.rounds == 3
+    assert set(checkpoint.agent_states) == {"client", "developer"}
+
+    resumed = asyncio.run(resume_batch(config, output_file=str(tmp_path / "resumed.jsonl"), session_timeout=5,
+                                       quiet=True))
+    assert _final(resumed) == _final(expected)
+    assert expected[0]["agreement_reached"]
+    store = CheckpointStore(config.checkpoints.path)
+    assert store.unfinished() == []
+    store.close()
@@ -0,0 +1,79 @@
+import math
+from dataclasses import astuple, dataclass
+from typing import List
+
+import pytest
+
+from models.codec import CompactMessageSerializer
+from models.interfaces import ApplicationDescription, FinalAgreement, InitialDescription, NegotiationOffer, Terms
+
+
+def _round_trip(message):
+    serializer = CompactMessageSerializer(type(message))
+    return serializer.deserialize(serializer.serialize(message))
+
+
+def _same(first, second) -> bool:
+    """Field by field equality where NaN equals NaN"""
+    return type(first) is type(second) and all(
+        (isinstance(a, float) and math.isnan(a) and math.isnan(b)) or a == b
+        for a, b in zip(astuple(first), astuple(second))
+    )
+
+
+@pytest.mark.parametrize("message", [
+    InitialDescription(description="Aplicación para registrar horas ⏱"),
+    InitialDescription(description=""),
+    ApplicationDescription.from_terms("s", Terms.parse("1500 eur", "1 mes")),
+    # Unreadable values: NaN amounts plus the original multibyte text
+    ApplicationDescription.from_terms("sesión-ñ", Terms.parse("un dineral 💶", "cuando se pueda")),
+    NegotiationOffer.from_terms(
+        description_ref="s", client=Terms.parse("900 eur", "20 days"), developer=Terms.parse("a lot", "soon"),
+        iteration_number=7, conditions_accepted=True, sender="developer", reasoning="Razonamiento ✓ " * 2000,
+    ),
+    NegotiationOffer.from_terms(
+        description_ref="", client=Terms(), developer=Terms(), iteration_number=0, conditions_accepted=False,
+        sender="", reasoning="",
+    ),
+    FinalAgreement("App", "2 weeks", "900 eur", 3, True, "client_accepted"),
+    FinalAgreement("Descripción 日本語", "", "", -1, False),
+])
+def test_round_trip(message):
+    assert _same(_round_trip(message), message)
+
+
+def test_wire_format():
+    # Version and fixed fields in declaration order, then each text with its length
+    payload = CompactMessageSerializer(FinalAgreement).serialize(
+        FinalAgreement("App", "2 weeks", "900 eur", 3, True, "client_accepted")
+    )
+    assert payload == (
+        b"\x01" + (3).to_bytes(8, "little") + b"\x01"
+        + b"\x03App" + b"\x072 weeks" + b"\x07900 eur" + b"\x0fclient_accepted"
+    )
+
+
+@pytest.mark.parametrize("payload", [
+    b"",
+    b"\x02" + (3).to_bytes(8, "little") + b"\x01" + b"\x00" * 4,  # another format version
+    b'{"application_description": "App"}',  # what the autogen JSON serializer sends
+])
+def test_other_payloads_are_rejected(payload):
+    with pytest.raises(ValueError, match="version"):
+        CompactMessageSerializer(FinalAgreement).deserialize(payload)
+
+
+def test_trailing_bytes_are_rejected():
+    serializer = CompactMessageSerializer(FinalAgreement)
+    payload = serializer.serialize(FinalAgreement("App", "", "", 1, False, "max_rounds"))
+    with pytest.raises(ValueError, match="1 trailing bytes"):
+        serializer.deserialize(payload + b"\x00")
+
+
+def test_nested_fields_are_not_supported():
+    @dataclass
+    class Nested:
+        offers: List[str]
+
+    with pytest.raises(TypeError, match="offers"):
+        CompactMessageSerializer(Nested)
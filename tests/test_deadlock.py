@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from agents.deadlock import DeadlockPredictor
+from batch import Scenario, run_batch
+from models.interfaces import NegotiationOffer, Terms
+
+
+def _predictor(*requests: float, offers=None, max_budget: str = "1500 eur") -> DeadlockPredictor:
+    """Predictor that has read the developer requests `requests` (budgets in eur, at the client's maximum time)
+    answering the client `offers` (1000 eur in 20 days, below the developer's minimums, by default)"""
+    predictor = DeadlockPredictor(max_budget, "30 days", "1200 eur", "3 weeks", confidence=0.9)
+    for iteration, (amount, offer) in enumerate(zip(requests, offers or [1000] * len(requests))):
+        predictor.observe(NegotiationOffer.from_terms(
+            description_ref="s", client=Terms.parse(f"{offer} eur", "20 days"),
+            developer=Terms.parse(f"{amount} eur", "30 days"), iteration_number=2 * iteration + 1,
+            conditions_accepted=False, sender="developer", reasoning="",
+        ))
+    return predictor
+
+
+def test_nothing_is_predicted_from_a_single_concession():
+    predictor = _predictor(2000, 2000)
+    assert predictor.predict(remaining_turns=2) is None
+    assert not predictor.no_deal(predictor.predict(remaining_turns=2))
+
+
+def test_developer_that_never_moves_means_no_deal():
+    predictor = _predictor(2000, 2000, 2000)
+    prediction = predictor.predict(remaining_turns=2)
+    assert prediction.budget_gap == 1000
+    assert prediction.time_gap == 10
+    assert predictor.no_deal(prediction)
+
+
+@pytest.mark.parametrize("requests, remaining_turns, no_deal", [
+    ((2000, 1800, 1600), 2, False),  # 200 eur per turn closes the last 100 in time
+    ((2000, 1800, 1600), 0, True),  # no turns left
+    ((2000, 1950, 1900), 2, True),  # 50 eur per turn cannot close 400
+    ((1600, 1500, 1400), 1, False),  # already within the limits
+    ((2000, 1990, 1900), 2, False),  # concessions growing ninefold per turn
+])
+def test_projected_concessions(requests, remaining_turns, no_deal):
+    predictor = _predictor(*requests)
+    assert predictor.no_deal(predictor.predict(remaining_turns)) is no_deal
+
+
+def test_unreadable_request_disables_the_prediction():
+    predictor = _predictor(2000, 2000, 2000)
+    predictor.observe(NegotiationOffer.from_terms(
+        description_ref="s", client=Terms.parse("1000 eur", "20 days"), developer=Terms.parse("a lot", "30 days"),
+        iteration_number=7, conditions_accepted=False, sender="developer", reasoning="",
+    ))
+    assert predictor.predict(remaining_turns=2) is None
+
+
+def test_client_concessions_can_close_the_gap():
+    # The developer accepts on its last turn any offer that reaches its minimums
+    predictor = DeadlockPredictor("1500 eur", "30 days", "1200 eur", "3 weeks", confidence=0.9)
+    for iteration, offer in enumerate((900, 1000, 1100)):
+        predictor.observe(NegotiationOffer.from_terms(
+            description_ref="s", client=Terms.parse(f"{offer} eur", "25 days"),
+            developer=Terms.parse("2000 eur", "30 days"), iteration_number=2 * iteration + 1,
+            conditions_accepted=False, sender="developer", reasoning="",
+        ))
+    assert not predictor.no_deal(predictor.predict(remaining_turns=1))
+
+
+def test_limits_that_do_not_reach_the_minimums_mean_no_deal():
+    predictor = _predictor(1600, 1500, 1400, offers=[900, 1000, 1100], max_budget="1150 eur")
+    assert predictor.predict(remaining_turns=3).deal_probability == 0
+
+
+def test_state_round_trip():
+    predictor = _predictor(2000, 1950, 1900)
+    restored = DeadlockPredictor("1500 eur", "30 days", "1200 eur", "3 weeks", confidence=0.9)
+    restored.load_state(predictor.save_state())
+    assert restored.predict(2) == predictor.predict(2)
+
+
+@pytest.mark.parametrize("strategy, max_budget, reason", [
+    ("hardline", "1500 eur", "no_deal_predicted"),
+    ("linear", "1150 eur", "no_deal_predicted"),  # the client's maximum is below the developer's minimum
+    ("linear", "1400 eur", "developer_accepted"),  # the client's offer reaches the developer's minimum
+    ("linear", "1500 eur", "developer_accepted"),
+])
+def test_batch_ends_early_only_when_no_deal_can_be_reached(config, tmp_path, strategy, max_budget, reason):
+    config.checkpoints.enabled = False
+    config.max_round = 5
+    config.max_budget = max_budget
+    config.scripted.strategy = strategy
+    [result] = asyncio.run(run_batch([Scenario.from_config(config, "s")], config, session_timeout=5,
+                                     output_file=str(tmp_path / "results.jsonl"), quiet=True, report=False))
+    assert result["reason"] == reason
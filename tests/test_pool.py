@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from autogen_core import CancellationToken
+from autogen_core.models import SystemMessage, UserMessage
+
+from agents.client import ClientResponse
+from clients.pool import PooledChatCompletionClient
+from clients.scripted import ScriptedChatCompletionClient
+
+_SYSTEM = SystemMessage(content="Your maximum budget is 1500 eur and the maximum time you can wait is 1 mes. ")
+
+
+def _messages(prompt: str = "Application: time tracking. Make your first offer."):
+    return [_SYSTEM, UserMessage(content=prompt, source="user")]
+
+
+def _pool(endpoints: int = 1, max_in_flight: int = 2, coalesce: bool = True) -> PooledChatCompletionClient:
+    return PooledChatCompletionClient(
+        {f"endpoint-{index}": ScriptedChatCompletionClient(latency=0.05) for index in range(endpoints)},
+        max_in_flight=max_in_flight, coalesce=coalesce
+    )
+
+
+def _requests(pool: PooledChatCompletionClient) -> int:
+    return sum(endpoint.requests for endpoint in pool.stats.endpoints)
+
+
+def test_identical_requests_in_flight_share_one_call():
+    async def run():
+        pool = _pool()
+        first, second = await asyncio.gather(
+            pool.create(_messages(), json_output=ClientResponse),
+            pool.create(_messages(), json_output=ClientResponse),
+        )
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert pool.stats.coalesced == 1
+    assert _requests(pool) == 1
+    assert second.content == first.content
+    assert not first.cached and second.cached
+
+
+@pytest.mark.parametrize("coalesce, prompts", [
+    (True, ["Make your first offer.", "Make a counter-offer."]),
+    (False, ["Make your first offer.", "Make your first offer."]),
+])
+def test_requests_that_do_not_coalesce(coalesce, prompts):
+    async def run():
+        pool = _pool(coalesce=coalesce)
+        await asyncio.gather(*(pool.create(_messages(prompt), json_output=ClientResponse) for prompt in prompts))
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.stats.coalesced == 0
+    assert _requests(pool) == 2
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call():
+    async def run():
+        pool = _pool()
+        token = CancellationToken()
+        cancelled = asyncio.ensure_future(pool.create(_messages(), json_output=ClientResponse,
+                                                      cancellation_token=token))
+        kept = asyncio.ensure_future(pool.create(_messages(), json_output=ClientResponse))
+        await asyncio.sleep(0.01)
+        token.cancel()
+        return await asyncio.gather(cancelled, kept, return_exceptions=True)
+
+    cancelled, kept = asyncio.run(run())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert ClientResponse.model_validate_json(kept.content).budget
+
+
+def test_cancelling_the_only_waiter_frees_the_endpoint():
+    async def run():
+        pool = _pool(max_in_flight=1)
+        token = CancellationToken()
+        request = asyncio.ensure_future(pool.create(_messages(), json_output=ClientResponse,
+                                                    cancellation_token=token))
+        await asyncio.sleep(0.01)
+        assert pool.idle_slots == 0
+        token.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await asyncio.sleep(0)
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.idle_slots == 1
+
+
+def test_requests_beyond_max_in_flight_queue_on_the_least_loaded_endpoint():
+    async def run():
+        pool = _pool(endpoints=2, max_in_flight=1)
+        await asyncio.gather(*(pool.create(_messages(f"Offer {index}."), json_output=ClientResponse)
+                               for index in range(4)))
+        return pool
+
+    pool = asyncio.run(run())
+    assert [endpoint.requests for endpoint in pool.stats.endpoints] == [2, 2]
+    assert all(endpoint.max_queue_depth == 1 for endpoint in pool.stats.endpoints)
+    assert all(endpoint.max_wait_seconds > 0 for endpoint in pool.stats.endpoints)
@@ -0,0 +1,164 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import pytest
+
+from server import NegotiationServer
+
+
+@pytest.fixture
+def config(config, tmp_path):
+    config.checkpoints.enabled = False
+    config.server.preload = False
+    config.server.unix_socket = str(tmp_path / "server.sock")
+    config.server.session_timeout = 5
+    return config
+
+
+def _serve(config, check: Callable[[NegotiationServer], Awaitable[Any]]) -> Any:
+    async def run():
+        server = NegotiationServer(config, quiet=True)
+        await server.start()
+        try:
+            return await check(server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+def _post(body: Any, headers: str = "") -> bytes:
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    return f"POST /negotiate HTTP/1.1\r\nContent-Length: {len(data)}\r\n{headers}\r\n".encode() + data
+
+
+async def _request(server: NegotiationServer, request: bytes) -> Tuple[int, bytes]:
+    reader, writer = await asyncio.open_unix_connection(server.address.removeprefix("unix:"))
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    if b"Transfer-Encoding: chunked" in head:
+        body = _dechunk(body)
+    return int(head.split()[1]), body
+
+
+def _dechunk(body: bytes) -> bytes:
+    data = b""
+    while True:
+        size, _, body = body.partition(b"\r\n")
+        if not int(size, 16):
+            return data
+        data, body = data + body[:int(size, 16)], body[int(size, 16) + 2:]
+
+
+async def _negotiate(server: NegotiationServer, **request) -> Tuple[int, Dict[str, Any]]:
+    status, body = await _request(server, _post({**request, "stream": False}))
+    return status, json.loads(body)
+
+
+def test_health(config):
+    status, body = _serve(config, lambda server: _request(server, b"GET /health HTTP/1.1\r\n\r\n"))
+    assert status == 200
+    assert json.loads(body) == {"status": "ok", "active_sessions": 0}
+
+
+def test_streams_events_and_ends_with_the_agreement(config):
+    status, body = _serve(config, lambda server: _request(server, _post({"session_id": "s"})))
+    lines: List[Dict[str, Any]] = [json.loads(line) for line in body.decode().splitlines()]
+    assert status == 200
+    assert lines[0]["event"]["kind"] == "offer"
+    assert all("event" in line for line in lines[:-1])
+    assert lines[-1]["agreement"]["session_id"] == "s"
+    assert lines[-1]["agreement"]["agreement_reached"]
+
+
+def test_without_streaming_only_the_agreement_is_returned(config):
+    status, agreement = _serve(config, lambda server: _negotiate(server, session_id="s", max_round=2))
+    assert status == 200
+    assert agreement["session_id"] == "s"
+    assert agreement["reason"] == "developer_rejected"
+
+
+def test_finished_sessions_leave_no_agents_behind(config):
+    async def check(server):
+        for index in range(3):
+            await _negotiate(server, session_id=f"s{index}", max_round=2)
+        return dict(server._runtime._instantiated_agents)
+
+    assert _serve(config, check) == {}
+
+
+@pytest.mark.parametrize("request_bytes, status", [
+    (b"POST /negotiate HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400),
+    (b"POST /negotiate HTTP/1.1\r\nContent-Length: -3\r\n\r\n", 400),
+    (b"POST /negotiate HTTP/1.1\r\nContent-Length: 999999\r\n\r\n", 413),
+    (_post(b"{not json"), 400),
+    (_post([1, 2]), 400),
+    (_post({"max_budget": "2000 eur", "colour": "red"}), 400),
+    (_post({"max_round": "x"}), 400),
+    (_post({"max_round": True}), 400),
+    (_post({"decision_rules": "yes"}), 400),
+    (_post({"max_budget": 2000}), 400),
+    (_post({"stream": "no"}), 400),
+    (_post({"session_id": "../escaped"}), 400),
+    (_post({"session_id": ".."}), 400),
+    (_post({"session_id": "a/b"}), 400),
+    (_post({"session_id": ""}), 400),
+    (b"GET /negotiate HTTP/1.1\r\n\r\n", 405),
+    (b"GET /other HTTP/1.1\r\n\r\n", 404),
+])
+def test_invalid_requests_are_rejected(config, request_bytes, status):
+    assert _serve(config, lambda server: _request(server, request_bytes))[0] == status
+
+
+def test_integers_are_accepted_for_float_fields(config):
+    status, agreement = _serve(config, lambda server: _negotiate(server, session_id=7, deadlock_confidence=1))
+    assert status == 200
+    assert agreement["session_id"] == "7"
+
+
+def test_running_session_id_conflicts(config):
+    config.scripted.latency = 0.1
+
+    async def check(server):
+        first = asyncio.ensure_future(_negotiate(server, session_id="s"))
+        await asyncio.sleep(0.05)
+        second = await _negotiate(server, session_id="s")
+        return second, await first
+
+    (status, _), (first_status, _) = _serve(config, check)
+    assert status == 409
+    assert first_status == 200
+
+
+def test_session_id_of_a_timed_out_session_can_be_reused(config):
+    config.scripted.latency = 0.1
+    config.server.session_timeout = 0.3
+
+    async def check(server):
+        timed_out = await _negotiate(server, session_id="s")
+        server._settings.session_timeout = 5
+        return timed_out, await _negotiate(server, session_id="s", max_round=2)
+
+    (_, timed_out), (_, reused) = _serve(config, check)
+    assert timed_out["reason"] == "timeout"
+    assert reused["reason"] == "developer_rejected"
+
+
+def test_client_disconnect_cancels_a_non_streaming_session(config):
+    config.scripted.latency = 0.1
+
+    async def check(server):
+        _, writer = await asyncio.open_unix_connection(config.server.unix_socket)
+        writer.write(_post({"session_id": "gone", "stream": False}))
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        running = json.loads((await _request(server, b"GET /health HTTP/1.1\r\n\r\n"))[1])["active_sessions"]
+        writer.close()
+        await asyncio.sleep(0.05)
+        return running, json.loads((await _request(server, b"GET /health HTTP/1.1\r\n\r\n"))[1])["active_sessions"]
+
+    assert _serve(config, check) == (1, 0)
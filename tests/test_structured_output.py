@@ -0,0 +1,74 @@
+import asyncio
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_core.model_context import UnboundedChatCompletionContext
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from agents.client import ClientResponse
+from agents.structured_output import StructuredResponder, repair_response
+from metrics import NegotiationMetrics
+
+_MODEL_INFO = {"vision": False, "function_calling": False, "json_output": True, "family": "unknown",
+               "structured_output": True}
+
+
+def test_repair_extracts_fenced_object_and_coerces_fields():
+    raw = 'Sure! ```json\n{"Time": "3 weeks", "budget": {"amount": 900, "currency": "EUR"}, ' \
+          '"conditions accepted": "no",}\n```'
+    response, error = repair_response(raw, ClientResponse)
+    assert error is None
+    assert response == ClientResponse(time="3 weeks", budget="900 EUR", conditions_accepted=False, reasoning="")
+
+
+def test_repair_reads_python_literals():
+    response, _ = repair_response("{'time': '1 mes', 'budget': 1200, 'conditions_accepted': True}", ClientResponse)
+    assert response.budget == "1200"
+    assert response.conditions_accepted is True
+
+
+def test_repair_reports_what_is_missing():
+    response, error = repair_response("I accept your offer", ClientResponse)
+    assert response is None
+    assert error == "the answer does not contain a JSON object"
+
+    response, error = repair_response('{"time": "1 mes", "conditions_accepted": true}', ClientResponse)
+    assert response is None
+    assert error.startswith("budget:")
+
+
+def _ask(replies):
+    """Answer of a StructuredResponder over a model that replies `replies` in turn, and its metrics"""
+    async def ask():
+        model_client = ReplayChatCompletionClient(replies, model_info=_MODEL_INFO)
+        model_context = UnboundedChatCompletionContext()
+        assistant = AssistantAgent("assistant", model_client=model_client, output_content_type=ClientResponse,
+                                   model_context=model_context)
+        metrics = NegotiationMetrics()
+        responder = StructuredResponder(assistant, model_context, ClientResponse, "client", metrics, max_reasks=1)
+        return await responder.ask("Your offer?"), metrics, await model_context.get_messages()
+
+    return asyncio.run(ask())
+
+
+def test_responder_repairs_without_asking_again():
+    response, metrics, messages = _ask(['```json\n{"time": "3 weeks", "budget": 900, "conditions_accepted": "no",}```'])
+    assert response.budget == "900"
+    assert dict(metrics.parse_failures) == {("client", "repaired"): 1}
+    # The context keeps the clean answer instead of the malformed one
+    assert ClientResponse.model_validate_json(messages[-1].content) == response
+
+
+def test_responder_reasks_when_repair_fails():
+    response, metrics, messages = _ask([
+        "no idea",
+        '{"time": "3 weeks", "budget": "900 eur", "conditions_accepted": false, "reasoning": "ok"}',
+    ])
+    assert response.budget == "900 eur"
+    assert dict(metrics.parse_failures) == {("client", "reasked"): 1}
+    assert len(messages) == 2
+
+
+def test_responder_gives_up_after_max_reasks():
+    response, metrics, _ = _ask(["no idea", "still no idea"])
+    assert response is None
+    assert dict(metrics.parse_failures) == {("client", "unrecovered"): 1}
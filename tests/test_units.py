@@ -0,0 +1,95 @@
+import math
+
+import pytest
+
+from agents.rules import Decision, client_decision, developer_decision
+from models.units import Money, amount_or_nan, comparable, days_or_nan, parse_duration_days, parse_money
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1500 eur", Money(1500.0, "EUR")),
+    ("1.200€", Money(1200.0, "EUR")),
+    ("$2k", Money(2000.0, "USD")),
+    ("1,500.50 usd", Money(1500.5, "USD")),
+    ("1.500,50 eur", Money(1500.5, "EUR")),
+    ("2 mil eur", Money(2000.0, "EUR")),
+    ("900", Money(900.0, None)),
+])
+def test_parse_money(text, expected):
+    assert parse_money(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "", "1000-2000 eur", "100 eur or 200 usd", "a lot",
+    "1500 eur/month", "1500 eur per month", "1500 eur a month", "1500 eur al mes", "50 € por hora", "1500 eur mensuales",
+])
+def test_parse_money_ambiguous(text):
+    assert parse_money(text) is None
+
+
+@pytest.mark.parametrize("text, days", [
+    ("1 mes", 30),
+    ("3 weeks", 21),
+    ("two weeks", 14),
+    ("1,5 months", 45),
+    ("1 month and 2 weeks", 44),
+    ("1 mes y 2 semanas", 44),
+    ("medio año", 182.5),
+    ("1 mes y medio", 45),
+    ("1 month and a half", 45),
+    ("one and a half months", 45),
+    ("dos semanas y media", 17.5),
+    ("1 mes y media semana", 33.5),
+])
+def test_parse_duration_days(text, days):
+    assert parse_duration_days(text) == days
+
+
+@pytest.mark.parametrize("text", [
+    "3-4 weeks", "2-3 meses", "4 weeks (20 days)", "soon", "a month and a quarter", "half a month",
+    "2 weeks per module", "1 semana por fase",
+])
+def test_parse_duration_ambiguous(text):
+    assert parse_duration_days(text) is None
+
+
+def test_comparable_currencies():
+    assert comparable(parse_money("1 eur"), parse_money("2"))
+    assert not comparable(parse_money("1 eur"), parse_money("2 usd"))
+    assert not comparable(parse_money("1 eur"), None)
+
+
+def test_nan_for_unreadable_values():
+    assert amount_or_nan("1500 eur") == 1500
+    assert math.isnan(amount_or_nan(""))
+    assert days_or_nan("3 weeks") == 21
+    assert math.isnan(days_or_nan("2-3 meses"))
+
+
+def test_client_accepts_request_matching_its_previous_offer():
+    assert client_decision("1200 eur", "20 days", "1200 eur", "20 days", "1500 eur", "1 mes",
+                           last_turn=False) == Decision.ACCEPT
+
+
+def test_client_leaves_higher_request_to_the_model_until_its_last_turn():
+    assert client_decision("1400 eur", "20 days", "1200 eur", "20 days", "1500 eur", "1 mes",
+                           last_turn=False) is None
+    assert client_decision("1400 eur", "20 days", "1200 eur", "20 days", "1500 eur", "1 mes",
+                           last_turn=True) == Decision.ACCEPT
+
+
+def test_client_never_decides_beyond_limits_or_unreadable_requests():
+    assert client_decision("1600 eur", "20 days", "1200 eur", "20 days", "1500 eur", "1 mes", last_turn=True) is None
+    assert client_decision("a lot", "20 days", "1200 eur", "20 days", "1500 eur", "1 mes", last_turn=True) is None
+    assert client_decision("1400 eur", "1 mes y medio", "1200 eur", "20 days", "1500 eur", "1 mes",
+                           last_turn=True) is None
+    assert client_decision("1400 eur/month", "20 days", "1200 eur", "20 days", "1500 eur", "1 mes",
+                           last_turn=True) is None
+
+
+def test_developer_decisions():
+    assert developer_decision("1000 eur", "2 weeks", None, None, "1200 eur", "3 weeks",
+                              last_turn=True) == Decision.REJECT
+    assert developer_decision("1300 eur", "4 weeks", "1250 eur", "25 days", "1200 eur", "3 weeks",
+                              last_turn=False) == Decision.ACCEPT
+    assert developer_decision("1300 eur", "4 weeks", None, None, "1200 eur", "3 weeks", last_turn=False) is None